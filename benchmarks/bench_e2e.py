@@ -0,0 +1,132 @@
+"""
+End-to-end benchmark: translate_ebook_flow on synthetic EPUBs against the local mock
+OpenRouter server, fully offline.
+
+    python -m benchmarks.bench_e2e [--paragraphs 50 2000 20000] [--latency 0.2]
+        [--rate-429 0.02] [--malformed-rate 0.01] [--workers 1] [--stream] [--json out.json]
+
+Every size runs twice in a fresh subprocess (so settings, caches and peak RSS are
+per run): "cold" against an empty cache database and "warm" against the one the cold
+run filled. Each run reports wall time, peak RSS and the per-phase totals of the
+telemetry report; --json keeps the full reports for comparing commits.
+
+Token counting still needs tiktoken's cl100k_base file; on an offline machine point
+TIKTOKEN_CACHE_DIR at a directory where it has been cached before.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.mock_openrouter import MockConfig, MockOpenRouter
+from benchmarks.synthetic_epub import write_synthetic_epub
+
+PHASES = ("load", "extract", "cache_lookup", "api_request", "validation", "rebuild")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS; children covers the process pool
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_child(epub_path: str, output_path: str, result_path: str):
+    """Runs one translation in this (fresh) process; settings come from the environment."""
+    from main import translate_ebook_flow
+    from core.telemetry import telemetry
+
+    logging.getLogger().setLevel(logging.WARNING)
+    telemetry.reset()
+    start = time.perf_counter()
+    translate_ebook_flow(epub_path, "spanish", use_cache=True, output_path=output_path)
+    wall = time.perf_counter() - start
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "ok": os.path.exists(output_path),
+            "wall_seconds": round(wall, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "telemetry": telemetry.report(),
+        }, f)
+
+
+def run_once(epub_path: str, workdir: str, label: str, env: dict[str, str]) -> dict:
+    result_path = os.path.join(workdir, f"{label}.json")
+    output_path = os.path.join(workdir, f"{label}.epub")
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_e2e", "--child", epub_path, output_path, result_path],
+        env=env, check=True,
+    )
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_row(paragraphs: int, label: str, result: dict) -> str:
+    report = result["telemetry"]
+    phases = report["phases"]
+    counters = report["counters"]
+    totals = " ".join(f"{phases.get(phase, {}).get('total_seconds', 0):>8.2f}" for phase in PHASES)
+    api = phases.get("api_request", {})
+    return (
+        f"{paragraphs:>8} {label:>5} {result['wall_seconds']:>8.2f} {result['peak_rss_mb']:>8.1f} "
+        f"{int(counters.get('api_requests', 0)):>6} {int(counters.get('api_429', 0)):>5} "
+        f"{api.get('p50', 0):>6.2f} {api.get('p99', 0):>6.2f} {totals} "
+        f"{report['derived']['cache_hit_ratio'] or 0:>6.2f}{'' if result['ok'] else '  FAILED'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[50, 2000, 20000])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="processing_workers of the runs")
+    parser.add_argument("--concurrency", type=int, default=4, help="max_concurrent_requests of the runs")
+    parser.add_argument("--stream", action="store_true", help="Use streamed (SSE) completions")
+    parser.add_argument("--json", help="Write every run's full result here")
+    parser.add_argument("--child", nargs=3, metavar=("EPUB", "OUTPUT", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(*args.child)
+
+    config = MockConfig(latency=args.latency, rate_429=args.rate_429, malformed_rate=args.malformed_rate, seed=0)
+    header = f"{'paras':>8} {'cache':>5} {'wall s':>8} {'rss MB':>8} {'reqs':>6} {'429s':>5} {'api50':>6} {'api99':>6} "
+    header += " ".join(f"{phase[:8]:>8}" for phase in PHASES) + f" {'hit%':>6}"
+    results = []
+    with MockOpenRouter(config) as mock, tempfile.TemporaryDirectory() as tmp:
+        print(header)
+        for paragraphs in args.paragraphs:
+            workdir = os.path.join(tmp, str(paragraphs))
+            os.makedirs(workdir)
+            epub_path = write_synthetic_epub(os.path.join(workdir, "book.epub"), paragraphs)
+            env = {
+                **os.environ,
+                "OPENROUTER_APIKEY": "benchmark",
+                "OPENROUTER_BASE_URL": mock.url,
+                "DATABASE_PATH": os.path.join(workdir, "cache.db"),
+                "MODEL_CACHE_PATH": os.path.join(workdir, "models.json"),
+                "PROCESSING_WORKERS": str(args.workers),
+                "MAX_CONCURRENT_REQUESTS": str(args.concurrency),
+                "STREAM_RESPONSES": str(args.stream).lower(),
+                # The mock has no quota; client-side limits would only measure the limiter
+                "REQUESTS_PER_MINUTE": "0",
+                "TOKENS_PER_MINUTE": "0",
+            }
+            for label in ("cold", "warm"):
+                result = run_once(epub_path, workdir, label, env)
+                results.append({"paragraphs": paragraphs, "cache": label, **result})
+                print(format_row(paragraphs, label, result), flush=True)
+        print(f"mock server: {mock.counts}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Parser backend benchmark: parse, extract and rebuild throughput for every
+EpubProcessor backend on synthetic XHTML chapters of increasing size.
+
+    python -m benchmarks.bench_parsers [--sizes 250 1000 4000] [--repeat 3]
+
+The last column checks that each backend's rebuilt document is canonically
+equivalent to the html.parser output (see canonical_html).
+"""
+import argparse
+import time
+from bs4 import BeautifulSoup, NavigableString
+from core.epub_processor import EpubProcessor, PARSER_BACKENDS
+from benchmarks.bench_rebuild import fake_translation
+
+XHTML_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+    '<head><title>Bench</title><link href="style.css" rel="stylesheet" type="text/css"/></head><body>'
+)
+
+
+def synthetic_xhtml(paragraphs: int) -> str:
+    body = "".join(
+        f'<p class="calibre{i % 7}">Paragraph {i} with <i>some</i> <span class="x">inline</span> '
+        f'markup &amp; an entity.<br/></p>'
+        + (f'<h2 id="h{i}">Heading {i}</h2><p class="empty"></p>' if i % 50 == 0 else "")
+        for i in range(paragraphs)
+    )
+    return f"{XHTML_HEAD}{body}</body></html>"
+
+
+def canonical_html(html: str) -> str:
+    """Backend-neutral form: re-parsed with html.parser, whitespace-only text dropped."""
+    soup = BeautifulSoup(html, "html.parser")
+    for node in soup.find_all(string=True):
+        if type(node) is NavigableString and not node.strip():
+            node.extract()
+    return str(soup)
+
+
+def run_backend(parser: str, html: str, repeat: int) -> tuple[float, float, float, str]:
+    processor = EpubProcessor(parser)
+    parse_s = extract_s = rebuild_s = float("inf")
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processor.parse_document(html)
+        parse_s = min(parse_s, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        skeleton, t_map = processor.extract_structure(html)
+        extract_s = min(extract_s, time.perf_counter() - start)
+
+        translated = fake_translation(t_map)
+        start = time.perf_counter()
+        output = processor.rebuild_html(skeleton, translated)
+        rebuild_s = min(rebuild_s, time.perf_counter() - start)
+    return parse_s, extract_s, rebuild_s, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'paragraphs':>10} {'backend':>12} {'parse s':>9} {'extract s':>10} {'rebuild s':>10} {'equivalent':>11}")
+    for size in args.sizes:
+        html = synthetic_xhtml(size)
+        reference = None
+        for backend in PARSER_BACKENDS:
+            parse_s, extract_s, rebuild_s, output = run_backend(backend, html, args.repeat)
+            canonical = canonical_html(output)
+            reference = reference or canonical
+            print(f"{size:>10} {backend:>12} {parse_s:>9.3f} {extract_s:>10.3f} {rebuild_s:>10.3f} {str(canonical == reference):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Rebuild benchmark: shows EpubProcessor.rebuild_html staying linear as the document grows.
+
+    python -m benchmarks.bench_rebuild [--sizes 500 1000 2000 4000 8000] [--legacy]
+
+`--legacy` also times the previous implementation (one skeleton.find per ID plus one
+BeautifulSoup per fragment) for comparison; it is quadratic, so keep sizes small.
+"""
+import argparse
+import time
+from bs4 import BeautifulSoup
+from core.epub_processor import EpubProcessor
+from models.translation import TranslationMap, TranslationMapElement
+
+
+def synthetic_chapter(paragraphs: int) -> str:
+    body = "".join(
+        f'<p class="calibre{i % 7}">Paragraph {i} with <i>some</i> <span class="x">inline</span> markup.</p>'
+        + (f"<h2>Heading {i}</h2>" if i % 50 == 0 else "")
+        for i in range(paragraphs)
+    )
+    return f"<html><head><title>Bench</title></head><body>{body}</body></html>"
+
+
+def fake_translation(translation_map: TranslationMap) -> TranslationMap:
+    return TranslationMap(elements=[
+        TranslationMapElement(id=el.id, text=el.text.replace("Paragraph", "Párrafo"))
+        for el in translation_map.elements
+    ])
+
+
+def legacy_rebuild(skeleton: BeautifulSoup, translated: TranslationMap) -> str:
+    for el in translated.elements:
+        node = skeleton.find(string=el.id)
+        if node:
+            node.replace_with(BeautifulSoup(el.text, 'html.parser'))
+    return skeleton.encode(formatter="minimal").decode('utf-8')
+
+
+def time_rebuild(processor: EpubProcessor, html: str, rebuild) -> tuple[int, float]:
+    skeleton, t_map = processor.extract_structure(html)
+    translated = fake_translation(t_map)
+    start = time.perf_counter()
+    rebuild(skeleton, translated)
+    return len(t_map.elements), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000])
+    parser.add_argument("--legacy", action="store_true", help="also time the per-ID find() implementation")
+    args = parser.parse_args()
+
+    processor = EpubProcessor()
+    print(f"{'paragraphs':>10} {'elements':>9} {'rebuild s':>10} {'us/element':>11}" + (f" {'legacy s':>9}" if args.legacy else ""))
+    for size in args.sizes:
+        html = synthetic_chapter(size)
+        elements, seconds = time_rebuild(processor, html, processor.rebuild_html)
+        line = f"{size:>10} {elements:>9} {seconds:>10.3f} {seconds / elements * 1e6:>11.1f}"
+        if args.legacy:
+            _, legacy_seconds = time_rebuild(processor, html, legacy_rebuild)
+            line += f" {legacy_seconds:>9.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+TranslationMap benchmark: memory and time of the columnar map against the previous
+pydantic models (kept here as `LegacyTranslationMap`).
+
+    python -m benchmarks.bench_translation_map [--sizes 10000 100000 300000]
+
+For every size it measures the memory held by a map (tracemalloc, excluding the
+strings both representations share) and the time to build it from extracted
+(id, text) pairs, slice it into 80-element batches, and merge shuffled translations
+back into source order the way TranslationService used to (sort by an order dict)
+and does now (TranslationMap.merged).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from pydantic import BaseModel
+from models.translation import TranslationMap
+
+
+class LegacyTranslationMapElement(BaseModel):
+    id: str
+    text: str
+
+
+class LegacyTranslationMap(BaseModel):
+    elements: list[LegacyTranslationMapElement]
+
+
+def build_legacy(pairs: list[tuple[str, str]]) -> LegacyTranslationMap:
+    return LegacyTranslationMap(elements=[LegacyTranslationMapElement(id=i, text=t) for i, t in pairs])
+
+
+def build_columnar(pairs: list[tuple[str, str]]) -> TranslationMap:
+    return TranslationMap.from_pairs(pairs)
+
+
+def slice_legacy(t_map: LegacyTranslationMap, size: int = 80) -> int:
+    # What main.py did before the streaming pipeline: model_dump() and rebuild each slice
+    elements = t_map.model_dump()["elements"]
+    return sum(
+        len(LegacyTranslationMap(elements=elements[i:i + size]).elements) for i in range(0, len(elements), size)
+    )
+
+
+def slice_columnar(t_map: TranslationMap, size: int = 80) -> int:
+    return sum(len(t_map[i:i + size]) for i in range(0, len(t_map), size))
+
+
+def merge_legacy(ids: list[str], translated: list[tuple[str, str]]) -> LegacyTranslationMap:
+    final = [LegacyTranslationMapElement(id=i, text=t) for i, t in translated]
+    order_map = {ref_id: i for i, ref_id in enumerate(ids)}
+    final.sort(key=lambda x: order_map.get(x.id, 999))
+    return LegacyTranslationMap(elements=final)
+
+
+def merge_columnar(ids: list[str], translated: list[tuple[str, str]]) -> TranslationMap:
+    return TranslationMap.merged(ids, dict(translated))
+
+
+def held_bytes(build, pairs) -> tuple[object, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(pairs)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, held
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    print(f"{'elements':>9} {'impl':>9} {'MB held':>8} {'B/elem':>7} {'build s':>8} {'slice s':>8} {'merge s':>8}")
+    for size in args.sizes:
+        pairs = [(f"REF_{n:06d}", f"Paragraph {n} with <i>inline</i> markup and some prose.") for n in range(1, size + 1)]
+        ids = [ref_id for ref_id, _ in pairs]
+        translated = list(pairs)
+        random.Random(0).shuffle(translated)
+        for name, build, slicer, merge in (
+            ("pydantic", build_legacy, slice_legacy, merge_legacy),
+            ("columnar", build_columnar, slice_columnar, merge_columnar),
+        ):
+            t_map, held = held_bytes(build, pairs)
+            print(
+                f"{size:>9} {name:>9} {held / 2**20:>8.1f} {held / size:>7.0f} {timed(build, pairs):>8.3f} "
+                f"{timed(slicer, t_map):>8.3f} {timed(merge, ids, translated):>8.3f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Translation memory benchmark: indexing throughput and lookup latency against a
+content cache of synthetic segments.
+
+    python -m benchmarks.bench_translation_memory [--segments 100000] [--queries 500]
+
+Indexing is a one-off cost (keys are persisted and only new rows are indexed on
+later refreshes). Lookup time is split into signature computation, which only
+depends on the query length, and the index probe, which is what grows with the
+size of the memory.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from benchmarks.synthetic_epub import synthetic_segment, vocabulary
+from core.persistence import TranslationCache
+from core.translation_memory import TranslationMemory
+
+
+def percentile(values: list[float], pct: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp, TranslationCache(db_path=os.path.join(tmp, "tm.db")) as cache:
+        words = vocabulary(rng)
+        sources = [synthetic_segment(rng, words) for _ in range(args.segments)]
+        for i in range(0, len(sources), 10_000):
+            cache.save_by_hash("model", "spanish", "v1", [
+                (f"h{n}", source, f"[ES] {source}") for n, source in enumerate(sources[i:i + 10_000], start=i)
+            ])
+
+        memory = TranslationMemory(cache)
+        start = time.perf_counter()
+        memory.refresh()
+        index_s = time.perf_counter() - start
+
+        signature_ms, probe_ms, hits = [], [], 0
+        for _ in range(args.queries):
+            # Near-duplicate queries: one word of a stored segment replaced
+            words = rng.choice(sources).split()
+            words[rng.randrange(len(words))] = "Donut"
+            query = " ".join(words)
+
+            start = time.perf_counter()
+            keys = memory.keys(query, "spanish")
+            middle = time.perf_counter()
+            cache.find_memory_candidates(keys, memory.max_candidates)
+            end = time.perf_counter()
+            signature_ms.append((middle - start) * 1000)
+            probe_ms.append((end - middle) * 1000)
+            hits += memory.lookup(query, "spanish", ["model"], "v1") is not None
+
+    print(f"segments indexed:   {args.segments} in {index_s:.1f} s ({args.segments / index_s:,.0f}/s)")
+    print(f"signature ms:       p50 {statistics.median(signature_ms):.3f}  p99 {percentile(signature_ms, 0.99):.3f}")
+    print(f"index probe ms:     p50 {statistics.median(probe_ms):.3f}  p99 {percentile(probe_ms, 0.99):.3f}")
+    print(f"near-duplicate hit: {hits}/{args.queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the OpenRouter API, for offline end-to-end benchmarks.
+
+    python -m benchmarks.mock_openrouter [--port 8099] [--latency 0.3] [--rate-429 0.02]
+
+Implements GET /models and POST /chat/completions (plain JSON or SSE streaming).
+Each request "translates" the elements of the user message by prefixing them, after
+a configurable latency; a configurable share of requests is answered with a 429
+(with Retry-After) or with truncated JSON. Token usage is reported as characters
+times `tokens_per_char`, so cost and tokens/s figures have something to add up.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# "REF_000001: text" lines of the user message (text may itself contain newlines)
+_ID = r"[A-Za-z]+_\d+(?:__p\d+)?"
+_ELEMENT = re.compile(rf"^({_ID}): (.*?)(?=\n{_ID}: |\Z)", re.MULTILINE | re.DOTALL)
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.5,
+        rate_429: float = 0.0,
+        retry_after: float = 0.2,
+        malformed_rate: float = 0.0,
+        tokens_per_char: float = 0.25,
+        prefix: str = "[ES] ",
+        models: tuple[str, ...] = ("mistralai/devstral-2512:free",),
+        seed: int | None = None,
+    ):
+        # Seconds per request, +/- `jitter` (a fraction of it)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.tokens_per_char = tokens_per_char
+        self.prefix = prefix
+        self.models = models
+        self.random = random.Random(seed)
+
+
+class MockOpenRouter:
+    """Threaded HTTP server on localhost; use as a context manager and point the client at `url`."""
+    def __init__(self, config: MockConfig | None = None, port: int = 0):
+        self.config = config or MockConfig()
+        self.counts = {"requests": 0, "rate_limited": 0, "malformed": 0}
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-openrouter", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOpenRouter":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return self.config.random.random() < rate
+
+    def _delay(self) -> float:
+        with self._lock:
+            spread = self.config.latency * self.config.jitter
+            return max(0.0, self.config.latency + self.config.random.uniform(-spread, spread))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock: MockOpenRouter
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if not self.path.endswith("/models"):
+            return self._send_json(404, {"error": "not found"})
+        data = [
+            {"id": model, "pricing": {"prompt": "0.0000001", "completion": "0.0000004"}, "context_length": 32768}
+            for model in self.mock.config.models
+        ]
+        self._send_json(200, {"data": data})
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": "not found"})
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        mock, config = self.mock, self.mock.config
+        mock._count("requests")
+        time.sleep(mock._delay())
+
+        if mock._roll(config.rate_429):
+            mock._count("rate_limited")
+            return self._send_json(429, {"error": "rate limited"}, {"Retry-After": f"{config.retry_after:g}"})
+
+        user = next(m["content"] for m in reversed(payload["messages"]) if m["role"] == "user")
+        elements = [{"id": ref_id, "text": config.prefix + text} for ref_id, text in _ELEMENT.findall(user)]
+        content = json.dumps({"elements": elements}, ensure_ascii=False)
+        if mock._roll(config.malformed_rate):
+            mock._count("malformed")
+            content = content[:len(content) // 2]
+        prompt_chars = sum(len(m["content"] or "") for m in payload["messages"])
+        usage = {
+            "prompt_tokens": int(prompt_chars * config.tokens_per_char),
+            "completion_tokens": int(len(content) * config.tokens_per_char),
+        }
+
+        if payload.get("stream"):
+            return self._send_stream(content, usage)
+        self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage})
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content: str, usage: dict, chunk_size: int = 40):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i in range(0, len(content), chunk_size):
+            event = {"choices": [{"delta": {"content": content[i:i + chunk_size]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, rate_429=args.rate_429, malformed_rate=args.malformed_rate)
+    with MockOpenRouter(config, port=args.port) as mock:
+        print(f"Mock OpenRouter on {mock.url} (set OPENROUTER_BASE_URL={mock.url}); Ctrl+C to stop.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
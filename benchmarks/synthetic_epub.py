@@ -0,0 +1,99 @@
+"""
+Synthetic EPUB generator for benchmarks.
+
+    python -m benchmarks.synthetic_epub book.epub [--paragraphs 5000] [--per-chapter 200]
+
+Chapters hold prose paragraphs with inline markup (italics, links, classed spans),
+headings, scene breaks and page markers (which the segment filter passes through) and
+a share of repeated paragraphs (which deduplication and the cache absorb), so a run
+exercises the same paths a real novel does. Output is deterministic for a given seed.
+"""
+import argparse
+import random
+from ebooklib import epub
+
+CSS = b"p { text-indent: 1em; margin: 0; } .sys { font-variant: small-caps; }"
+SYLLABLES = "ka ro mi dun geon cra wler ti fa lo be sha nor vel qui tor an es ul im".split()
+
+
+def vocabulary(rng: random.Random, size: int = 5000) -> list[str]:
+    """Pseudo-words with a Zipf-like frequency skew, closer to prose than a tiny word list."""
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(size)]
+    return [word for rank, word in enumerate(words, start=1) for _ in range(max(1, 200 // rank))]
+
+
+def synthetic_segment(rng: random.Random, words: list[str]) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(12, 40))).capitalize() + "."
+
+
+def synthetic_paragraph(rng: random.Random, words: list[str], n: int) -> str:
+    text = synthetic_segment(rng, words)
+    kind = n % 10
+    if kind == 3:
+        head, _, tail = text.partition(" ")
+        return f"<i>{head}</i> {tail}"
+    if kind == 6:
+        return f'{text[:-1]}, said <span class="sys">System AI</span>.'
+    if kind == 8:
+        return f'{text[:-1]} (<a href="#note{n}">{n}</a>).'
+    return text
+
+
+def synthetic_chapter(rng: random.Random, words: list[str], number: int, start: int, paragraphs: int, repeats: list[str]) -> str:
+    body = [f"<h1>Chapter {number}</h1>"]
+    for n in range(start, start + paragraphs):
+        if n % 50 == 49:
+            body.append("<p>* * *</p>")
+        elif n % 97 == 0:
+            body.append(f"<p>- {n // 97} -</p>")
+        elif repeats and rng.random() < 0.05:
+            body.append(f"<p>{rng.choice(repeats)}</p>")
+        else:
+            paragraph = synthetic_paragraph(rng, words, n)
+            if len(repeats) < 50:
+                repeats.append(paragraph)
+            body.append(f"<p>{paragraph}</p>")
+    return "".join(body)
+
+
+def write_synthetic_epub(path: str, paragraphs: int, per_chapter: int = 200, seed: int = 0) -> str:
+    """Writes an EPUB with `paragraphs` body paragraphs split into chapters; returns `path`."""
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    book = epub.EpubBook()
+    book.set_identifier(f"synthetic-{paragraphs}-{seed}")
+    book.set_title(f"Synthetic book ({paragraphs} paragraphs)")
+    book.set_language("en")
+    style = epub.EpubItem(uid="style", file_name="style.css", media_type="text/css", content=CSS)
+    book.add_item(style)
+
+    chapters = []
+    repeats: list[str] = []
+    for number, start in enumerate(range(0, paragraphs, per_chapter), start=1):
+        chapter = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chap_{number:04d}.xhtml", lang="en")
+        chapter.content = synthetic_chapter(rng, words, number, start, min(per_chapter, paragraphs - start), repeats)
+        chapter.add_item(style)
+        book.add_item(chapter)
+        chapters.append(chapter)
+
+    book.toc = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", *chapters]
+    epub.write_epub(path, book)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--per-chapter", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_epub(args.path, args.paragraphs, args.per_chapter, args.seed)
+    print(f"Wrote {args.path} ({args.paragraphs} paragraphs)")
+
+
+if __name__ == "__main__":
+    main()
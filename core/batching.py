@@ -0,0 +1,209 @@
+import re
+import threading
+from collections import Counter
+from typing import Callable
+from models.translation import TranslationMapElement
+from utils.epub_utils import get_encoding
+
+# Suffix used for the pieces of an element that had to be split (REF_000001__p2)
+SPLIT_SEPARATOR = "__p"
+# Approximate JSON wrapping per returned element: {"id": "...", "text": "..."},
+JSON_OVERHEAD_PER_ELEMENT = 12
+# Context left for the system prompt, schema and memory hints when a model's limit caps the input budget
+PROMPT_RESERVE_TOKENS = 2000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…»”\"])\s+")
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w:-]*)[^>]*?(/?)>")
+
+
+def base_id(ref_id: str) -> str:
+    """Returns the original element id of a (possibly split) piece id."""
+    return ref_id.partition(SPLIT_SEPARATOR)[0]
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Splits inline HTML into sentences, only cutting where no inline tag is open
+    so every piece is still well-formed markup.
+    """
+    pieces = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        candidate = text[start:match.start()]
+        if _open_tag_depth(candidate) == 0:
+            pieces.append(candidate)
+            start = match.end()
+    pieces.append(text[start:])
+    return [p for p in pieces if p]
+
+
+def _open_tag_depth(fragment: str) -> int:
+    depth = 0
+    for closing, _name, self_closing in _TAG.findall(fragment):
+        if self_closing:
+            continue
+        depth += -1 if closing else 1
+    return depth
+
+
+class TokenBatcher:
+    """
+    Packs elements into request batches by token count instead of element count.
+    A batch is closed as soon as adding the next element would exceed either the
+    input budget or the expected output budget for the model.
+    """
+    def __init__(
+        self,
+        max_input_tokens: int,
+        max_output_tokens: int,
+        output_ratio: float = 1.5,
+        max_elements: int = 80,
+        count_tokens: Callable[[str], int] | None = None,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.output_ratio = output_ratio
+        self.max_elements = max_elements
+        if count_tokens is None:
+            self.count_tokens = lambda text: len(get_encoding().encode_ordinary(text))
+            # One batched call (tiktoken encodes on its own thread pool) for a whole map
+            self.count_batch = lambda texts: [len(tokens) for tokens in get_encoding().encode_ordinary_batch(texts)]
+        else:
+            self.count_tokens = count_tokens
+            self.count_batch = lambda texts: [count_tokens(text) for text in texts]
+
+    @classmethod
+    def for_model(
+        cls, settings, model: str, max_elements: int = 80, count_tokens: Callable[[str], int] | None = None,
+        context_length: int | None = None, max_output_tokens: int | None = None,
+    ) -> "TokenBatcher":
+        """
+        Builds a batcher with the budgets configured for `model` (or the global defaults),
+        capped by the model's own limits when known (see core.model_catalog): the output
+        budget by its max output tokens, and input plus output by its context length.
+        """
+        budget = settings.model_token_budgets.get(model, {})
+        max_input = budget.get("input", settings.batch_max_input_tokens)
+        max_output = budget.get("output", settings.batch_max_output_tokens)
+        if max_output_tokens:
+            max_output = min(max_output, max_output_tokens)
+        if context_length:
+            max_output = min(max_output, context_length // 2)
+            max_input = max(1, min(max_input, context_length - max_output - PROMPT_RESERVE_TOKENS))
+        return cls(
+            max_input_tokens=max_input,
+            max_output_tokens=max_output,
+            output_ratio=settings.output_tokens_ratio,
+            max_elements=max_elements,
+            count_tokens=count_tokens,
+        )
+
+    def input_tokens(self, element: TranslationMapElement) -> int:
+        return self.count_tokens(f"{element.id}: {element.text}")
+
+    def output_tokens(self, input_tokens: int) -> int:
+        return int(input_tokens * self.output_ratio) + JSON_OVERHEAD_PER_ELEMENT
+
+    def pack(self, elements: list[TranslationMapElement], split: bool = True) -> list[list[TranslationMapElement]]:
+        """
+        Returns the elements grouped into batches that respect the token budgets.
+        With `split=False` oversized elements are kept whole, alone in their batch.
+        """
+        return [[element for element, _ in batch] for batch in self.pack_sized(elements, split)]
+
+    def pack_sized(
+        self, elements: list[TranslationMapElement], split: bool = True
+    ) -> list[list[tuple[TranslationMapElement, int]]]:
+        """`pack`, keeping the input token count of every element (or piece) next to it."""
+        batches = []
+        current = []
+        current_in = current_out = 0
+
+        counts = self.count_batch([f"{element.id}: {element.text}" for element in elements])
+        for element, tokens_in in self._sized(elements, counts, split):
+            tokens_out = self.output_tokens(tokens_in)
+            overflows = (
+                current_in + tokens_in > self.max_input_tokens
+                or current_out + tokens_out > self.max_output_tokens
+                or len(current) >= self.max_elements
+            )
+            if current and overflows:
+                batches.append(current)
+                current, current_in, current_out = [], 0, 0
+            current.append((element, tokens_in))
+            current_in += tokens_in
+            current_out += tokens_out
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _sized(self, elements: list[TranslationMapElement], counts: list[int], split: bool):
+        for element, tokens_in in zip(elements, counts):
+            if not split or (tokens_in <= self.max_input_tokens and self.output_tokens(tokens_in) <= self.max_output_tokens):
+                yield element, tokens_in
+                continue
+            pieces = self._split_element(element)
+            yield from zip(pieces, self.count_batch([f"{piece.id}: {piece.text}" for piece in pieces]))
+
+    def _split_element(self, element: TranslationMapElement) -> list[TranslationMapElement]:
+        """Greedily regroups the sentences of `element` into pieces that fit the budgets."""
+        pieces = []
+        buffer = []
+        for sentence in split_sentences(element.text):
+            candidate = " ".join(buffer + [sentence])
+            probe = TranslationMapElement(id=element.id, text=candidate)
+            tokens_in = self.input_tokens(probe)
+            fits = tokens_in <= self.max_input_tokens and self.output_tokens(tokens_in) <= self.max_output_tokens
+            if buffer and not fits:
+                pieces.append(" ".join(buffer))
+                buffer = [sentence]
+            else:
+                buffer.append(sentence)
+        if buffer:
+            pieces.append(" ".join(buffer))
+
+        if len(pieces) == 1:
+            # A single sentence bigger than the budget cannot be split any further
+            return [element]
+        return [
+            TranslationMapElement(id=f"{element.id}{SPLIT_SEPARATOR}{n}", text=piece)
+            for n, piece in enumerate(pieces, start=1)
+        ]
+
+    @staticmethod
+    def stitch(elements: list[TranslationMapElement]) -> list[TranslationMapElement]:
+        """Joins translated pieces back under their original id, keeping the element order."""
+        stitched: dict[str, list[tuple[int, str]]] = {}
+        for el in elements:
+            original_id, _, part = el.id.partition(SPLIT_SEPARATOR)
+            stitched.setdefault(original_id, []).append((int(part) if part else 0, el.text))
+        return [
+            TranslationMapElement(id=original_id, text=" ".join(text for _, text in sorted(parts)))
+            for original_id, parts in stitched.items()
+        ]
+
+
+class StitchBuffer:
+    """
+    Collects translated pieces as batches finish (possibly on several threads) and
+    releases each element only once all of its pieces have arrived.
+    """
+    def __init__(self, batches: list[list[TranslationMapElement]]):
+        self.expected = Counter(base_id(el.id) for batch in batches for el in batch)
+        self.pending: dict[str, list[TranslationMapElement]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, elements: list[TranslationMapElement]) -> list[TranslationMapElement]:
+        complete = []
+        with self._lock:
+            for el in elements:
+                original_id = base_id(el.id)
+                if self.expected[original_id] == 1 and original_id == el.id:
+                    complete.append(el)
+                    continue
+                parts = self.pending.setdefault(original_id, [])
+                parts.append(el)
+                if len(parts) == self.expected[original_id]:
+                    complete.extend(TokenBatcher.stitch(self.pending.pop(original_id)))
+        return complete
@@ -1,14 +1,64 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from functools import lru_cache
+from typing import Literal
 
 class Settings(BaseSettings):
     # API Settings
     openrouter_api_key: str = Field(..., alias="OPENROUTER_APIKEY")
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
     default_model: str = "mistralai/devstral-2512:free"
+    # Models tried after the default one (in order) when it is slow or keeps failing
+    fallback_models: list[str] = []
+    # Hedging: a batch that outlives this percentile of its model's recent latencies gets a
+    # duplicate request on the next model; until enough latencies are known, the initial delay
+    hedge_percentile: float = 0.9
+    hedge_initial_delay: float = 30.0
+    hedge_min_delay: float = 2.0
+    # A model failing this many batches in a row is skipped for the cooldown
+    route_failure_threshold: int = 3
+    route_cooldown_seconds: float = 120.0
+    max_concurrent_requests: int = 4
+    http_pool_size: int = 10
+    # Rate limits (0 = unlimited). Free OpenRouter models allow ~20 requests/minute.
+    requests_per_minute: int = 20
+    tokens_per_minute: int = 0
+
+    # Batching Settings (token budgets per request; per-model overrides as {"model": {"input": n, "output": n}})
+    batch_max_input_tokens: int = 4000
+    batch_max_output_tokens: int = 6000
+    output_tokens_ratio: float = 1.5
+    model_token_budgets: dict[str, dict[str, int]] = {}
+    # Attempts per element before giving up on it (it is then left untranslated)
+    max_element_attempts: int = 3
+    # Replace attribute-carrying inline tags with short placeholders before sending
+    compress_markup: bool = True
+    # Pass numbers, page markers, ISBN/copyright lines, URLs, stat blocks and text already
+    # in the target language through untranslated (rules from core.segment_filter.RULES)
+    filter_segments: bool = True
+    segment_filter_rules: list[str] = [
+        "symbols", "page_marker", "roman_numeral", "isbn", "copyright", "url", "code", "target_language"
+    ]
+    # Translation memory over the content cache: reuse typographic variants, hint near-duplicates
+    translation_memory: bool = True
+    memory_similarity_threshold: float = 0.7
+    memory_max_hints: int = 8
+    # Preflight time projection: fixed cost per request plus generation speed
+    expected_request_overhead_seconds: float = 1.5
+    expected_output_tokens_per_second: float = 60.0
+    # Stream completions (SSE) and checkpoint each element as soon as it is parsed
+    stream_responses: bool = False
     
+    # Telemetry exports (JSON run report, Prometheus textfile) and cProfile dump; None = off
+    metrics_json_path: str | None = None
+    metrics_prometheus_path: str | None = None
+    profile_path: str | None = None
+
     # Persistence Settings
     database_path: str = "translations_cache.db"
+    # OpenRouter model metadata (pricing, context limits) cached on disk; refreshed in the background once stale
+    model_cache_path: str = "model_cache.json"
+    model_cache_ttl_seconds: float = 24 * 3600
     
     # Processor Settings
     target_tags: list[str] = [
@@ -16,8 +66,22 @@ class Settings(BaseSettings):
         'li', 'blockquote', 'dt', 'dd', 'caption'
     ]
     placeholder_fmt: str = "REF_{:06d}"
+    # BeautifulSoup backend for EPUB documents ("lxml-xml" preserves XHTML case, e.g. SVG viewBox)
+    html_parser: Literal["html.parser", "lxml", "lxml-xml"] = "html.parser"
+    # >1 spreads per-document extraction/reconstruction over a process pool
+    processing_workers: int = 1
+    # Books of a catalogue run parsed/rebuilt at the same time (API batches share one pool)
+    parallel_books: int = 2
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
-# Instancia global para ser usada en el proyecto
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+def __getattr__(name: str):
+    # Instancia global para ser usada en el proyecto: `from core.config import settings`.
+    # It is built (reading .env and the environment) on first use rather than at import
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
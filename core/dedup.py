@@ -0,0 +1,69 @@
+import logging
+from typing import Callable
+from models.translation import TranslationMap
+from models.report import DedupReport
+from utils.epub_utils import get_encoding, saved_element_tokens
+from utils.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class DedupResult:
+    """Unique elements to translate plus what is needed to fan the translations back out."""
+    def __init__(self, unique_map: TranslationMap, canonical_of: dict[str, str], order: list[str], report: DedupReport):
+        self.unique_map = unique_map
+        self.canonical_of = canonical_of
+        self.order = order
+        self.report = report
+
+    def expand(self, translated: TranslationMap) -> TranslationMap:
+        """Copies each translated element to every id that shared its source text."""
+        translated_by_id = translated.as_dict()
+        ids, texts = [], []
+        for ref_id in self.order:
+            text = translated_by_id.get(self.canonical_of.get(ref_id, ref_id))
+            if text is not None:
+                ids.append(ref_id)
+                texts.append(text)
+        return TranslationMap.from_columns(ids, texts)
+
+
+class Deduplicator:
+    """
+    Collapses elements with identical (normalized) source text so each one is
+    sent and paid for only once.
+    """
+    def __init__(self, count_tokens: Callable[[str], int] | None = None):
+        self.count_tokens = count_tokens or (lambda text: len(get_encoding().encode_ordinary(text)))
+
+    def deduplicate(self, translation_map: TranslationMap) -> DedupResult:
+        first_id_by_text: dict[str, str] = {}
+        canonical_of: dict[str, str] = {}
+        unique_ids, unique_texts = [], []
+        saved_tokens = 0
+
+        for ref_id, text in translation_map.items():
+            canonical_id = first_id_by_text.setdefault(normalize_text(text), ref_id)
+            if canonical_id == ref_id:
+                unique_ids.append(ref_id)
+                unique_texts.append(text)
+            else:
+                canonical_of[ref_id] = canonical_id
+                saved_tokens += saved_element_tokens(ref_id, text, self.count_tokens)
+
+        report = DedupReport(
+            total_elements=len(translation_map),
+            unique_elements=len(unique_ids),
+            duplicate_elements=len(canonical_of),
+            saved_tokens=saved_tokens,
+        )
+        logger.info(
+            f"Dedup: {report.duplicate_elements} of {report.total_elements} elements are repeats "
+            f"(~{report.saved_tokens} tokens saved)."
+        )
+        return DedupResult(
+            TranslationMap.from_columns(unique_ids, unique_texts),
+            canonical_of,
+            translation_map.ids,
+            report,
+        )
@@ -0,0 +1,60 @@
+import logging
+from difflib import SequenceMatcher
+from models.translation import TranslationMap
+from models.report import EditionDiffReport
+from utils.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class EditionDiff:
+    """Translations carried over from the previous edition, by id of the new one."""
+    def __init__(self, reused: dict[str, str], hints: dict[str, tuple[str, str]], report: EditionDiffReport):
+        self.reused = reused
+        # Edited paragraphs travel with their previous (source, translation) as an example
+        self.hints = hints
+        self.report = report
+
+
+class EditionAligner:
+    """
+    Aligns the elements of a new edition of a document with the previous run's
+    (id, source, translation) rows by content and order, LCS-style (difflib), so
+    positional ids that shifted by an inserted or deleted paragraph still line up.
+    Unchanged paragraphs keep their translation; paragraphs paired inside a changed
+    region count as edited when they are still at least `similarity` alike.
+    """
+    def __init__(self, similarity: float = 0.5):
+        self.similarity = similarity
+
+    def align(self, previous: list[tuple[str, str, str]], current: TranslationMap) -> EditionDiff:
+        old = [normalize_text(source) for _, source, _ in previous]
+        new = [normalize_text(text) for text in current.texts]
+        reused: dict[str, str] = {}
+        hints: dict[str, tuple[str, str]] = {}
+        report = EditionDiffReport()
+
+        matcher = SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    reused[current.ids[j]] = previous[i][2]
+                report.unchanged += i2 - i1
+                continue
+
+            # replace/insert/delete: pair the changed paragraphs in order
+            paired = 0
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                if SequenceMatcher(None, old[i], new[j]).ratio() >= self.similarity:
+                    _, source, translation = previous[i]
+                    hints[current.ids[j]] = (source, translation)
+                    report.edited += 1
+                    paired += 1
+            report.added += (j2 - j1) - paired
+            report.removed += (i2 - i1) - paired
+
+        logger.info(
+            f"Edition diff: {report.unchanged} unchanged, {report.edited} edited, "
+            f"{report.added} added, {report.removed} removed."
+        )
+        return EditionDiff(reused, hints, report)
@@ -0,0 +1,302 @@
+import copy
+import logging
+import os
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, suppress
+from itertools import repeat
+from typing import Callable
+from core.epub_processor import EpubProcessor
+from core.translation_service import TranslationService
+from core.dedup import Deduplicator
+from core.edition_diff import EditionAligner
+from core.segment_filter import SegmentFilter
+from core.telemetry import telemetry
+from models.report import PipelineReport
+from models.translation import TranslationMap
+from utils.epub_utils import list_document_paths, count_map_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# --- Process-pool workers (module level so they can be pickled) ---
+
+# Each also returns the worker's telemetry, merged into the parent's by the pipeline
+
+def init_worker():
+    # Forked workers inherit whatever the parent had recorded; start from zero
+    telemetry.reset()
+
+
+def extract_document(raw: bytes, parser: str) -> tuple[str | None, list[tuple[str, str]], tuple]:
+    """Extracts one document with document-local IDs; returns (skeleton html, [(id, text)], telemetry)."""
+    skeleton, t_map = EpubProcessor(parser).extract_structure(raw.decode("utf-8"), start=1)
+    if not t_map:
+        return None, [], telemetry.collect()
+    skeleton_html = skeleton.encode(formatter="minimal").decode("utf-8")
+    return skeleton_html, list(t_map.items()), telemetry.collect()
+
+
+def rebuild_document(skeleton_html: str, translations: list[tuple[str, str]], parser: str) -> tuple[bytes, tuple]:
+    """Rebuilds one document from its skeleton and (document-local id, text) pairs."""
+    translated = TranslationMap.from_pairs(translations)
+    processor = EpubProcessor(parser)
+    content = processor.rebuild_html(processor.parse_document(skeleton_html), translated).encode("utf-8")
+    return content, telemetry.collect()
+
+
+def _load(zin: zipfile.ZipFile, path: str) -> bytes:
+    with telemetry.timer("load"):
+        return zin.read(path)
+
+
+class EpubTranslationPipeline:
+    """
+    Streams an EPUB through extract -> translate -> rebuild one document at a time and
+    writes a new EPUB (or one per target language) next to it. Every other member (OPF manifest and metadata, CSS,
+    images, fonts...) is copied byte for byte, so peak memory is bounded by the largest
+    chapter rather than the whole book.
+    """
+    def __init__(
+        self,
+        processor: EpubProcessor,
+        service: TranslationService,
+        deduplicator: Deduplicator | None = None,
+        count_tokens: Callable[[TranslationMap], int] = count_map_tokens,
+        workers: int = 1,
+        segment_filter: SegmentFilter | None = None,
+        aligner: EditionAligner | None = None,
+    ):
+        self.processor = processor
+        self.service = service
+        self.deduplicator = deduplicator or Deduplicator()
+        self.count_tokens = count_tokens
+        # workers > 1 parses and rebuilds documents on a process pool; translation
+        # (network) stays in this process
+        self.workers = workers
+        # None sends every element; a SegmentFilter passes non-translatable ones through
+        self.segment_filter = segment_filter
+        self.aligner = aligner or EditionAligner()
+
+    def run(
+        self,
+        input_path: str,
+        output_path: str,
+        target_lang: str,
+        book_id: str | None = None,
+        use_cache: bool = True,
+        resume: bool = False,
+        previous_book_id: str | None = None,
+    ) -> PipelineReport:
+        """
+        With `previous_book_id` (the book id of an earlier edition's run), each document is
+        aligned with that run's translations: unchanged paragraphs are reused, edited ones
+        are sent with their old translation as an example, and only the diff is paid for.
+        """
+        reports = self.run_languages(input_path, {target_lang: output_path}, book_id, use_cache, resume, previous_book_id)
+        return reports[target_lang]
+
+    def run_languages(
+        self,
+        input_path: str,
+        output_paths: dict[str, str],
+        book_id: str | None = None,
+        use_cache: bool = True,
+        resume: bool = False,
+        previous_book_id: str | None = None,
+    ) -> dict[str, PipelineReport]:
+        """
+        Fan-out: every document is read and extracted once, then translated into all the
+        languages of `output_paths` ({language: output EPUB}) concurrently, sharing the
+        client (and therefore its rate limiter) and the cache, and rebuilt once per language.
+        """
+        book_id = book_id or input_path
+        reports = {lang: PipelineReport() for lang in output_paths}
+        partial_paths = {lang: f"{path}.part" for lang, path in output_paths.items()}
+
+        try:
+            with ExitStack() as stack:
+                zin = stack.enter_context(zipfile.ZipFile(input_path))
+                zouts = {
+                    lang: stack.enter_context(zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED))
+                    for lang, partial in partial_paths.items()
+                }
+                # OCF requires 'mimetype' to be the first entry, stored uncompressed
+                if "mimetype" in zin.namelist():
+                    for zout in zouts.values():
+                        zout.writestr(zipfile.ZipInfo("mimetype"), zin.read("mimetype"), compress_type=zipfile.ZIP_STORED)
+
+                documents = list_document_paths(zin)
+                for report in reports.values():
+                    report.documents = len(documents)
+                translate_args = (book_id, use_cache, resume, previous_book_id, reports)
+                if self.workers > 1:
+                    self._run_parallel(zin, zouts, documents, *translate_args)
+                else:
+                    next_id = 1
+                    for path in documents:
+                        contents, extracted = self._translate_document(_load(zin, path), path, next_id, *translate_args)
+                        next_id += extracted
+                        for lang, zout in zouts.items():
+                            zout.writestr(copy.copy(zin.getinfo(path)), contents[lang])
+
+                handled = set(documents) | {"mimetype"}
+                for info in zin.infolist():
+                    if info.filename not in handled:
+                        for zout in zouts.values():
+                            # Writing fills in offsets/sizes on the ZipInfo: one copy per archive
+                            with zin.open(info) as src, zout.open(copy.copy(info), "w") as dst:
+                                while chunk := src.read(1 << 20):
+                                    dst.write(chunk)
+        except BaseException:
+            # Nothing half-written is left next to the outputs (one .part per language)
+            for partial in partial_paths.values():
+                with suppress(FileNotFoundError):
+                    os.remove(partial)
+            raise
+
+        for lang, output_path in output_paths.items():
+            os.replace(partial_paths[lang], output_path)
+            report = reports[lang]
+            logger.info(
+                f"Wrote {output_path}: {report.translated_documents}/{report.documents} documents, "
+                f"{report.elements} elements translated."
+            )
+        return reports
+
+    def _translate_document(
+        self, raw: bytes, path: str, start: int, book_id: str, use_cache: bool, resume: bool,
+        previous_book_id: str | None, reports: dict[str, PipelineReport],
+    ) -> tuple[dict[str, bytes], int]:
+        """Returns the rebuilt document per language and how many elements were extracted from it."""
+        skeleton, t_map = self.processor.extract_structure(raw.decode("utf-8"), start=start)
+        if not t_map:
+            # Covers, image-only pages... are kept exactly as they were
+            return {lang: raw for lang in reports}, 0
+
+        translations = self._translate_languages(t_map, path, book_id, use_cache, resume, previous_book_id, reports)
+        contents = {}
+        for n, (lang, translated) in enumerate(translations.items(), start=1):
+            # Rebuilding consumes the skeleton; every language but the last gets a copy
+            tree = skeleton if n == len(translations) else copy.copy(skeleton)
+            contents[lang] = self.processor.rebuild_html(tree, translated).encode("utf-8")
+        return contents, len(t_map)
+
+    def _run_parallel(
+        self, zin: zipfile.ZipFile, zouts: dict[str, zipfile.ZipFile], documents: list[str],
+        book_id: str, use_cache: bool, resume: bool, previous_book_id: str | None,
+        reports: dict[str, PipelineReport],
+    ):
+        """
+        Extracts every document on the pool, translates them in spine order here, and
+        hands each translated document back to the pool for reconstruction while the
+        next one is being translated. Workers number elements from 1 within their
+        document; global IDs are assigned here by spine-order offsets, so they are
+        identical to a sequential run.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as pool:
+            parser = self.processor.parser
+            extracted = pool.map(extract_document, (_load(zin, path) for path in documents), repeat(parser))
+            rebuilds: list[tuple[str, dict[str, Future | bytes]]] = []
+            offset = 0
+            for path, (skeleton_html, local_elements, worker_telemetry) in zip(documents, extracted):
+                telemetry.merge(worker_telemetry)
+                if skeleton_html is None:
+                    raw = _load(zin, path)
+                    rebuilds.append((path, {lang: raw for lang in zouts}))
+                    continue
+
+                global_ids = [self.processor.placeholder_fmt.format(offset + n) for n in range(1, len(local_elements) + 1)]
+                local_of = {g: local_id for g, (local_id, _) in zip(global_ids, local_elements)}
+                offset += len(local_elements)
+                t_map = TranslationMap.from_columns(global_ids, [text for _, text in local_elements])
+
+                translations = self._translate_languages(
+                    t_map, path, book_id, use_cache, resume, previous_book_id, reports
+                )
+                rebuilds.append((path, {
+                    lang: pool.submit(
+                        rebuild_document, skeleton_html, [(local_of[i], text) for i, text in translated.items()], parser
+                    )
+                    for lang, translated in translations.items()
+                }))
+
+            for path, contents in rebuilds:
+                for lang, content in contents.items():
+                    if isinstance(content, Future):
+                        content, worker_telemetry = content.result()
+                        telemetry.merge(worker_telemetry)
+                    zouts[lang].writestr(copy.copy(zin.getinfo(path)), content)
+
+    def _translate_languages(
+        self, t_map: TranslationMap, path: str, book_id: str, use_cache: bool, resume: bool,
+        previous_book_id: str | None, reports: dict[str, PipelineReport],
+    ) -> dict[str, TranslationMap]:
+        """Translates one extracted document into every language, concurrently when there are several."""
+        if len(reports) == 1:
+            (lang, report), = reports.items()
+            return {lang: self._translate_map(t_map, path, book_id, lang, use_cache, resume, previous_book_id, report)}
+
+        with ThreadPoolExecutor(max_workers=len(reports), thread_name_prefix="language") as executor:
+            futures = {
+                lang: executor.submit(
+                    self._translate_map, t_map, path, book_id, lang, use_cache, resume, previous_book_id, report
+                )
+                for lang, report in reports.items()
+            }
+            return {lang: future.result() for lang, future in futures.items()}
+
+    def _translate_map(
+        self, t_map: TranslationMap, path: str, book_id: str, target_lang: str,
+        use_cache: bool, resume: bool, previous_book_id: str | None, report: PipelineReport,
+    ) -> TranslationMap:
+        logger.info(f"Translating {path} ({len(t_map)} elements)...")
+        report.elements += len(t_map)
+        reuse: dict[str, str] = {}
+        hints: dict[str, tuple[str, str]] = {}
+        if previous_book_id:
+            previous = self.service.cache.get_book_segments(
+                f"{previous_book_id}::{path}", self.service.client.model, target_lang
+            )
+            diff = self.aligner.align(previous, t_map)
+            reuse, hints = diff.reused, diff.hints
+            report.unchanged_elements += diff.report.unchanged
+            report.edited_elements += diff.report.edited
+            report.added_elements += diff.report.added
+            report.removed_elements += diff.report.removed
+
+        filtered = None
+        if self.segment_filter:
+            filtered = self.segment_filter.filter(t_map, target_lang)
+            report.skipped_elements += filtered.report.skipped_elements
+            report.filter_saved_tokens += filtered.report.saved_tokens
+            t_map = filtered.to_translate
+
+        dedup = self.deduplicator.deduplicate(t_map)
+        report.duplicate_elements += dedup.report.duplicate_elements
+        report.dedup_saved_tokens += dedup.report.saved_tokens
+        # Reused paragraphs cost nothing; only the rest is estimated
+        to_send = TranslationMap.from_pairs(item for item in dedup.unique_map.items() if item[0] not in reuse)
+        tokens = self.count_tokens(to_send)
+        compressor = self.service.compressor
+        report.estimated_tokens += tokens
+        report.estimated_tokens_compressed += (
+            self.count_tokens(compressor.compress_map(to_send)) if compressor else tokens
+        )
+
+        def count_untranslated(ids: list[str]):
+            report.untranslated_elements += len(ids)
+
+        translated = self.service.translate(
+            book_id=f"{book_id}::{path}",
+            to_translate=dedup.unique_map,
+            target_lang=target_lang,
+            use_cache=use_cache,
+            resume=resume,
+            reuse=reuse,
+            hints=hints,
+            on_untranslated=count_untranslated,
+        )
+        report.translated_documents += 1
+        translated = dedup.expand(translated)
+        return filtered.merge(translated) if filtered else translated
@@ -1,52 +1,103 @@
-from bs4 import BeautifulSoup
-from models.translation import TranslationMapElement, TranslationMap
-from core.config import settings
+import re
+from bs4 import BeautifulSoup, ProcessingInstruction, Tag
+from models.translation import TranslationMap
+from core.config import get_settings
+from core.telemetry import telemetry
+
+# Container used to parse all translated fragments in a single pass
+FRAGMENT_TAG = "tp-fragment"
+
+# Document parser backend -> parser used for translated fragments. The XML parser
+# keeps XHTML case (e.g. SVG viewBox) but cannot cope with HTML entities or unclosed
+# tags in LLM output, so fragments always go through an HTML parser.
+PARSER_BACKENDS = {
+    "html.parser": "html.parser",
+    "lxml": "lxml",
+    "lxml-xml": "lxml",
+}
+
+_XML_DECLARATION = re.compile(r"^\s*<\?xml\b(.*?)\?>", re.DOTALL)
 
 
 class EpubProcessor:
-    def __init__(self):
+    def __init__(self, parser: str | None = None):
+        settings = get_settings()
         self.placeholder_fmt = settings.placeholder_fmt
         self.target_tags = settings.target_tags
+        self.parser = parser or settings.html_parser
+        if self.parser not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{self.parser}'. Options: {', '.join(PARSER_BACKENDS)}")
+        self.fragment_parser = PARSER_BACKENDS[self.parser]
 
-    def extract_structure(self, html_content: str) -> tuple[BeautifulSoup, TranslationMap]:
+    def parse_document(self, html_content: str) -> BeautifulSoup:
+        """Parses a whole document with the configured backend."""
+        if self.parser != "lxml":
+            return BeautifulSoup(html_content, self.parser)
+        # lxml's HTML parser would turn the XML declaration into a comment; keep it as-is
+        declaration = _XML_DECLARATION.match(html_content)
+        if not declaration:
+            return BeautifulSoup(html_content, self.parser)
+        soup = BeautifulSoup(html_content[declaration.end():], self.parser)
+        soup.insert(0, ProcessingInstruction(f"xml{declaration.group(1)}?"))
+        return soup
+
+    @telemetry.timed("extract")
+    def extract_structure(self, html_content: str, start: int = 1) -> tuple[BeautifulSoup, TranslationMap]:
         """
-        Deconstructs HTML into a skeleton and a Pydantic model for translation.
+        Deconstructs HTML into a skeleton and a TranslationMap for translation.
+        `start` is the first placeholder number, so documents processed one at a time
+        still get book-wide unique IDs.
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
-        elements = []
-        counter = 1
+        soup = self.parse_document(html_content)
+        ids, texts = [], []
+        counter = start
 
         for tag in soup.find_all(self.target_tags):
             # We check if it has actual text to avoid translating empty tags
             if tag.get_text(strip=True):
                 ref_id = self.placeholder_fmt.format(counter)
-                
-                # Create the Pydantic element
-                element = TranslationMapElement(
-                    id=ref_id,
-                    text=tag.decode_contents().strip()
-                )
-                elements.append(element)
-                
+                ids.append(ref_id)
+                texts.append(tag.decode_contents().strip())
+
                 # Replace content with ID in the skeleton
                 tag.string = ref_id
                 counter += 1
 
-        return soup, TranslationMap(elements=elements)
+        return soup, TranslationMap.from_columns(ids, texts)
 
+    @telemetry.timed("rebuild")
     def rebuild_html(self, skeleton: BeautifulSoup, translated: TranslationMap) -> str:
         """
         Reconstructs the HTML by mapping IDs back to translated text.
+        Placeholders are located in a single walk of the skeleton and all translated
+        fragments are parsed together, so the cost stays linear in the document size.
         """
         # Mapping for O(1) lookup during reconstruction
-        translation_lookup = {el.id: el.text for el in translated.elements}
-
-        # We find all text nodes that match our placeholder pattern
-        for ref_id, translated_text in translation_lookup.items():
-            node = skeleton.find(string=ref_id)
-            if node:
-                # Parse translated text back to HTML nodes
-                new_content = BeautifulSoup(translated_text, 'html.parser')
-                node.replace_with(new_content)
-        
-        return skeleton.encode(formatter="minimal").decode('utf-8')
\ No newline at end of file
+        translation_lookup = translated.as_dict()
+
+        # One pass over the text nodes instead of one full-tree search per ID
+        placeholders = [node for node in skeleton.find_all(string=True) if node in translation_lookup]
+        fragments = self._parse_fragments({str(node): translation_lookup[node] for node in placeholders})
+
+        for node in placeholders:
+            fragment = fragments.get(str(node))
+            if fragment is not None:
+                node.replace_with(*list(fragment.contents))
+
+        return skeleton.encode(formatter="minimal").decode('utf-8')
+
+    def _parse_fragments(self, texts: dict[str, str]) -> dict[str, Tag]:
+        """
+        Parses every translated fragment in one BeautifulSoup call. Each fragment is
+        wrapped in its own container; closing the container also closes any tag the
+        LLM left open, so one malformed fragment cannot leak into the next.
+        """
+        if not texts:
+            return {}
+        document = "".join(
+            f'<{FRAGMENT_TAG} data-ref="{ref_id}">{text}</{FRAGMENT_TAG}>'
+            for ref_id, text in texts.items()
+        )
+        soup = BeautifulSoup(document, self.fragment_parser)
+        # lxml nests the wrappers under <html><body>, so they are not always top-level
+        return {wrapper["data-ref"]: wrapper for wrapper in soup.find_all(FRAGMENT_TAG)}
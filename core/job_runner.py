@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from core.epub_pipeline import EpubTranslationPipeline
+from core.protocols import JobStore, TranslatorClient
+from core.scheduler import FairScheduler, ScheduledClient
+from models.job import BookJob, JobRecord
+
+logger = logging.getLogger(__name__)
+
+# Jobs that still have work to do; 'running' means a previous process died mid-book and
+# 'incomplete' that some elements were left untranslated (the run journal resumes them)
+PENDING_STATUSES = ["queued", "running", "failed", "incomplete"]
+
+
+def output_paths(job: BookJob) -> dict[str, str]:
+    root, ext = os.path.splitext(job.input_path)
+    return {lang: f"{root}.{lang}{ext}" for lang in job.languages}
+
+
+def discover_books(sources: list[str], languages: list[str], priority: int = 0) -> list[BookJob]:
+    """
+    Expands EPUB files, directories (searched recursively) and JSON manifests into jobs.
+    A manifest is a list of {"path": ..., "languages": [...], "priority": n}; paths are
+    relative to the manifest and missing fields fall back to the command line values.
+    Translated outputs (<book>.<language>.epub) found in directories are skipped.
+    Every path is made absolute, so the same book keeps one job (and one run journal)
+    whatever the working directory or the way it was listed.
+    """
+    jobs = []
+    for source in sources:
+        if os.path.isdir(source):
+            for folder, _, files in sorted(os.walk(source)):
+                for name in sorted(files):
+                    if name.endswith(".epub") and not any(name.endswith(f".{lang}.epub") for lang in languages):
+                        jobs.append(BookJob(
+                            input_path=os.path.abspath(os.path.join(folder, name)), languages=languages, priority=priority
+                        ))
+        elif source.endswith(".json"):
+            with open(source, encoding="utf-8") as f:
+                entries = json.load(f)
+            base = os.path.dirname(os.path.abspath(source))
+            for entry in entries:
+                jobs.append(BookJob(
+                    input_path=os.path.abspath(os.path.join(base, entry["path"])),
+                    languages=entry.get("languages", languages),
+                    priority=entry.get("priority", priority),
+                ))
+        else:
+            jobs.append(BookJob(input_path=os.path.abspath(source), languages=languages, priority=priority))
+    return jobs
+
+
+class JobRunner:
+    """
+    Runs a catalogue of books. Up to `parallel_books` books are parsed and rebuilt at
+    the same time, while every API batch of every book goes through one FairScheduler,
+    so `api_workers` requests stay in flight across the whole catalogue. Job status
+    lives in the store; element-level progress in the run journal, so an interrupted
+    catalogue picks up where it stopped.
+    """
+    def __init__(
+        self,
+        store: JobStore,
+        client: TranslatorClient,
+        pipeline_factory: Callable[[TranslatorClient], EpubTranslationPipeline],
+        api_workers: int,
+        parallel_books: int = 2,
+    ):
+        self.store = store
+        self.client = client
+        self.pipeline_factory = pipeline_factory
+        self.api_workers = api_workers
+        self.parallel_books = parallel_books
+
+    def enqueue(self, books: list[BookJob]) -> list[int]:
+        return [self.store.enqueue_job(book.input_path, book.languages, book.priority) for book in books]
+
+    def run(self, use_cache: bool = True) -> list[JobRecord]:
+        """Processes every pending job; returns the final status of all jobs."""
+        pending = self.store.get_jobs(PENDING_STATUSES)
+        logger.info(f"Catalogue run: {len(pending)} pending books, {self.api_workers} API workers.")
+        with FairScheduler(self.api_workers) as scheduler, \
+                ThreadPoolExecutor(max_workers=max(1, self.parallel_books), thread_name_prefix="book") as books:
+            for future in [books.submit(self._run_job, job, scheduler, use_cache) for job in pending]:
+                future.result()
+        return self.store.get_jobs()
+
+    def _run_job(self, job: JobRecord, scheduler: FairScheduler, use_cache: bool):
+        self.store.set_job_status(job.job_id, "running")
+        client = ScheduledClient(self.client, scheduler.lane(job.input_path, job.priority))
+        try:
+            # resume=True continues the journaled run left behind by an interrupted attempt
+            reports = self.pipeline_factory(client).run_languages(
+                job.input_path, output_paths(job), use_cache=use_cache, resume=True
+            )
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.input_path}) failed: {e}", exc_info=True)
+            self.store.set_job_status(job.job_id, "failed", error=str(e))
+            return
+        untranslated = {
+            lang: report.untranslated_elements for lang, report in reports.items() if report.untranslated_elements
+        }
+        if untranslated:
+            error = ", ".join(f"{lang}: {count}" for lang, count in untranslated.items())
+            logger.warning(f"Job {job.job_id} ({job.input_path}) left elements untranslated ({error}).")
+            self.store.set_job_status(job.job_id, "incomplete", error=f"Untranslated elements ({error})")
+            return
+        self.store.set_job_status(job.job_id, "completed")
+        logger.info(f"Job {job.job_id} ({job.input_path}) completed.")
@@ -0,0 +1,68 @@
+import re
+from collections import Counter
+from models.translation import TranslationMap
+
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w:-]*)(\s[^<>]*?)?\s*(/?)>")
+_PLACEHOLDER = re.compile(r"<(/?)x(\d+)(/?)>")
+
+
+class MarkupCompressor:
+    """
+    Reversible inline-markup compression. Tags carrying attributes
+    (`<span class="calibre12">`, `<a href="...">`) become short numbered placeholders
+    (`<x1>...</x1>`, `<x2/>`); bare tags such as `<i>` are already cheap and stay as-is.
+    Numbering is local to each element, so the compressed text only depends on the
+    source text and restoration needs no stored table.
+    """
+    def compress(self, text: str) -> str:
+        compressed, _ = self._encode(text)
+        return compressed
+
+    def restore(self, source_text: str, translated: str) -> str:
+        """Expands the placeholders of a translated text using its original source."""
+        _, table = self._encode(source_text)
+
+        def expand(match: re.Match) -> str:
+            closing, number, self_closing = match.groups()
+            original = table.get(int(number))
+            if original is None:
+                return ""  # Placeholder invented by the model
+            open_tag, name = original
+            if closing:
+                return f"</{name}>"
+            return open_tag
+
+        return _PLACEHOLDER.sub(expand, translated)
+
+    def compress_map(self, translation_map: TranslationMap) -> TranslationMap:
+        # The ids list is shared: maps are never modified in place
+        return TranslationMap.from_columns(translation_map.ids, [self.compress(text) for text in translation_map.texts])
+
+    @staticmethod
+    def placeholders(text: str) -> Counter:
+        return Counter(match.group(0) for match in _PLACEHOLDER.finditer(text))
+
+    def _encode(self, text: str) -> tuple[str, dict[int, tuple[str, str]]]:
+        table: dict[int, tuple[str, str]] = {}
+        open_stacks: dict[str, list[int | None]] = {}
+
+        def replace(match: re.Match) -> str:
+            closing, name, attributes, self_closing = match.groups()
+            name = name.lower()
+            if closing:
+                stack = open_stacks.get(name)
+                number = stack.pop() if stack else None
+                return f"</x{number}>" if number else match.group(0)
+            if not attributes or not attributes.strip():
+                if not self_closing:
+                    open_stacks.setdefault(name, []).append(None)
+                return match.group(0)
+            number = len(table) + 1
+            table[number] = (match.group(0), name)
+            if self_closing:
+                return f"<x{number}/>"
+            open_stacks.setdefault(name, []).append(number)
+            return f"<x{number}>"
+
+        return _TAG.sub(replace, text), table
+
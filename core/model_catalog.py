@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from core.config import get_settings
+from models.model_info import ModelInfo
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the meaning of a cached field changes, so older files are re-downloaded
+CACHE_FORMAT = 2
+
+
+class ModelCatalog:
+    """
+    OpenRouter model metadata (pricing, context length, max output tokens) cached in a
+    JSON file. A cache younger than `ttl_seconds` is used as it is; a stale one is used
+    too while a background thread downloads /models again, so only the very first run
+    (or a different API base URL) waits on the network. A failed download keeps
+    whatever was cached.
+    """
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl_seconds: float | None = None,
+        base_url: str | None = None,
+        session=None,
+    ):
+        settings = get_settings()
+        self.path = path or settings.model_cache_path
+        self.ttl_seconds = settings.model_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.base_url = base_url or settings.openrouter_base_url
+        self.session = session
+        self.models: dict[str, ModelInfo] = {}
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+        self._load()
+
+    def get(self, model: str) -> ModelInfo | None:
+        """Metadata of `model`, or None when OpenRouter does not list it (or was never reached)."""
+        if not self.fetched_at:
+            self.refresh()
+        elif time.time() - self.fetched_at > self.ttl_seconds:
+            self._refresh_in_background()
+        with self._lock:
+            return self.models.get(model)
+
+    def refresh(self) -> bool:
+        """Downloads /models and rewrites the cache file; returns whether it succeeded."""
+        try:
+            response = self._session().get(f"{self.base_url}/models", timeout=30)
+            response.raise_for_status()
+            models = {
+                entry["id"]: self._parse(entry) for entry in response.json().get("data", []) if "id" in entry
+            }
+        except Exception as e:
+            logger.warning(f"Could not refresh the model catalogue from {self.base_url}: {e}")
+            return False
+        with self._lock:
+            self.models = models
+            self.fetched_at = time.time()
+            self._save()
+        logger.info(f"Model catalogue refreshed: {len(models)} models.")
+        return True
+
+    def wait(self, timeout: float | None = None):
+        """Waits for a background refresh in progress, if any."""
+        refresher = self._refresher
+        if refresher is not None:
+            refresher.join(timeout)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            # Daemon: a refresh never holds up the end of a run
+            self._refresher = threading.Thread(target=self.refresh, name="model-catalogue", daemon=True)
+            self._refresher.start()
+
+    def _session(self):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        return self.session
+
+    @staticmethod
+    def _parse(entry: dict) -> ModelInfo:
+        # /models reports USD per token, as decimal strings
+        pricing = entry.get("pricing") or {}
+        top_provider = entry.get("top_provider") or {}
+        return ModelInfo(
+            id=entry["id"],
+            price_prompt_1m=float(pricing.get("prompt") or 0) * 1_000_000,
+            price_completion_1m=float(pricing.get("completion") or 0) * 1_000_000,
+            context_length=entry.get("context_length") or top_provider.get("context_length"),
+            max_output_tokens=top_provider.get("max_completion_tokens"),
+        )
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable model catalogue cache {self.path}: {e}")
+            return
+        # A cache written for another endpoint (e.g. a local mock) says nothing about this one
+        if data.get("format") != CACHE_FORMAT or data.get("base_url") != self.base_url:
+            return
+        self.models = {model_id: ModelInfo(**info) for model_id, info in data.get("models", {}).items()}
+        self.fetched_at = data.get("fetched_at", 0.0)
+
+    def _save(self):
+        data = {
+            "format": CACHE_FORMAT,
+            "base_url": self.base_url,
+            "fetched_at": self.fetched_at,
+            "models": {model_id: info.model_dump() for model_id, info in self.models.items()},
+        }
+        partial = f"{self.path}.part"
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(partial, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write the model catalogue cache {self.path}: {e}")
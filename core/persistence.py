@@ -1,38 +1,357 @@
 import sqlite3
+import threading
+from datetime import datetime, timezone
 from models.translation import TranslationMapElement
-from core.config import settings
+from models.job import JobRecord
+from core.config import get_settings
+from core.telemetry import telemetry
+
+# SQLite's default limit of host parameters per statement is 999 on older builds
+SQLITE_MAX_VARIABLES = 900
+# Positional rows written before the cache was keyed by language were all Spanish
+LEGACY_TARGET_LANG = "spanish"
+
 
 class TranslationCache:
-    def __init__(self, db_path: str = settings.database_path):
-        self.db_path = db_path
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path or get_settings().database_path
+        # Long-lived connection shared by every call (and every worker thread)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._configure()
         self._create_table()
 
+    def _configure(self):
+        """Tunes SQLite for a write-ahead-logged, read-heavy local cache."""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-64000")  # ~64 MB page cache
+        self._conn.execute("PRAGMA mmap_size=268435456")
+
     def _create_table(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        with self._lock, self._conn:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+            if columns and "target_lang" not in columns:
+                # The language joined the primary key: rebuild caches created before it
+                self._conn.execute("ALTER TABLE cache RENAME TO cache_unkeyed")
+            self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS cache (
                     id TEXT,
                     book_id TEXT,
                     model_name TEXT,
+                    target_lang TEXT NOT NULL,
                     text TEXT NOT NULL,
-                    PRIMARY KEY (id, book_id, model_name)
+                    source_hash TEXT,
+                    PRIMARY KEY (id, book_id, model_name, target_lang)
+                )
+            """)
+            if columns and "target_lang" not in columns:
+                # Caches created before content addressing also lack the source_hash column
+                source_hash = "source_hash" if "source_hash" in columns else "NULL"
+                self._conn.execute(
+                    f"INSERT INTO cache (id, book_id, model_name, target_lang, text, source_hash) "
+                    f"SELECT id, book_id, model_name, ?, text, {source_hash} FROM cache_unkeyed",
+                    (LEGACY_TARGET_LANG,)
+                )
+                self._conn.execute("DROP TABLE cache_unkeyed")
+            # Content-addressed entries: hash(normalized source, model, language, prompt version)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS content_cache (
+                    hash TEXT PRIMARY KEY,
+                    model_name TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    text TEXT NOT NULL
+                )
+            """)
+            # Translation memory: LSH band keys (and an exact key) per content_cache row
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory_index (
+                    key INTEGER NOT NULL,
+                    entry INTEGER NOT NULL,
+                    PRIMARY KEY (key, entry)
+                ) WITHOUT ROWID
+            """)
+            # Highest content_cache rowid already indexed (single row)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory_watermark (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    last_rowid INTEGER NOT NULL
+                )
+            """)
+            # Catalogue jobs: one row per book of a batch run (see core.job_runner)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    input_path TEXT NOT NULL,
+                    languages TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    UNIQUE (input_path, languages)
+                )
+            """)
+            # Run journal: one row per translation run plus the ids it has checkpointed
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    book_id TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    started_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
                 )
             """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS run_progress (
+                    run_id INTEGER,
+                    id TEXT,
+                    PRIMARY KEY (run_id, id)
+                )
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
 
-    def save_batch(self, book_id: str, model_name: str, elements: list[TranslationMapElement]):
-        """Saves a batch of translations linked to a specific book."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.executemany(
-                "INSERT OR REPLACE INTO cache (id, book_id, model_name, text) VALUES (?, ?, ?, ?)",
-                [(el.id, book_id, model_name, el.text) for el in elements]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @telemetry.timed("cache_write")
+    def save_batch(
+        self, book_id: str, model_name: str, target_lang: str, elements: list[TranslationMapElement],
+        source_hashes: dict[str, str] | None = None,
+    ):
+        """Saves a batch of translations linked to a specific book and language."""
+        source_hashes = source_hashes or {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (id, book_id, model_name, target_lang, text, source_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(el.id, book_id, model_name, target_lang, el.text, source_hashes.get(el.id)) for el in elements]
             )
 
-    def get_translation(self, book_id: str, model_name: str, ref_id: str) -> str | None:
-        """Retrieves text only if it matches both ID and Book."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                "SELECT text FROM cache WHERE id = ? AND book_id = ? AND model_name = ?", 
-                (ref_id, book_id, model_name)
+    def get_translation(self, book_id: str, model_name: str, target_lang: str, ref_id: str) -> str | None:
+        """Retrieves text only if it matches ID, Book and language."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT text FROM cache WHERE id = ? AND book_id = ? AND model_name = ? AND target_lang = ?",
+                (ref_id, book_id, model_name, target_lang)
             )
             row = cursor.fetchone()
-            return row[0] if row else None
\ No newline at end of file
+        return row[0] if row else None
+
+    @telemetry.timed("cache_lookup")
+    def get_many(
+        self, book_id: str, model_name: str, target_lang: str, ids: list[str],
+        source_hashes: dict[str, str] | None = None,
+    ) -> dict[str, str]:
+        """
+        Retrieves every cached translation among `ids` in a few chunked queries.
+        When `source_hashes` is given, rows recorded for a different source text
+        (e.g. ids shifted by a new edition) are ignored.
+        """
+        found = {}
+        ids = list(ids)
+        with self._lock:
+            for i in range(0, len(ids), SQLITE_MAX_VARIABLES):
+                chunk = ids[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT id, text, source_hash FROM cache "
+                    f"WHERE book_id = ? AND model_name = ? AND target_lang = ? AND id IN ({placeholders})",
+                    (book_id, model_name, target_lang, *chunk)
+                )
+                for ref_id, text, stored_hash in cursor:
+                    if source_hashes is None or stored_hash is None or stored_hash == source_hashes.get(ref_id):
+                        found[ref_id] = text
+        return found
+
+    def get_book_segments(self, book_id: str, model_name: str, target_lang: str) -> list[tuple[str, str, str]]:
+        """
+        Returns the (id, source_text, text) rows cached for a book in id order. Only rows
+        recorded with a source hash can be paired with their source text.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT c.id, cc.source_text, c.text FROM cache c "
+                "JOIN content_cache cc ON cc.hash = c.source_hash "
+                "WHERE c.book_id = ? AND c.model_name = ? AND c.target_lang = ? ORDER BY c.id",
+                (book_id, model_name, target_lang)
+            ).fetchall()
+
+    @telemetry.timed("cache_write")
+    def save_by_hash(self, model_name: str, target_lang: str, prompt_version: str, entries: list[tuple[str, str, str]]):
+        """Stores (hash, source_text, translated_text) entries in the content-addressed cache."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content_cache (hash, model_name, target_lang, prompt_version, source_text, text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(h, model_name, target_lang, prompt_version, source, text) for h, source, text in entries]
+            )
+
+    @telemetry.timed("cache_lookup")
+    def get_many_by_hash(self, hashes: list[str]) -> dict[str, str]:
+        """Retrieves translations by content hash, regardless of book or positional id."""
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            for i in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                chunk = hashes[i : i + SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT hash, text FROM content_cache WHERE hash IN ({placeholders})", chunk
+                )
+                found.update(cursor.fetchall())
+        return found
+
+    # --- Translation memory ---
+
+    def get_memory_watermark(self) -> int:
+        """Highest content_cache rowid already present in the memory index."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_rowid FROM memory_watermark WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def get_content_since(self, after_rowid: int, limit: int = 5000) -> list[tuple[int, str, str]]:
+        """Returns (rowid, target_lang, source_text) for content rows added after `after_rowid`."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT rowid, target_lang, source_text FROM content_cache WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (after_rowid, limit)
+            ).fetchall()
+
+    def save_memory_keys(self, keys: list[tuple[int, int]], watermark: int):
+        """Stores (key, content rowid) pairs and advances the watermark in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO memory_index (key, entry) VALUES (?, ?)", keys)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_watermark (id, last_rowid) VALUES (0, ?)", (watermark,)
+            )
+
+    @telemetry.timed("memory_lookup")
+    def find_memory_candidates(self, keys: list[int], limit: int) -> list[tuple[str, str, str, str, int]]:
+        """
+        Returns (source_text, text, model_name, prompt_version, shared keys) of the content
+        rows sharing the most keys with the query. Rows replaced since they were indexed
+        simply drop out of the join.
+        """
+        keys = list(keys)[:SQLITE_MAX_VARIABLES]
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT c.source_text, c.text, c.model_name, c.prompt_version, m.hits FROM ("
+                f"  SELECT entry, COUNT(*) AS hits FROM memory_index WHERE key IN ({placeholders})"
+                f"  GROUP BY entry ORDER BY hits DESC LIMIT ?"
+                f") m JOIN content_cache c ON c.rowid = m.entry",
+                (*keys, limit)
+            ).fetchall()
+
+    # --- Run journal ---
+
+    def start_run(self, book_id: str, model_name: str, target_lang: str, total: int) -> int:
+        """Registers a new run and returns its id."""
+        now = _utc_now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (book_id, model_name, target_lang, status, total, started_at, updated_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?, ?)",
+                (book_id, model_name, target_lang, total, now, now)
+            )
+            return cursor.lastrowid
+
+    def find_resumable_run(self, book_id: str, model_name: str, target_lang: str) -> int | None:
+        """Returns the most recent run for the book that did not complete."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE book_id = ? AND model_name = ? AND target_lang = ? "
+                "AND status != 'completed' ORDER BY run_id DESC LIMIT 1",
+                (book_id, model_name, target_lang)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_progress(self, run_id: int, ids: list[str]):
+        """Marks ids as checkpointed for the run and refreshes its progress counter."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO run_progress (run_id, id) VALUES (?, ?)",
+                [(run_id, ref_id) for ref_id in ids]
+            )
+            self._conn.execute(
+                "UPDATE runs SET completed = (SELECT COUNT(*) FROM run_progress WHERE run_id = ?), "
+                "status = 'running', updated_at = ? WHERE run_id = ?",
+                (run_id, _utc_now(), run_id)
+            )
+
+    def get_completed_ids(self, run_id: int) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM run_progress WHERE run_id = ?", (run_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def finish_run(self, run_id: int, status: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, _utc_now(), run_id)
+            )
+
+
+    # --- Catalogue jobs ---
+
+    def enqueue_job(self, input_path: str, languages: list[str], priority: int = 0) -> int:
+        """
+        Registers a book (idempotent per path and language set) and returns its job id.
+        Re-enqueueing an unfinished job updates its priority; completed jobs are left alone.
+        """
+        key = ",".join(languages)
+        now = _utc_now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (input_path, languages, priority, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?) "
+                "ON CONFLICT (input_path, languages) DO UPDATE SET priority = excluded.priority, "
+                "updated_at = excluded.updated_at WHERE jobs.status != 'completed'",
+                (input_path, key, priority, now, now)
+            )
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE input_path = ? AND languages = ?", (input_path, key)
+            ).fetchone()
+        return row[0]
+
+    def get_jobs(self, statuses: list[str] | None = None) -> list[JobRecord]:
+        """Jobs (optionally only those in `statuses`), highest priority first."""
+        query = "SELECT job_id, input_path, languages, priority, status, error, updated_at FROM jobs"
+        params: tuple = ()
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY priority DESC, job_id", params).fetchall()
+        return [
+            JobRecord(
+                job_id=job_id, input_path=path, languages=languages.split(","), priority=priority,
+                status=status, error=error, updated_at=updated_at,
+            )
+            for job_id, path, languages, priority, status, error, updated_at in rows
+        ]
+
+    def set_job_status(self, job_id: int, status: str, error: str | None = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, error, _utc_now(), job_id)
+            )
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
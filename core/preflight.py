@@ -0,0 +1,194 @@
+import json
+import logging
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from core.batching import TokenBatcher
+from core.config import get_settings
+from core.dedup import Deduplicator
+from core.epub_pipeline import init_worker
+from core.epub_processor import EpubProcessor
+from core.markup import MarkupCompressor
+from core.protocols import CacheRepository
+from core.segment_filter import SegmentFilter
+from core.telemetry import telemetry
+from models import api
+from models.report import BatchEstimate, ChapterEstimate, PreflightReport
+from models.translation import TranslationMap
+from prompts import get_prompt_version, get_system_prompt
+from utils.epub_utils import count_tokens_batch, list_document_paths
+from utils.text_utils import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Chat framing of each message plus the primer of the reply (OpenAI-style accounting)
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMER_TOKENS = 3
+# {"elements": [...]} around the returned elements
+RESPONSE_WRAPPER_TOKENS = 8
+
+
+def extract_texts(raw: bytes, parser: str) -> tuple[list[str], tuple]:
+    """Process-pool worker: the translatable texts of one document, plus the worker's telemetry."""
+    _, t_map = EpubProcessor(parser).extract_structure(raw.decode("utf-8"), start=1)
+    return t_map.texts, telemetry.collect()
+
+
+class PreflightEstimator:
+    """
+    Projects what translating a book will take before any request is made. The book
+    is extracted (on a process pool with workers > 1), filtered, deduplicated, checked
+    against the content cache and compressed as the pipeline would do it, then packed
+    with the model's real TokenBatcher; every request is charged its system prompt,
+    response schema and message framing on top of its elements. Token counts come
+    from batched tiktoken calls, so even very large books take seconds.
+
+    Paragraphs repeated across chapters are counted once: by the time a later chapter
+    is translated, the earlier translation is in the content cache.
+    """
+    def __init__(
+        self,
+        model: str | None = None,
+        price_prompt_1m: float = 0.0,
+        price_completion_1m: float = 0.0,
+        segment_filter: SegmentFilter | None = None,
+        deduplicator: Deduplicator | None = None,
+        compressor: MarkupCompressor | None = None,
+        cache: CacheRepository | None = None,
+        batch_size: int = 80,
+        workers: int = 1,
+        parser: str | None = None,
+        count_tokens: Callable[[str], int] | None = None,
+        context_length: int | None = None,
+        max_output_tokens: int | None = None,
+    ):
+        self.model = model or get_settings().default_model
+        self.price_prompt_1m = price_prompt_1m
+        self.price_completion_1m = price_completion_1m
+        self.segment_filter = segment_filter
+        self.deduplicator = deduplicator or Deduplicator()
+        self.compressor = compressor
+        self.cache = cache
+        self.batch_size = batch_size
+        self.workers = workers
+        self.processor = EpubProcessor(parser)
+        self.count_tokens = count_tokens
+        # Same limits as the client, so the batches match the ones it will send
+        self.context_length = context_length
+        self.max_output_tokens = max_output_tokens
+
+    def request_overhead(self, target_lang: str) -> int:
+        """Tokens every request pays besides its elements: system prompt, schema, framing."""
+        schema = json.dumps(api.RESPONSE_SCHEMA)
+        texts = [get_system_prompt(target_lang), schema]
+        prompt_tokens, schema_tokens = map(self.count_tokens, texts) if self.count_tokens else count_tokens_batch(texts)
+        return prompt_tokens + schema_tokens + 2 * TOKENS_PER_MESSAGE + REPLY_PRIMER_TOKENS
+
+    def estimate(self, input_path: str, target_lang: str) -> PreflightReport:
+        settings = get_settings()
+        with telemetry.timer("preflight"):
+            report = PreflightReport(
+                model=self.model, target_lang=target_lang, request_overhead_tokens=self.request_overhead(target_lang)
+            )
+            batcher = TokenBatcher.for_model(
+                settings, self.model, max_elements=self.batch_size, count_tokens=self.count_tokens,
+                context_length=self.context_length, max_output_tokens=self.max_output_tokens,
+            )
+            prompt_version = get_prompt_version(target_lang)
+            sent: set[str] = set()
+            for path, t_map in self._extract(input_path):
+                chapter = self._estimate_chapter(path, t_map, target_lang, prompt_version, batcher, report, sent)
+                report.chapters.append(chapter)
+                report.elements += chapter.elements
+                report.requests += len(chapter.batches)
+                report.input_tokens += chapter.input_tokens
+                report.output_tokens += chapter.output_tokens
+            self._project(report)
+        logger.info(
+            f"Preflight {input_path} -> {target_lang}: {report.elements_to_send}/{report.elements} elements in "
+            f"{report.requests} requests, {report.input_tokens}+{report.output_tokens} tokens, "
+            f"${report.cost_usd:.4f}, ~{report.seconds / 60:.1f} min ({report.bottleneck})."
+        )
+        return report
+
+    def _extract(self, input_path: str) -> list[tuple[str, TranslationMap]]:
+        """Every document with text, numbered book-wide in spine order like the pipeline."""
+        with zipfile.ZipFile(input_path) as zin:
+            documents = list_document_paths(zin)
+            if self.workers > 1:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as pool:
+                    extracted = []
+                    for texts, worker_telemetry in pool.map(
+                        extract_texts, (zin.read(path) for path in documents), repeat(self.processor.parser)
+                    ):
+                        telemetry.merge(worker_telemetry)
+                        extracted.append(texts)
+            else:
+                extracted = [
+                    self.processor.extract_structure(zin.read(path).decode("utf-8"))[1].texts
+                    for path in documents
+                ]
+
+        maps = []
+        offset = 0
+        for path, texts in zip(documents, extracted):
+            if not texts:
+                continue
+            ids = [self.processor.placeholder_fmt.format(offset + n) for n in range(1, len(texts) + 1)]
+            maps.append((path, TranslationMap.from_columns(ids, texts)))
+            offset += len(texts)
+        return maps
+
+    def _estimate_chapter(
+        self, path: str, t_map: TranslationMap, target_lang: str, prompt_version: str,
+        batcher: TokenBatcher, report: PreflightReport, sent: set[str],
+    ) -> ChapterEstimate:
+        chapter = ChapterEstimate(path=path, elements=len(t_map))
+        if self.segment_filter:
+            filtered = self.segment_filter.filter(t_map, target_lang)
+            chapter.skipped_elements = filtered.report.skipped_elements
+            t_map = filtered.to_translate
+        dedup = self.deduplicator.deduplicate(t_map)
+        chapter.duplicate_elements = dedup.report.duplicate_elements
+
+        unique = dedup.unique_map
+        hashes = [content_hash(text, self.model, target_lang, prompt_version) for text in unique.texts]
+        cached = self.cache.get_many_by_hash(list(set(hashes))) if self.cache else {}
+        to_send = TranslationMap.from_pairs(
+            item for item, h in zip(unique.items(), hashes) if h not in cached and h not in sent
+        )
+        chapter.cached_elements = len(unique) - len(to_send)
+        sent.update(h for h in hashes if h not in cached)
+        report.elements_to_send += len(to_send)
+
+        if self.compressor:
+            to_send = self.compressor.compress_map(to_send)
+        for batch in batcher.pack_sized(to_send.elements):
+            tokens = [n for _, n in batch]
+            chapter.batches.append(BatchEstimate(
+                elements=len(batch),
+                input_tokens=sum(tokens) + report.request_overhead_tokens,
+                output_tokens=sum(batcher.output_tokens(n) for n in tokens) + RESPONSE_WRAPPER_TOKENS,
+            ))
+        chapter.input_tokens = sum(b.input_tokens for b in chapter.batches)
+        chapter.output_tokens = sum(b.output_tokens for b in chapter.batches)
+        return chapter
+
+    def _project(self, report: PreflightReport):
+        """Cost from the model prices; time bounded by latency/concurrency or the rate limits."""
+        settings = get_settings()
+        report.cost_usd = (
+            report.input_tokens * self.price_prompt_1m + report.output_tokens * self.price_completion_1m
+        ) / 1_000_000
+        request_seconds = sum(
+            settings.expected_request_overhead_seconds + batch.output_tokens / settings.expected_output_tokens_per_second
+            for chapter in report.chapters for batch in chapter.batches
+        )
+        bounds = {"latency": request_seconds / max(1, settings.max_concurrent_requests)}
+        if settings.requests_per_minute:
+            bounds["requests_per_minute"] = 60 * report.requests / settings.requests_per_minute
+        if settings.tokens_per_minute:
+            bounds["tokens_per_minute"] = 60 * (report.input_tokens + report.output_tokens) / settings.tokens_per_minute
+        report.bottleneck = max(bounds, key=bounds.get)
+        report.seconds = bounds[report.bottleneck]
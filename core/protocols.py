@@ -1,5 +1,6 @@
-from typing import Protocol, runtime_checkable
+from typing import Callable, Protocol, runtime_checkable
 from models.translation import TranslationMap, TranslationMapElement
+from models.job import JobRecord
 
 @runtime_checkable
 class TranslatorClient(Protocol):
@@ -7,24 +8,108 @@ class TranslatorClient(Protocol):
     @property
     def model(self) -> str: ...
     
-    def translate_batch(self, translation_map: TranslationMap, target_lang: str) -> TranslationMap:
-        """Debe traducir un batch de elementos."""
+    def translate_batch(
+        self,
+        translation_map: TranslationMap,
+        target_lang: str,
+        on_batch_complete: Callable[[str, list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+    ) -> TranslationMap:
+        """
+        Debe traducir un batch de elementos, notificando cada sub-batch validado (modelo, elementos).
+        El modelo notificado es el que tradujo realmente (un router puede tener varios, expuestos
+        opcionalmente como `models`, en orden de preferencia).
+        `hints` asocia ids con un ejemplo (original, traducción) parecido de la memoria de traducción.
+        """
         ...
 
 @runtime_checkable
 class CacheRepository(Protocol):
     """Interfaz para sistemas de persistencia/caché."""
-    def save_batch(self, book_id: str, model_name: str, elements: list[TranslationMapElement]) -> None:
-        """Guarda un conjunto de traducciones."""
+    def save_batch(self, book_id: str, model_name: str, target_lang: str, elements: list[TranslationMapElement], source_hashes: dict[str, str] | None = None) -> None:
+        """Guarda un conjunto de traducciones de un idioma (opcionalmente con el hash del texto original)."""
         ...
 
-    def get_translation(self, book_id: str, model_name: str, ref_id: str) -> str | None:
+    def get_translation(self, book_id: str, model_name: str, target_lang: str, ref_id: str) -> str | None:
         """Recupera una traducción específica."""
         ...
 
+    def get_many(self, book_id: str, model_name: str, target_lang: str, ids: list[str], source_hashes: dict[str, str] | None = None) -> dict[str, str]:
+        """Recupera en bloque las traducciones disponibles (id -> texto)."""
+        ...
+
+    def get_book_segments(self, book_id: str, model_name: str, target_lang: str) -> list[tuple[str, str, str]]:
+        """Recupera (id, original, traducción) de un libro en orden de id."""
+        ...
+
+    def save_by_hash(self, model_name: str, target_lang: str, prompt_version: str, entries: list[tuple[str, str, str]]) -> None:
+        """Guarda traducciones direccionadas por contenido (hash, original, traducción)."""
+        ...
+
+    def get_many_by_hash(self, hashes: list[str]) -> dict[str, str]:
+        """Recupera traducciones por hash de contenido (hash -> texto)."""
+        ...
+
+@runtime_checkable
+class MemoryStore(Protocol):
+    """Interfaz del almacén que respalda la memoria de traducción (índice LSH persistente)."""
+    def get_memory_watermark(self) -> int:
+        """Devuelve el último registro de contenido ya indexado."""
+        ...
+
+    def get_content_since(self, after_rowid: int, limit: int = 5000) -> list[tuple[int, str, str]]:
+        """Devuelve (rowid, idioma, original) de los registros aún sin indexar."""
+        ...
+
+    def save_memory_keys(self, keys: list[tuple[int, int]], watermark: int) -> None:
+        """Guarda pares (clave LSH, rowid) y avanza la marca de lo ya indexado."""
+        ...
+
+    def find_memory_candidates(self, keys: list[int], limit: int) -> list[tuple[str, str, str, str, int]]:
+        """Devuelve (original, traducción, modelo, versión del prompt, claves compartidas) de los candidatos más parecidos."""
+        ...
+
+@runtime_checkable
+class RunJournal(Protocol):
+    """Interfaz para el diario de ejecuciones que permite reanudar traducciones."""
+    def start_run(self, book_id: str, model_name: str, target_lang: str, total: int) -> int:
+        """Registra una nueva ejecución y devuelve su identificador."""
+        ...
+
+    def find_resumable_run(self, book_id: str, model_name: str, target_lang: str) -> int | None:
+        """Devuelve la última ejecución sin terminar para ese libro, si existe."""
+        ...
+
+    def record_progress(self, run_id: int, ids: list[str]) -> None:
+        """Marca los IDs como completados dentro de la ejecución."""
+        ...
+
+    def get_completed_ids(self, run_id: int) -> set[str]:
+        """Recupera los IDs ya completados de una ejecución."""
+        ...
+
+    def finish_run(self, run_id: int, status: str) -> None:
+        """Cierra la ejecución con el estado indicado ('completed', 'failed')."""
+        ...
+
 @runtime_checkable
 class TranslationValidator(Protocol):
     """Interfaz para validadores de respuesta del LLM."""
     def validate(self, original_elements: list[TranslationMapElement], translated_map: TranslationMap) -> None:
         """Debe lanzar TranslationValidationError si falla."""
         ...
+
+@runtime_checkable
+class JobStore(Protocol):
+    """Interfaz del registro de trabajos (un libro por trabajo) de una ejecución de catálogo."""
+    def enqueue_job(self, input_path: str, languages: list[str], priority: int = 0) -> int:
+        """Registra un libro (idempotente) y devuelve el id del trabajo."""
+        ...
+
+    def get_jobs(self, statuses: list[str] | None = None) -> list[JobRecord]:
+        """Lista los trabajos, opcionalmente filtrados por estado."""
+        ...
+
+    def set_job_status(self, job_id: int, status: str, error: str | None = None) -> None:
+        """Actualiza el estado de un trabajo."""
+        ...
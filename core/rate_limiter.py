@@ -0,0 +1,229 @@
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping
+
+import requests
+from tenacity import RetryCallState
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset_seconds(value: str | None, now: float | None = None) -> float | None:
+    """
+    Interprets a Retry-After / x-ratelimit-reset value as seconds to wait.
+    Accepts plain seconds, Go-style durations ("6m0s", "200ms"), epoch timestamps
+    (seconds or milliseconds, as OpenRouter sends them) and HTTP dates.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    now = time.time() if now is None else now
+
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+
+    if number is not None:
+        if number > 1e12:  # Epoch en milisegundos
+            return max(0.0, number / 1000 - now)
+        if number > 1e9:  # Epoch en segundos
+            return max(0.0, number - now)
+        return max(0.0, number)
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(f"{n}{u}" for n, u in parts) == value:
+        factors = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(n) * factors[u] for n, u in parts)
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate_per_minute`."""
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.set_rate(rate_per_minute)
+        self.tokens = self.capacity
+        self._last = clock()
+
+    def set_rate(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate_per_minute / 60)
+        self._last = now
+
+    def reserve(self, amount: float) -> float:
+        """Deducts `amount` (possibly going into debt) and returns how long the caller must wait."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._refill()
+            # A request larger than the bucket can never fit, so it only has to wait for a full bucket
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens * 60 / self.rate_per_minute
+
+    def drain(self):
+        """Empties the bucket (used when the server says we are out of quota)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateController:
+    """
+    Shared rate controller for every request made against a provider.
+    Combines RPM/TPM token buckets, a server-driven pause (Retry-After / x-ratelimit-*)
+    and an AIMD concurrency window that shrinks on 429s and grows back on success.
+    """
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        self.request_bucket = TokenBucket(requests_per_minute, clock)
+        self.token_bucket = TokenBucket(tokens_per_minute, clock)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.decrease_factor = decrease_factor
+
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled_count = 0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_settings(cls, settings) -> "RateController":
+        return cls(
+            requests_per_minute=settings.requests_per_minute,
+            tokens_per_minute=settings.tokens_per_minute,
+            max_concurrency=settings.max_concurrent_requests,
+        )
+
+    def acquire(self, estimated_tokens: int = 0):
+        """Blocks until a request of `estimated_tokens` may be sent."""
+        with self._condition:
+            while self.in_flight >= int(self.concurrency_limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+        try:
+            pause = self.paused_until - self.clock()
+            if pause > 0:
+                logger.info(f"Rate limit pause: waiting {pause:.1f}s before next request...")
+                self.sleep(pause)
+
+            wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(estimated_tokens))
+            if wait > 0:
+                logger.debug(f"Token bucket throttling: waiting {wait:.2f}s")
+                self.sleep(wait)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def record_response(self, status_code: int, headers: Mapping[str, str] | None = None):
+        """Feeds the server's answer back into the controller (AIMD + header-driven limits)."""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        self._apply_limit_headers(headers)
+
+        with self._condition:
+            if status_code == 429:
+                self.throttled_count += 1
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit * self.decrease_factor)
+                wait = parse_reset_seconds(headers.get("retry-after"))
+                if wait is None:
+                    wait = self._reset_from_headers(headers)
+                if wait:
+                    self.paused_until = max(self.paused_until, self.clock() + wait)
+                logger.warning(
+                    f"429 received: concurrency limit -> {int(self.concurrency_limit)}"
+                    + (f", pausing {wait:.1f}s" if wait else "")
+                )
+            elif status_code < 400:
+                # Additive increase: +1 slot after roughly one full window of successes
+                self.concurrency_limit = min(
+                    float(self.max_concurrency), self.concurrency_limit + 1 / max(1.0, self.concurrency_limit)
+                )
+            self._condition.notify_all()
+
+    def _apply_limit_headers(self, headers: dict[str, str]):
+        # OpenAI-style headers expose the real limits; OpenRouter sends x-ratelimit-limit/remaining/reset
+        for key, bucket in (("x-ratelimit-limit-requests", self.request_bucket), ("x-ratelimit-limit-tokens", self.token_bucket)):
+            limit = _to_float(headers.get(key))
+            if limit and limit != bucket.rate_per_minute:
+                bucket.set_rate(limit)
+
+        remaining_keys = ("x-ratelimit-remaining", "x-ratelimit-remaining-requests", "x-ratelimit-remaining-tokens")
+        if any(_to_float(headers.get(key)) == 0 for key in remaining_keys):
+            wait = self._reset_from_headers(headers)
+            if wait:
+                with self._condition:
+                    self.paused_until = max(self.paused_until, self.clock() + wait)
+
+    @staticmethod
+    def _reset_from_headers(headers: dict[str, str]) -> float | None:
+        waits = [
+            parse_reset_seconds(headers.get(key))
+            for key in ("x-ratelimit-reset", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        ]
+        waits = [w for w in waits if w is not None]
+        return max(waits) if waits else None
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class wait_retry_after:
+    """Tenacity wait strategy that honours the server's Retry-After before falling back."""
+    def __init__(self, fallback: Callable[[RetryCallState], float], max_wait: float = 300):
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        exception = retry_state.outcome.exception() if retry_state.outcome else None
+        if isinstance(exception, requests.exceptions.HTTPError) and exception.response is not None:
+            headers = {k.lower(): v for k, v in exception.response.headers.items()}
+            wait = parse_reset_seconds(headers.get("retry-after"))
+            if wait is None and exception.response.status_code == 429:
+                wait = RateController._reset_from_headers(headers)
+            if wait is not None:
+                return min(wait, self.max_wait)
+        return self.fallback(retry_state)
@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Callable
+from core.batching import TokenBatcher
+from core.config import get_settings
+from core.telemetry import telemetry
+from core.translator import OpenRouterClient, RequestCancelled
+from models.translation import TranslationMap, TranslationMapElement
+
+logger = logging.getLogger(__name__)
+
+# Recent batch latencies kept per model, and how many are needed to trust their percentile
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class Route:
+    """One model behind the router: its client, recent batch latencies and health."""
+    def __init__(self, client: OpenRouterClient):
+        self.client = client
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def hedge_delay(self, percentile: float, initial: float, minimum: float) -> float:
+        with self._lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return initial
+            ordered = sorted(self.latencies)
+        return max(minimum, ordered[min(len(ordered) - 1, int(len(ordered) * percentile))])
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.consecutive_failures = 0
+
+    def record_failure(self, threshold: int, cooldown: float):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures < threshold:
+                return
+            self.consecutive_failures = 0
+            self.unhealthy_until = time.monotonic() + cooldown
+        logger.warning(f"{self.model} failed {threshold} batches in a row; deprioritised for {cooldown:.0f}s.")
+
+
+class RoutingTranslatorClient:
+    """
+    TranslatorClient over several models or providers (one OpenRouterClient each, in
+    order of preference). Every batch goes to the first healthy model; once it runs
+    past the `hedge_percentile` of that model's recent latencies, a duplicate request
+    goes to the next model, the first complete answer wins and the other attempt is
+    cancelled. Elements a model errors or gives up on fall back to the next one.
+
+    Elements are reported to `on_batch_complete` under the model that actually
+    translated them, so cache keys (and each client's usage accounting) stay per model.
+    """
+    def __init__(
+        self,
+        clients: list[OpenRouterClient],
+        hedge_percentile: float | None = None,
+        hedge_initial_delay: float | None = None,
+        hedge_min_delay: float | None = None,
+        failure_threshold: int | None = None,
+        cooldown_seconds: float | None = None,
+    ):
+        if not clients:
+            raise ValueError("RoutingTranslatorClient needs at least one client")
+        settings = get_settings()
+        self.routes = [Route(client) for client in clients]
+        self.hedge_percentile = settings.hedge_percentile if hedge_percentile is None else hedge_percentile
+        self.hedge_initial_delay = settings.hedge_initial_delay if hedge_initial_delay is None else hedge_initial_delay
+        self.hedge_min_delay = settings.hedge_min_delay if hedge_min_delay is None else hedge_min_delay
+        self.failure_threshold = settings.route_failure_threshold if failure_threshold is None else failure_threshold
+        self.cooldown_seconds = settings.route_cooldown_seconds if cooldown_seconds is None else cooldown_seconds
+        self.max_concurrent_requests = max(1, settings.max_concurrent_requests)
+        self.hedged_batches = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self._counter_lock = threading.Lock()
+        # Attempts run here, so a batch can wait on its primary and its hedge at once
+        self._attempts = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_requests * len(self.routes), thread_name_prefix="route"
+        )
+
+    @property
+    def model(self) -> str:
+        """The preferred model; runs are journaled under it."""
+        return self.routes[0].model
+
+    @property
+    def models(self) -> list[str]:
+        """Every model that may answer, in order of preference."""
+        return [route.model for route in self.routes]
+
+    def translate_batch(
+        self,
+        translation_map: TranslationMap,
+        target_lang: str,
+        batch_size: int = 80,
+        on_batch_complete: Callable[[str, list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+        executor: Executor | None = None,
+    ) -> TranslationMap:
+        # Whole elements only: a model splits its oversized elements with its own budgets
+        # Sized for the primary model's limits when the catalogue knows them
+        primary = self.routes[0].client
+        batcher = TokenBatcher.for_model(
+            get_settings(), self.model, max_elements=batch_size,
+            context_length=getattr(primary, "context_length", None),
+            max_output_tokens=getattr(primary, "max_output_tokens", None),
+        )
+        batches = batcher.pack(translation_map.elements, split=False)
+        total = len(batches)
+
+        def process(indexed_batch: tuple[int, list[TranslationMapElement]]) -> list[TranslationMapElement]:
+            index, batch = indexed_batch
+            logger.info(f"Routing batch {index + 1}/{total} ({len(batch)} elements)...")
+            return self._route_batch(batch, target_lang, batch_size, on_batch_complete, hints)
+
+        if executor is not None:
+            futures = [executor.submit(process, indexed) for indexed in enumerate(batches)]
+            completed = [el for future in futures for el in future.result()]
+        else:
+            workers = min(self.max_concurrent_requests, total) or 1
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="router") as pool:
+                completed = [el for batch_result in pool.map(process, enumerate(batches)) for el in batch_result]
+        return TranslationMap(elements=completed)
+
+    def _route_order(self) -> list[Route]:
+        """Healthy routes in order of preference, then the cooling-down ones as a last resort."""
+        healthy = [route for route in self.routes if route.healthy()]
+        return healthy + sorted(
+            (route for route in self.routes if not route.healthy()), key=lambda route: route.unhealthy_until
+        )
+
+    def _route_batch(
+        self,
+        batch: list[TranslationMapElement],
+        target_lang: str,
+        batch_size: int,
+        on_batch_complete: Callable[[str, list[TranslationMapElement]], None] | None,
+        hints: dict[str, tuple[str, str]] | None,
+    ) -> list[TranslationMapElement]:
+        results: dict[str, TranslationMapElement] = {}
+        results_lock = threading.Lock()
+
+        def deliver(model: str, elements: list[TranslationMapElement]):
+            # First answer per element wins; a late duplicate from the other attempt is dropped
+            with results_lock:
+                fresh = [el for el in elements if el.id not in results]
+                results.update((el.id, el) for el in fresh)
+            if fresh and on_batch_complete:
+                on_batch_complete(model, fresh)
+
+        def missing() -> list[TranslationMapElement]:
+            with results_lock:
+                return [el for el in batch if el.id not in results]
+
+        candidates = deque(self._route_order())
+        in_flight: dict[Future, tuple[Route, list[TranslationMapElement], threading.Event, list[float]]] = {}
+
+        def launch():
+            route = candidates.popleft()
+            elements = missing()
+            cancelled = threading.Event()
+            # Filled in by the attempt once a worker picks it up: time spent queued behind
+            # other batches is neither latency nor a reason to hedge
+            started: list[float] = []
+
+            def attempt() -> TranslationMap:
+                started.append(time.monotonic())
+                return route.client.translate_batch(
+                    TranslationMap(elements=elements), target_lang,
+                    batch_size=batch_size, on_batch_complete=deliver, hints=hints, cancelled=cancelled,
+                )
+
+            in_flight[self._attempts.submit(attempt)] = (route, elements, cancelled, started)
+
+        primary = candidates[0]
+        launch()
+        hedged = answered = False
+        last_error: BaseException | None = None
+        while in_flight:
+            timeout = None
+            if candidates and len(in_flight) == 1:
+                route, _, _, started = next(iter(in_flight.values()))
+                delay = route.hedge_delay(self.hedge_percentile, self.hedge_initial_delay, self.hedge_min_delay)
+                # Still queued: look again after a whole delay
+                timeout = max(0.0, started[0] + delay - time.monotonic()) if started else delay
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if not started or time.monotonic() < started[0] + delay:
+                    continue
+                logger.info(f"{route.model} is slow on {len(batch)} elements; hedging with {candidates[0].model}.")
+                with self._counter_lock:
+                    self.hedged_batches += 1
+                telemetry.increment("hedged_batches")
+                hedged = True
+                launch()
+                continue
+
+            for future in done:
+                route, elements, cancelled, started = in_flight.pop(future)
+                elapsed = time.monotonic() - started[0]
+                error = future.exception()
+                if cancelled.is_set() or isinstance(error, RequestCancelled):
+                    # A lost hedge still took at least this long
+                    route.record_latency(elapsed)
+                    continue
+                if error is not None:
+                    logger.warning(f"{route.model} failed on {len(elements)} elements: {error}")
+                    last_error = error
+                    route.record_failure(self.failure_threshold, self.cooldown_seconds)
+                    continue
+                answered = True
+                translated = future.result().elements
+                deliver(route.model, translated)
+                if {el.id for el in translated} >= {el.id for el in elements}:
+                    route.record_success(elapsed)
+                else:
+                    route.record_failure(self.failure_threshold, self.cooldown_seconds)
+                if hedged and route is not primary and not missing():
+                    with self._counter_lock:
+                        self.hedge_wins += 1
+                    telemetry.increment("hedge_wins")
+
+            if not missing():
+                for other_future, (_, _, cancelled, _) in in_flight.items():
+                    cancelled.set()
+                    other_future.cancel()
+                break
+            if not in_flight and candidates:
+                logger.info(f"Falling back to {candidates[0].model} for {len(missing())} elements.")
+                with self._counter_lock:
+                    self.fallbacks += 1
+                telemetry.increment("fallbacks")
+                launch()
+
+        if not answered and last_error is not None and not results:
+            # Every model errored: surface it like a single client would
+            raise last_error
+        given_up = missing()
+        if given_up:
+            logger.error(f"No model could translate {len(given_up)} elements.")
+        return [results[el.id] for el in batch if el.id in results]
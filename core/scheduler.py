@@ -0,0 +1,130 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable
+from models.translation import TranslationMap, TranslationMapElement
+
+logger = logging.getLogger(__name__)
+
+
+class Lane(Executor):
+    """A book's view of the scheduler, usable wherever an Executor is expected."""
+    def __init__(self, scheduler: "FairScheduler", key: str, priority: int):
+        self.scheduler = scheduler
+        self.key = key
+        self.priority = priority
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.scheduler.submit(self.key, self.priority, fn, *args, **kwargs)
+
+
+class FairScheduler:
+    """
+    One global pool of API workers fed by every book in a catalogue run. Each book
+    (lane) has its own FIFO queue; a free worker takes the next task from the
+    highest-priority lanes, rotating round-robin between lanes of equal priority, so
+    a large book cannot starve the others and the quota is used across all of them.
+    """
+    def __init__(self, workers: int):
+        self._queues: dict[str, deque] = {}
+        self._priorities: dict[str, int] = {}
+        # Round-robin order of lanes that have pending tasks
+        self._ready: deque[str] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"api-worker-{n}", daemon=True) for n in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def lane(self, key: str, priority: int = 0) -> Lane:
+        return Lane(self, key, priority)
+
+    def submit(self, key: str, priority: int, fn: Callable, *args, **kwargs) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._priorities[key] = priority
+            queue = self._queues.setdefault(key, deque())
+            if not queue:
+                self._ready.append(key)
+            queue.append((future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    def shutdown(self, wait: bool = True):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _next_task(self):
+        """Pops the head of the first ready lane with the highest priority (caller holds the lock)."""
+        top = max(self._priorities[key] for key in self._ready)
+        for _ in range(len(self._ready)):
+            key = self._ready.popleft()
+            if self._priorities[key] == top:
+                queue = self._queues[key]
+                task = queue.popleft()
+                if queue:
+                    # Back of the line: the next equal-priority lane goes first
+                    self._ready.append(key)
+                return task
+            self._ready.append(key)
+        raise RuntimeError("No ready lane")  # unreachable: `top` comes from a ready lane
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._ready and not self._closed:
+                    self._condition.wait()
+                if not self._ready:
+                    return
+                future, fn, args, kwargs = self._next_task()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class ScheduledClient:
+    """
+    TranslatorClient that sends its batches through a scheduler lane instead of the
+    wrapped client's own thread pool; model, cache and validation stay the client's.
+    """
+    def __init__(self, client, lane: Lane):
+        self.client = client
+        self.lane = lane
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    @property
+    def models(self) -> list[str]:
+        # A wrapped router may have cached answers under any of its models
+        return getattr(self.client, "models", [self.client.model])
+
+    def translate_batch(
+        self,
+        translation_map: TranslationMap,
+        target_lang: str,
+        on_batch_complete: Callable[[str, list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+    ) -> TranslationMap:
+        return self.client.translate_batch(
+            translation_map, target_lang, on_batch_complete=on_batch_complete, hints=hints, executor=self.lane
+        )
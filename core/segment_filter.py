@@ -0,0 +1,188 @@
+import logging
+import re
+from collections import Counter
+from typing import Callable, Iterable
+from models.translation import TranslationMap
+from models.report import FilterReport
+from utils.epub_utils import get_encoding, saved_element_tokens
+
+logger = logging.getLogger(__name__)
+
+_TAG = re.compile(r"<[^<>]+>")
+_WORD = re.compile(r"[^\W\d_]+")
+_PAGE_MARKER = re.compile(r"^(?:page|pg?\.?)\s*\d+$|^[-–—]\s*\d+\s*[-–—]$", re.IGNORECASE)
+_ROMAN_NUMERAL = re.compile(r"^(?=[MDCLXVI])M{0,4}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})\.?$")
+_ISBN = re.compile(r"^(?:e?ISBN(?:-1[03])?[:\s]*[\dX][\d\- X]{8,}[\dX](?:\s*\([^)]*\))?\s*)+$", re.IGNORECASE)
+_COPYRIGHT = re.compile(r"^(?:copyright\s*)?(?:©|\(c\))?\s*(?:copyright\s*)?(?:©\s*)?\d{4}\b", re.IGNORECASE)
+_BOILERPLATE = frozenset({"all rights reserved", "all rights reserved.", "printed in the united states of america"})
+_URL = re.compile(r"^(?:(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.-]+)$", re.IGNORECASE)
+# One "KEY: value" field of a stat block ("STR: 15", "HP 45/45", "Crit: +5%")
+_STAT_FIELD = re.compile(r"^[^\W\d_][^\W\d]{0,15}(?: [^\W\d_][^\W\d]{0,15})?(:?)\s*[+-]?\d+(?:[./]\d+)?%?$")
+_IDENTIFIER = re.compile(r"^[\w.]*(?:_\w+|\(\)|\w\.\w+\(|::|->)[\w.()]*$")
+
+# Function words that are frequent in running text and rare in English; deliberately
+# leaves out short forms shared with English ("a", "no", "me", "he", "son", "in"...)
+STOPWORDS: dict[str, frozenset[str]] = {
+    "english": frozenset(
+        "the and of to is was that with for this it you are have be not but they his her "
+        "from what there were been would could which their".split()
+    ),
+    "spanish": frozenset(
+        "el la los las de del que y en un una por con para es está pero como más sus "
+        "al lo se le fue ya muy también cuando porque esto eso esta este hay".split()
+    ),
+    "french": frozenset(
+        "le la les des du et est une dans pour qui pas que sur avec mais il elle ce cette "
+        "sont été nous vous leur était".split()
+    ),
+    "german": frozenset(
+        "der die das und ist nicht ein eine mit den dem auf sich auch es sie ich wir "
+        "war zu aber wenn noch".split()
+    ),
+    "italian": frozenset(
+        "il lo la gli le di del della che e è un una per con non sono come anche nel "
+        "questo questa ma più".split()
+    ),
+    "portuguese": frozenset(
+        "o os as de do da dos das que e é um uma para com não mas como mais seu sua "
+        "está foi isso este esta".split()
+    ),
+}
+
+RULES = ("symbols", "page_marker", "roman_numeral", "isbn", "copyright", "url", "code", "target_language")
+
+
+class FilterResult:
+    """Elements worth translating plus the ones passed through as they are."""
+    def __init__(self, to_translate: TranslationMap, skipped: dict[str, str], order: list[str], report: FilterReport):
+        self.to_translate = to_translate
+        self.skipped = skipped
+        self.order = order
+        self.report = report
+
+    def merge(self, translated: TranslationMap) -> TranslationMap:
+        """Puts the skipped elements (with their source text) back in document order."""
+        return TranslationMap.merged(self.order, translated, self.skipped)
+
+
+class SegmentFilter:
+    """
+    Rule-based classification of elements that do not need a translator: bare numbers
+    and separators, page markers, roman numerals, ISBN and copyright lines, URLs,
+    stat-block/code-like text and text already written in the target language.
+    Rules are cheap regexes and a stopword count, so the stage costs far less than
+    the requests it saves.
+    """
+    def __init__(
+        self,
+        rules: Iterable[str] = RULES,
+        count_tokens: Callable[[str], int] | None = None,
+        source_lang: str = "english",
+    ):
+        self.rules = tuple(rules)
+        unknown = set(self.rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown segment filter rules {sorted(unknown)}; expected a subset of {RULES}")
+        self.count_tokens = count_tokens or (lambda text: len(get_encoding().encode_ordinary(text)))
+        self.source_lang = source_lang
+
+    def classify(self, text: str, target_lang: str) -> str | None:
+        """Returns the first rule that makes `text` non-translatable, or None."""
+        # Inline markup (<i>, <x1>...) is not content
+        text = _TAG.sub("", text).strip()
+        for rule in self.rules:
+            if getattr(self, f"_is_{rule}")(text, target_lang.lower()):
+                return rule
+        return None
+
+    def filter(self, translation_map: TranslationMap, target_lang: str) -> FilterResult:
+        keep_ids, keep_texts = [], []
+        skipped: dict[str, str] = {}
+        by_rule: Counter = Counter()
+        saved_tokens = 0
+
+        for ref_id, text in translation_map.items():
+            rule = self.classify(text, target_lang)
+            if rule is None:
+                keep_ids.append(ref_id)
+                keep_texts.append(text)
+                continue
+            skipped[ref_id] = text
+            by_rule[rule] += 1
+            saved_tokens += saved_element_tokens(ref_id, text, self.count_tokens)
+
+        report = FilterReport(
+            total_elements=len(translation_map),
+            skipped_elements=len(skipped),
+            saved_tokens=saved_tokens,
+            skipped_by_rule=dict(by_rule),
+        )
+        if skipped:
+            logger.info(
+                f"Filter: {report.skipped_elements} of {report.total_elements} elements need no translation "
+                f"(~{report.saved_tokens} tokens saved): {report.skipped_by_rule}"
+            )
+        return FilterResult(
+            TranslationMap.from_columns(keep_ids, keep_texts),
+            skipped,
+            translation_map.ids,
+            report,
+        )
+
+    # --- Rules ---
+
+    @staticmethod
+    def _is_symbols(text: str, target_lang: str) -> bool:
+        # Numbers, scene breaks ("* * *"), lone punctuation...
+        return not _WORD.search(text)
+
+    @staticmethod
+    def _is_page_marker(text: str, target_lang: str) -> bool:
+        return bool(_PAGE_MARKER.match(text))
+
+    @staticmethod
+    def _is_roman_numeral(text: str, target_lang: str) -> bool:
+        # Uppercase only: "mix" or "did" are words, "MIX" in a heading is a numeral
+        return bool(_ROMAN_NUMERAL.match(text))
+
+    @staticmethod
+    def _is_isbn(text: str, target_lang: str) -> bool:
+        return bool(_ISBN.match(text))
+
+    @staticmethod
+    def _is_copyright(text: str, target_lang: str) -> bool:
+        # Only the short "© 2021 Author" line; longer legal paragraphs still get translated
+        if text.lower() in _BOILERPLATE:
+            return True
+        return len(text) <= 120 and ("©" in text or text.lower().startswith("copyright")) and bool(_COPYRIGHT.match(text))
+
+    @staticmethod
+    def _is_url(text: str, target_lang: str) -> bool:
+        return bool(_URL.match(text))
+
+    @staticmethod
+    def _is_code(text: str, target_lang: str) -> bool:
+        if " " not in text and _IDENTIFIER.match(text):
+            return True
+        # Stat blocks such as "STR: 15 | DEX: 12 | HP 45/45": two or more KEY value fields,
+        # separated by "|", or by commas when every field has its colon. Dates and times
+        # ("June 12, 2021", "Day 1, 09:00") have no such structure and are translated
+        pipes = "|" in text
+        fields = [field.strip() for field in re.split(r"\|" if pipes else r"[,;]", text)]
+        if len(fields) < 2:
+            return False
+        matches = [_STAT_FIELD.match(field) for field in fields]
+        return all(matches) and (pipes or all(m.group(1) for m in matches))
+
+    def _is_target_language(self, text: str, target_lang: str) -> bool:
+        target_words = STOPWORDS.get(target_lang)
+        source_words = STOPWORDS.get(self.source_lang)
+        if not target_words or not source_words or target_lang == self.source_lang:
+            return False
+        words = [w.lower() for w in _WORD.findall(text)]
+        if len(words) < 4:
+            return False
+        target_hits = sum(w in target_words for w in words)
+        source_hits = sum(w in source_words for w in words)
+        # Conservative: a false positive leaves English text untranslated
+        return target_hits >= 2 and target_hits >= 0.2 * len(words) and source_hits * 4 <= target_hits
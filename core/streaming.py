@@ -0,0 +1,73 @@
+import json
+from typing import Iterable, Iterator
+
+
+class IncrementalElementParser:
+    """
+    Pulls complete objects out of a streamed `{"elements": [{...}, {...}` JSON document
+    as soon as each one is closed, without waiting for (or requiring) the rest.
+    """
+    def __init__(self):
+        self.position = 0
+        self.stack: list[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.element_start: int | None = None
+        self._text = ""
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> list[dict]:
+        """Adds streamed text and returns the elements completed by it."""
+        self._text += chunk
+        completed = []
+        text = self._text
+        for index in range(self.position, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                # Elements are the objects directly inside the root object's array
+                if char == "{" and self.stack == ["{", "["]:
+                    self.element_start = index
+                self.stack.append(char)
+            elif char in "}]":
+                if self.stack:
+                    self.stack.pop()
+                if char == "}" and self.stack == ["{", "["] and self.element_start is not None:
+                    try:
+                        completed.append(json.loads(text[self.element_start:index + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self.element_start = None
+        self.position = len(text)
+        return completed
+
+
+def iter_sse_data(lines: Iterable[str | bytes]) -> Iterator[dict]:
+    """Yields the JSON payload of every `data:` line of a server-sent events stream."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        # Blank separators and ': keep-alive' comments carry no data
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            continue
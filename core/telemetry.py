@@ -0,0 +1,211 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds): 1 ms doubling up to ~2 min, then +Inf
+LATENCY_BUCKETS = tuple(0.001 * 2 ** n for n in range(18))
+METRIC_PREFIX = "epub_translator"
+
+
+class Histogram:
+    """Cumulative-friendly latency histogram (fixed buckets plus count, sum and max)."""
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the `pct` quantile (the max for the last one)."""
+        if not self.count:
+            return 0.0
+        rank = pct * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": round(self.max, 6),
+        }
+
+
+class Telemetry:
+    """
+    Process-wide run instrumentation: a latency histogram per phase (load, extract,
+    cache_lookup, api_request, validation, rebuild...) and plain counters (tokens,
+    retries, 429s, cache hits). Exported as a JSON run report or a Prometheus textfile.
+
+    Process-pool workers have their own instance; they hand back `collect()` with their
+    results and the parent `merge()`s it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms: dict[str, Histogram] = {}
+            self.counters: dict[str, float] = {}
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            self.histograms.setdefault(phase, Histogram()).observe(seconds)
+
+    def increment(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def timed(self, phase: str):
+        """Decorator form of `timer`."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(phase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def collect(self) -> tuple[dict[str, Histogram], dict[str, float]]:
+        """Returns and clears what was recorded so far (worker side of merge)."""
+        with self._lock:
+            state = (self.histograms, self.counters)
+            self.histograms, self.counters = {}, {}
+        return state
+
+    def merge(self, state: tuple[dict[str, Histogram], dict[str, float]]):
+        histograms, counters = state
+        with self._lock:
+            for phase, histogram in histograms.items():
+                self.histograms.setdefault(phase, Histogram(histogram.bounds)).merge(histogram)
+            for name, amount in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> dict:
+        """JSON-friendly run report with derived throughput and hit-ratio figures."""
+        with self._lock:
+            counters = dict(self.counters)
+            phases = {phase: histogram.summary() for phase, histogram in sorted(self.histograms.items())}
+            wall = time.perf_counter() - self._started
+        tokens = counters.get("prompt_tokens", 0) + counters.get("completion_tokens", 0)
+        lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+        api_seconds = phases.get("api_request", {}).get("total_seconds", 0)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(wall, 3),
+            "counters": counters,
+            "phases": phases,
+            "derived": {
+                "tokens_per_second": round(tokens / wall, 2) if wall else 0.0,
+                "completion_tokens_per_api_second": (
+                    round(counters.get("completion_tokens", 0) / api_seconds, 2) if api_seconds else 0.0
+                ),
+                "cache_hit_ratio": round(counters.get("cache_hits", 0) / lookups, 4) if lookups else None,
+            },
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector)."""
+        name = f"{METRIC_PREFIX}_phase_seconds"
+        lines = [f"# HELP {name} Latency of each pipeline phase.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for phase, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(histogram.bounds, histogram.buckets):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{phase="{phase}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{phase="{phase}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{phase="{phase}"}} {histogram.count}')
+            counters = sorted(self.counters.items())
+        for counter, value in counters:
+            metric = f"{METRIC_PREFIX}_{counter}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        derived = self.report()["derived"]
+        for gauge, value in derived.items():
+            if value is not None:
+                metric = f"{METRIC_PREFIX}_{gauge}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _write_atomically(path, json.dumps(self.report(), indent=2))
+        logger.info(f"Run report written to {path}")
+
+    def write_prometheus(self, path: str):
+        _write_atomically(path, self.prometheus())
+        logger.info(f"Prometheus metrics written to {path}")
+
+
+@contextmanager
+def profile(path: str | None):
+    """
+    cProfile of the calling thread, dumped to `path` (inspect with pstats or snakeviz).
+    No-op when `path` is None. Only the calling thread is profiled (parsing, rebuilding,
+    cache work); API batches run on pool threads and show up in the api_request
+    histogram instead.
+    """
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Profile written to {path}")
+
+
+def _write_atomically(path: str, content: str):
+    # Scrapers must never read a half-written file
+    partial = f"{path}.part"
+    with open(partial, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(partial, path)
+
+
+# Instancia global para ser usada en el proyecto
+telemetry = Telemetry()
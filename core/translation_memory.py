@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import re
+import unicodedata
+import zlib
+from collections.abc import Collection
+from typing import NamedTuple
+from core.protocols import MemoryStore
+from utils.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Typographic variants that do not change what a sentence says
+_TYPOGRAPHY = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"', "«": '"', "»": '"',
+    "–": "-", "—": "-", "…": "...", " ": " ",
+})
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.;:!?)\]])")
+_GOLDEN = 0x9E3779B1
+_MASK32 = 0xFFFFFFFF
+
+
+def canonical_text(text: str) -> str:
+    """Whitespace, quote, dash and ellipsis variants collapse to the same string."""
+    text = unicodedata.normalize("NFKC", text).translate(_TYPOGRAPHY)
+    return _SPACE_BEFORE_PUNCTUATION.sub(r"\1", normalize_text(text))
+
+
+def _hash64(data: str) -> int:
+    """Stable (cross-process) signed 64-bit hash, so keys can live in SQLite."""
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class MemoryMatch(NamedTuple):
+    source: str
+    translation: str
+    similarity: float
+    # Sources are equal up to typography and the translation was made by the same model
+    # with the same prompt, so it can be reused as-is
+    exact: bool
+
+
+class TranslationMemory:
+    """
+    Near-duplicate lookup over every translation already stored in the content cache.
+    Each source is shingled into character n-grams and summarised with a one-permutation
+    MinHash signature (a single pass over the shingles); its LSH band keys are persisted
+    next to the cache, so a lookup is a handful of indexed SQLite probes whatever the
+    size of the memory. Candidates are then verified with the exact Jaccard similarity
+    of their shingles.
+
+    Only typographic variants translated by the same model with the same prompt version
+    are reused directly: a paragraph that differs in a name or a number, or whose
+    translation came from another model or prompt, gets the old translation as a hint,
+    never as the answer.
+    """
+    def __init__(
+        self,
+        store: MemoryStore,
+        threshold: float = 0.7,
+        bands: int = 8,
+        rows: int = 4,
+        shingle_size: int = 4,
+        max_candidates: int = 10,
+    ):
+        self.store = store
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+
+    def shingles(self, text: str) -> set[int]:
+        """Stable 32-bit hashes (mixed crc32) of the character n-grams of the canonical text."""
+        data = canonical_text(text).lower().encode("utf-8")
+        k = self.shingle_size
+        windows = [data] if len(data) <= k else (data[i:i + k] for i in range(len(data) - k + 1))
+        return {(zlib.crc32(window) * _GOLDEN) & _MASK32 for window in windows}
+
+    def signature(self, shingles: set[int]) -> list[int]:
+        """
+        One-permutation MinHash: each shingle falls into one of `bands * rows` bins and
+        every bin keeps its minimum. Empty bins borrow the next filled bin's value
+        (rotation densification) so short texts still get a full signature.
+        """
+        size = self.bands * self.rows
+        bins: list[int | None] = [None] * size
+        for h in shingles:
+            index, value = h % size, h // size
+            if bins[index] is None or value < bins[index]:
+                bins[index] = value
+        signature = list(bins)
+        for index in range(size):
+            if signature[index] is None:
+                distance = 1
+                while bins[(index + distance) % size] is None:
+                    distance += 1
+                signature[index] = bins[(index + distance) % size] + distance * (_MASK32 + 1)
+        return signature
+
+    def keys(self, text: str, target_lang: str, shingles: set[int] | None = None) -> list[int]:
+        """LSH band keys plus one exact key, all scoped to the target language."""
+        signature = self.signature(shingles or self.shingles(text))
+        keys = [
+            _hash64(f"{target_lang}|{band}|{signature[band * self.rows:(band + 1) * self.rows]}")
+            for band in range(self.bands)
+        ]
+        keys.append(_hash64(f"{target_lang}|exact|{canonical_text(text)}"))
+        return keys
+
+    def refresh(self, batch_size: int = 5000) -> int:
+        """Indexes content rows stored since the last refresh; returns how many."""
+        indexed = 0
+        watermark = self.store.get_memory_watermark()
+        while rows := self.store.get_content_since(watermark, limit=batch_size):
+            watermark = rows[-1][0]
+            self.store.save_memory_keys(
+                [(key, rowid) for rowid, target_lang, source in rows for key in self.keys(source, target_lang)],
+                watermark,
+            )
+            indexed += len(rows)
+        if indexed:
+            logger.info(f"Translation memory: indexed {indexed} new segments.")
+        return indexed
+
+    def lookup(
+        self, text: str, target_lang: str, model_names: Collection[str], prompt_version: str
+    ) -> MemoryMatch | None:
+        """
+        Best stored translation whose source is at least `threshold` similar, if any.
+        Only a translation made by one of `model_names` with `prompt_version` can be exact.
+        """
+        shingles = self.shingles(text)
+        candidates = self.store.find_memory_candidates(self.keys(text, target_lang, shingles), self.max_candidates)
+        canonical = canonical_text(text)
+        best = None
+        for source, translation, model_name, source_prompt_version, _hits in candidates:
+            same_source = canonical_text(source) == canonical
+            if same_source and model_name in model_names and source_prompt_version == prompt_version:
+                return MemoryMatch(source, translation, 1.0, exact=True)
+            other = self.shingles(source)
+            similarity = len(shingles & other) / len(shingles | other)
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = MemoryMatch(source, translation, similarity, exact=False)
+        return best
@@ -1,6 +1,13 @@
 import logging
+import threading
+from collections.abc import Callable
 from models.translation import TranslationMap, TranslationMapElement
-from core.protocols import TranslatorClient, CacheRepository
+from core.protocols import TranslatorClient, CacheRepository, RunJournal
+from core.markup import MarkupCompressor
+from core.translation_memory import TranslationMemory
+from core.telemetry import telemetry
+from prompts import get_prompt_version
+from utils.text_utils import content_hash
 
 logger = logging.getLogger(__name__)
 
@@ -9,41 +16,207 @@ class TranslationService:
     Facade service that coordinates caching and API calls.
     The 'Brain' that decides how to fulfill a translation request.
     """
-    def __init__(self, client: TranslatorClient, cache: CacheRepository):
+    def __init__(
+        self,
+        client: TranslatorClient,
+        cache: CacheRepository,
+        journal: RunJournal | None = None,
+        compressor: MarkupCompressor | None = None,
+        memory: TranslationMemory | None = None,
+    ):
         self.client = client
         self.cache = cache
+        self.journal = journal
+        # Inline markup is swapped for short placeholders on the wire and restored on arrival
+        self.compressor = compressor
+        # Near-duplicates of earlier translations are reused (typographic variants) or hinted
+        self.memory = memory
 
-    def translate(self, book_id: str, to_translate: TranslationMap, target_lang: str, use_cache: bool = True) -> TranslationMap:
+    def translate(
+        self,
+        book_id: str,
+        to_translate: TranslationMap,
+        target_lang: str,
+        use_cache: bool = True,
+        resume: bool = False,
+        reuse: dict[str, str] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+        on_untranslated: Callable[[list[str]], None] | None = None,
+    ) -> TranslationMap:
+        """
+        `reuse` supplies known translations by id (e.g. unchanged paragraphs of a previous
+        edition); they are checkpointed like fresh ones. `hints` attaches a similar
+        (source, translation) example to ids that still have to be translated.
+        `on_untranslated(ids)` receives the ids left in the source language, if any.
+        """
         current_model = self.client.model
         needed_elements = []
-        final_elements = []
+        # Translated text by id, put back in source order at the end
+        final_texts: dict[str, str] = {}
+        all_ids = to_translate.ids
+        sources = to_translate.as_dict()
+        prompt_version = get_prompt_version(target_lang)
+
+        def hashes_for(model_name: str, ids) -> dict[str, str]:
+            return {ref_id: content_hash(sources[ref_id], model_name, target_lang, prompt_version) for ref_id in ids}
+
+        source_hashes = hashes_for(current_model, all_ids)
+        # A routing client may have answered with any of its models; the preferred one wins
+        lookup_models = getattr(self.client, "models", [current_model])
+        hashes_by_model = {
+            model_name: source_hashes if model_name == current_model else hashes_for(model_name, all_ids)
+            for model_name in lookup_models
+        }
+
+        # 0. Logic: Open (or resume) a journaled run
+        run_id = None
+        done_in_run: set[str] = set()
+        if self.journal:
+            if resume:
+                run_id = self.journal.find_resumable_run(book_id, current_model, target_lang)
+            if run_id is not None:
+                done_in_run = self.journal.get_completed_ids(run_id)
+                logger.info(f"Resuming run {run_id}: {len(done_in_run)} elements already checkpointed.")
+            else:
+                run_id = self.journal.start_run(book_id, current_model, target_lang, total=len(all_ids))
 
         # 1. Logic: Decide what comes from cache
-        if use_cache:
-            for el in to_translate.elements:
-                cached_text = self.cache.get_translation(book_id, current_model, el.id)
+        if use_cache or done_in_run:
+            # Content-addressed hits survive re-extraction and shifted ids; positional
+            # hits are only trusted when they were recorded for the same source text
+            by_hash = self.cache.get_many_by_hash(
+                {h for hashes in hashes_by_model.values() for h in hashes.values()}
+            ) if use_cache else {}
+            lookup_ids = all_ids if use_cache else [i for i in all_ids if i in done_in_run]
+            positional = {
+                model_name: self.cache.get_many(book_id, model_name, target_lang, lookup_ids, source_hashes=hashes)
+                for model_name, hashes in hashes_by_model.items()
+            }
+            for ref_id in all_ids:
+                cached_text = next((
+                    text for model_name, hashes in hashes_by_model.items()
+                    if (text := by_hash.get(hashes[ref_id]) or positional[model_name].get(ref_id))
+                ), None)
                 if cached_text:
-                    final_elements.append(TranslationMapElement(id=el.id, text=cached_text))
+                    final_texts[ref_id] = cached_text
                 else:
-                    needed_elements.append(el)
+                    needed_elements.append(TranslationMapElement(ref_id, sources[ref_id]))
         else:
             needed_elements = to_translate.elements
 
-        # 2. Logic: Translate only what's missing
+        if use_cache:
+            telemetry.increment("cache_hits", len(final_texts))
+            telemetry.increment("cache_misses", len(needed_elements))
+
+        if self.journal and final_texts:
+            self.journal.record_progress(run_id, list(final_texts))
+
+        # 2. Logic: Translate only what's missing, checkpointing every validated batch
+        checkpointed: set[str] = set()
+        checkpoint_lock = threading.Lock()
+
+        def restore(elements: list[TranslationMapElement]) -> list[TranslationMapElement]:
+            if not self.compressor:
+                return elements
+            return [
+                TranslationMapElement(id=el.id, text=self.compressor.restore(sources[el.id], el.text))
+                for el in elements
+            ]
+
+        def on_batch_complete(model_name: str, elements: list[TranslationMapElement]):
+            checkpoint(model_name, restore(elements))
+
+        def checkpoint(model_name: str, elements: list[TranslationMapElement]):
+            hashes = hashes_for(model_name, [el.id for el in elements])
+            self.cache.save_batch(book_id, model_name, target_lang, elements, source_hashes=hashes)
+            self.cache.save_by_hash(
+                model_name, target_lang, prompt_version,
+                [(hashes[el.id], sources[el.id], el.text) for el in elements]
+            )
+            if self.journal:
+                self.journal.record_progress(run_id, [el.id for el in elements])
+            with checkpoint_lock:
+                checkpointed.update(el.id for el in elements)
+
+        # Caller-supplied translations first; then near-duplicates from the translation
+        # memory: typographic variants are reused, the rest travel with their closest
+        # earlier translation as an example (caller hints take precedence)
+        reuse = reuse or {}
+        hints = hints or {}
+        reused = [TranslationMapElement(id=el.id, text=reuse[el.id]) for el in needed_elements if el.id in reuse]
+        if self.memory and use_cache and needed_elements:
+            memory_reused, memory_hints = self._consult_memory(
+                [el for el in needed_elements if el.id not in reuse], target_lang, lookup_models, prompt_version
+            )
+            reused += memory_reused
+            telemetry.increment("memory_reused", len(memory_reused))
+            telemetry.increment("memory_hints", len(memory_hints))
+            hints = {**memory_hints, **hints}
+        if reused:
+            checkpoint(current_model, reused)
+            final_texts.update((el.id, el.text) for el in reused)
+            reused_ids = {el.id for el in reused}
+            needed_elements = [el for el in needed_elements if el.id not in reused_ids]
+
         if needed_elements:
             logger.info(f"Translating {len(needed_elements)} elements via API...")
-            translated_batch = self.client.translate_batch(
-                TranslationMap(elements=needed_elements), 
-                target_lang
-            )
-            
-            # Persist new translations
-            self.cache.save_batch(book_id, current_model, translated_batch.elements)
-            final_elements.extend(translated_batch.elements)
+            to_send = TranslationMap(elements=needed_elements)
+            if self.compressor:
+                to_send = self.compressor.compress_map(to_send)
+                hints = {
+                    ref_id: (self.compressor.compress(source), self.compressor.compress(translation))
+                    for ref_id, (source, translation) in hints.items()
+                }
+
+            try:
+                translated_batch = self.client.translate_batch(
+                    to_send,
+                    target_lang,
+                    on_batch_complete=on_batch_complete,
+                    hints=hints,
+                )
+            except Exception:
+                if self.journal:
+                    self.journal.finish_run(run_id, "failed")
+                logger.error(f"Translation interrupted; {len(checkpointed)} new elements were checkpointed.")
+                raise
+
+            translated_elements = restore(translated_batch.elements)
+            # Persist anything the client returned without checkpointing it
+            pending = [el for el in translated_elements if el.id not in checkpointed]
+            if pending:
+                checkpoint(current_model, pending)
+            final_texts.update((el.id, el.text) for el in translated_elements)
+
+        # Elements the client gave up on keep their source text (never cached) so the
+        # rebuilt document has no dangling placeholders; the run stays resumable
+        untranslated = [ref_id for ref_id in all_ids if ref_id not in final_texts]
+        if untranslated:
+            logger.warning(f"{len(untranslated)} elements could not be translated and keep their original text.")
+            if on_untranslated:
+                on_untranslated(untranslated)
+
+        if self.journal:
+            self.journal.finish_run(run_id, "incomplete" if untranslated else "completed")
 
-        # 3. Maintain original order (Optional but recommended for stability)
-        # We re-sort based on the original request's ID list
-        order_map = {el.id: i for i, el in enumerate(to_translate.elements)}
-        final_elements.sort(key=lambda x: order_map.get(x.id, 999))
+        # 3. Laid out in the order of the request (source texts fill the gaps)
+        return TranslationMap.merged(all_ids, sources, final_texts)
 
-        return TranslationMap(elements=final_elements)
\ No newline at end of file
+    def _consult_memory(
+        self, elements: list[TranslationMapElement], target_lang: str, model_names: list[str], prompt_version: str
+    ) -> tuple[list[TranslationMapElement], dict[str, tuple[str, str]]]:
+        """Splits cache misses into memory reuses and (source, translation) hints by id."""
+        self.memory.refresh()
+        reused = []
+        hints = {}
+        for el in elements:
+            match = self.memory.lookup(el.text, target_lang, model_names, prompt_version)
+            if match is None:
+                continue
+            if match.exact:
+                reused.append(TranslationMapElement(id=el.id, text=match.translation))
+            else:
+                hints[el.id] = (match.source, match.translation)
+        if reused or hints:
+            logger.info(f"Translation memory: {len(reused)} elements reused, {len(hints)} sent with a similar example.")
+        return reused, hints
@@ -1,12 +1,24 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from models import api
 from models.translation import TranslationMapElement, TranslationMap
 from models.usage import UsageStatistics
-from prompts import PROMPTS_DICT
-from core.config import settings
+from prompts import get_system_prompt, format_memory_hints
+from core.config import get_settings
 from core.protocols import TranslationValidator
-from core.validators import TranslationValidationError, IDAlignmentValidator
-import time
+from core.validators import TranslationValidationError, MalformedResponseError, IDAlignmentValidator
+from core.rate_limiter import RateController, wait_retry_after
+from core.telemetry import telemetry
+from core.batching import TokenBatcher, StitchBuffer, base_id
+from core.model_catalog import ModelCatalog
+from core.streaming import IncrementalElementParser, iter_sse_data
+from collections import Counter, deque
+from typing import Callable
+from pydantic import ValidationError
 import logging
+import threading
+import time
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -16,14 +28,30 @@ from tenacity import (
 )
 
 logger = logging.getLogger(__name__)
+_log_retry = before_sleep_log(logger, logging.WARNING)
+
+
+def _before_retry(retry_state):
+    telemetry.increment("api_retries")
+    _log_retry(retry_state)
+
+
+class RequestCancelled(Exception):
+    """Raised inside a translate_batch call whose `cancelled` event was set (e.g. a lost hedge)."""
 
 
 def is_api_transient_error(exception):
     """Checks if the exception is a 429, 5xx, or a validation error that warrants a retry."""
+    if isinstance(exception, MalformedResponseError):
+        # Truncated/malformed JSON is handled by bisecting the batch, not by resending it whole
+        return False
     if isinstance(exception, TranslationValidationError):
         return True
     if isinstance(exception, requests.exceptions.HTTPError) and exception.response is not None:
         return exception.response.status_code == 429 or 500 <= exception.response.status_code < 600
+    if isinstance(exception, requests.exceptions.ChunkedEncodingError):
+        # A stream that dropped before delivering any element
+        return True
     return False
 
 
@@ -34,106 +62,364 @@ class OpenRouterClient:
 
     # "mistralai/devstral-2512:free"
     # "meta-llama/llama-3.3-70b-instruct:free"
-    def __init__(self, api_key: str, stats: UsageStatistics, model: str = settings.default_model, validator: TranslationValidator = None):
+    def __init__(self, api_key: str, stats: UsageStatistics, model: str | None = None, validator: TranslationValidator = None, rate_controller: RateController = None):
+        settings = get_settings()
         self.api_key = api_key
-        self.model = model
+        self.model = model or settings.default_model
         self.stats = stats
         self.url = f"{settings.openrouter_base_url}/chat/completions"
         self.price_per_token_prompt = 0.0
         self.price_per_token_completion = 0.0
+        # Model limits from the catalogue (None = unknown); they cap the batch budgets
+        self.context_length: int | None = None
+        self.max_output_tokens: int | None = None
         # Por defecto usamos el validador de IDs si no se provee ninguno
         self.validator = validator or IDAlignmentValidator()
+        self.max_concurrent_requests = max(1, settings.max_concurrent_requests)
+        self.max_element_attempts = settings.max_element_attempts
+        self.stream_responses = settings.stream_responses
+        self.max_hints_per_request = settings.memory_max_hints
+        # Shared keep-alive session so concurrent batches reuse TCP/TLS connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.http_pool_size, pool_maxsize=settings.http_pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Se puede compartir el mismo controlador entre varios clientes del mismo proveedor
+        self.rate_controller = rate_controller or RateController.from_settings(settings)
+
+    def fetch_model_prices(self, catalog: ModelCatalog | None = None):
+        """
+        Loads the pricing and limits of the configured model from the OpenRouter catalogue,
+        cached on disk (see core.model_catalog); pass one `catalog` to share it between clients.
+        """
+        model_info = (catalog or ModelCatalog(session=self.session)).get(self.model)
+        if model_info:
+            # OpenRouter devuelve precios por 1M de tokens
+            self.price_per_token_prompt = model_info.price_prompt_1m
+            self.price_per_token_completion = model_info.price_completion_1m
+            self.context_length = model_info.context_length
+            self.max_output_tokens = model_info.max_output_tokens
+            logger.info(
+                f"Pricing loaded for {self.model}: ${self.price_per_token_prompt}/1M prompt | "
+                f"${self.price_per_token_completion}/1M completion | context {self.context_length}"
+            )
+
+    def translate_batch(
+        self,
+        translation_map: TranslationMap,
+        target_lang: str,
+        batch_size: int = 80,
+        on_batch_complete: Callable[[str, list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+        executor: Executor | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> TranslationMap:
+        """
+        Translates the map in token-budgeted chunks (at most `batch_size` elements each),
+        keeping up to `max_concurrent_requests` in flight, or handing every chunk to
+        `executor` (e.g. a shared scheduler lane) when one is given.
+        `on_batch_complete(model, elements)` is called as soon as each chunk passes validation,
+        so callers can checkpoint progress before the whole map is done.
+        `hints` maps element ids to a similar (source, translation) pair sent as an example.
+        Setting `cancelled` stops the call before its next request (or mid-stream) with
+        RequestCancelled; elements already handed to `on_batch_complete` stay valid.
+        """
+        system_prompt = get_system_prompt(target_lang)
+        batcher = TokenBatcher.for_model(
+            get_settings(), self.model, max_elements=batch_size,
+            context_length=self.context_length, max_output_tokens=self.max_output_tokens,
+        )
+        batches = batcher.pack(translation_map.elements)
+        stitch_buffer = StitchBuffer(batches)
+        total = len(batches)
+
+        def process(indexed_batch: tuple[int, list[TranslationMapElement]]) -> list[TranslationMapElement]:
+            index, batch = indexed_batch
+            logger.info(f"Processing batch {index + 1}/{total} ({len(batch)} elements)...")
+            logger.debug(f"Sending {batch=}")
+            batch_completed = []
+
+            def emit(elements: list[TranslationMapElement]):
+                # Split elements are only released once every piece is translated
+                completed = stitch_buffer.add(elements)
+                if completed:
+                    batch_completed.extend(completed)
+                    if on_batch_complete:
+                        on_batch_complete(self.model, completed)
+
+            self._translate_chunk(batch, system_prompt, on_elements=emit, hints=hints, cancelled=cancelled)
+            return batch_completed
+
+        if executor is not None:
+            futures = [executor.submit(process, indexed) for indexed in enumerate(batches)]
+            completed = [el for future in futures for el in future.result()]
+        else:
+            workers = min(self.max_concurrent_requests, total) or 1
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="openrouter") as pool:
+                completed = [el for batch_result in pool.map(process, enumerate(batches)) for el in batch_result]
+
+        # A split element completes with its last piece, so restore the original element order
+        return TranslationMap.merged(translation_map.ids, {el.id: el.text for el in completed})
+
+    def _translate_chunk(
+        self,
+        batch: list[TranslationMapElement],
+        system_prompt: str,
+        on_elements: Callable[[list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> list[TranslationMapElement]:
+        """
+        Translates one batch keeping every correctly returned element:
+        - missing/invalid IDs are re-requested on their own,
+        - a truncated or malformed response is bisected,
+        - an element that fails `max_element_attempts` times is given up on.
+        Validated elements are passed to `on_elements` as soon as they are available.
+        """
+        results: dict[str, TranslationMapElement] = {}
+        attempts: Counter[str] = Counter()
+        queue = deque([batch])
+
+        while queue:
+            chunk = queue.popleft()
+            try:
+                if self.stream_responses:
+                    # Streaming hands every element over the moment it is parsed
+                    translated = self._send_request(
+                        chunk, system_prompt, on_elements=on_elements, hints=hints, cancelled=cancelled
+                    )
+                else:
+                    translated = self._send_request(chunk, system_prompt, hints=hints, cancelled=cancelled)
+                    if on_elements and translated:
+                        on_elements(translated)
+            except MalformedResponseError as e:
+                if len(chunk) > 1:
+                    telemetry.increment("bisections")
+                    middle = len(chunk) // 2
+                    logger.warning(f"{e} Bisecting {len(chunk)} elements into {middle} + {len(chunk) - middle}.")
+                    queue.extend([chunk[:middle], chunk[middle:]])
+                    continue
+                translated = []
+
+            for el in translated:
+                results[el.id] = el
 
-    def fetch_model_prices(self):
-        """Fetches the current pricing for the configured model from OpenRouter."""
-        response = requests.get(f"{settings.openrouter_base_url}/models")
-        if response.status_code == 200:
-            models = response.json().get("data", [])
-            # Buscamos nuestro modelo en la listal
-            model_info = next((m for m in models if m["id"] == self.model), None)
-            if model_info:
-                # OpenRouter devuelve precios por 1M de tokens
-                pricing = model_info.get("pricing", {})
-                self.price_per_token_prompt = float(pricing.get("prompt", 0))
-                self.price_per_token_completion = float(pricing.get("completion", 0))
-                logger.info(f"Pricing loaded for {self.model}: ${self.price_per_token_prompt}/1M prompt | ${self.price_per_token_completion}/1M prompt")
-
-    def translate_batch(self, translation_map: TranslationMap, target_lang: str, batch_size: int = 80) -> TranslationMap:
-        """Translates the map in smaller chunks to avoid Rate Limits (Error 429)."""
-        all_translated_elements = []
-        elements = translation_map.elements
-        system_prompt = PROMPTS_DICT.get(target_lang)
-
-        # Split elements into smaller lists
-        for i in range(0, len(elements), batch_size):
-            batch = elements[i : i + batch_size]
-            logger.info(f"Processing batch {i//batch_size + 1} ({len(batch)} elements)...")
-            logger.info(f"Sending {batch=}")
-            
-            translated_elements = self._send_request(batch, system_prompt)
-            all_translated_elements.extend(translated_elements)
-            
-            # Wait 2-3 seconds between batches to avoid the 429 error
-            if i + batch_size < len(elements):
-                logger.info("Waiting to avoid Rate Limit...")
-                time.sleep(3)
-
-        return TranslationMap(elements=all_translated_elements)
+            retry_elements = []
+            for el in chunk:
+                if el.id in results:
+                    continue
+                attempts[el.id] += 1
+                if attempts[el.id] >= self.max_element_attempts:
+                    logger.error(f"Giving up on {el.id} after {attempts[el.id]} attempts.")
+                    telemetry.increment("elements_given_up")
+                else:
+                    retry_elements.append(el)
+            if retry_elements:
+                logger.info(f"Re-requesting {len(retry_elements)} missing elements...")
+                telemetry.increment("elements_rerequested", len(retry_elements))
+                queue.append(retry_elements)
+
+        return [results[el.id] for el in batch if el.id in results]
 
     @retry(
         retry=retry_if_exception(is_api_transient_error),
-        wait=wait_exponential(multiplier=1, min=4, max=60),
+        wait=wait_retry_after(fallback=wait_exponential(multiplier=1, min=4, max=60)),
         stop=stop_after_attempt(5),
-        before_sleep=before_sleep_log(logger, logging.WARNING)
+        before_sleep=_before_retry
     )
-    def _send_request(self, batch: list[TranslationMapElement], system_prompt: str) -> list[TranslationMapElement]:
+    def _send_request(
+        self,
+        batch: list[TranslationMapElement],
+        system_prompt: str,
+        on_elements: Callable[[list[TranslationMapElement]], None] | None = None,
+        hints: dict[str, tuple[str, str]] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> list[TranslationMapElement]:
         """Internal method to handle a single API call."""
+        # Checked on every (re)try, so a cancelled call does not outlive its backoff
+        if cancelled is not None and cancelled.is_set():
+            raise RequestCancelled(f"Request for {len(batch)} elements cancelled.")
         prompt_content = "\n".join([f"{el.id}: {el.text}" for el in batch])
-        json_schema = TranslationMap.model_json_schema()
+        messages = [{"role": "system", "content": system_prompt}]
+        examples = self._examples_for(batch, hints)
+        if examples:
+            messages.append({"role": "system", "content": format_memory_hints(examples)})
+        messages.append({"role": "user", "content": prompt_content})
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt_content}
-            ],
+            "messages": messages,
             "response_format": {
                 "type": "json_schema",
                 "json_schema": {
                     "name": "translation_map",
                     "strict": True,
-                    "schema": json_schema
+                    "schema": api.RESPONSE_SCHEMA
                 }
             }
         }
+        if self.stream_responses:
+            payload["stream"] = True
+            # Usage is only reported in the final chunk when explicitly requested
+            payload["stream_options"] = {"include_usage": True}
 
-        response = requests.post(self.url, headers=headers, json=payload)
+        # Rough chars/4 estimate of prompt + completion for the tokens-per-minute bucket
+        estimated_tokens = (sum(len(m["content"] or "") for m in messages) + len(prompt_content)) // 4
+        with telemetry.timer("rate_limit_wait"):
+            self.rate_controller.acquire(estimated_tokens)
+        try:
+            started = time.perf_counter()
+            if self.stream_responses:
+                response = self.session.post(self.url, headers=headers, json=payload, stream=True)
+            else:
+                response = self.session.post(self.url, headers=headers, json=payload)
+            self.rate_controller.record_response(response.status_code, response.headers)
+        finally:
+            self.rate_controller.release()
+        telemetry.increment("api_requests")
+        if response.status_code == 429:
+            telemetry.increment("api_429")
+        elif response.status_code >= 500:
+            telemetry.increment("api_5xx")
         response.raise_for_status()
-        
+
+        if self.stream_responses:
+            try:
+                return self._consume_stream(response, batch, on_elements, cancelled)
+            finally:
+                # A streamed request lasts until its last event
+                telemetry.observe("api_request", time.perf_counter() - started)
+
+        telemetry.observe("api_request", time.perf_counter() - started)
         data = response.json()
-        usage = data.get("usage", {})
+        self._record_usage(data.get("usage") or {})
+
+        raw_json = data["choices"][0]["message"]["content"]
+        with telemetry.timer("validation"):
+            try:
+                translated_map = api.TranslationMap.model_validate_json(raw_json).to_map()
+            except ValidationError as e:
+                logger.error(f"Validation failed. Response content: {raw_json}")
+                raise MalformedResponseError(f"Malformed response for {len(batch)} elements.") from e
+
+            return self._salvage(batch, translated_map)
+
+    def _examples_for(
+        self, batch: list[TranslationMapElement], hints: dict[str, tuple[str, str]] | None
+    ) -> list[tuple[str, str]]:
+        """Memory examples for the elements of one request (pieces of a split element share one)."""
+        if not hints:
+            return []
+        examples = {}
+        for el in batch:
+            hint = hints.get(base_id(el.id))
+            if hint:
+                examples.setdefault(hint, None)
+        return list(examples)[:self.max_hints_per_request]
+
+    def _consume_stream(
+        self,
+        response: requests.Response,
+        batch: list[TranslationMapElement],
+        on_elements: Callable[[list[TranslationMapElement]], None] | None,
+        cancelled: threading.Event | None = None,
+    ) -> list[TranslationMapElement]:
+        """
+        Reads an SSE completion, validating and emitting each element as soon as its JSON
+        object is complete. Whatever arrived before a drop or truncation is kept; the
+        caller re-requests the rest.
+        """
+        requested = {el.id: el for el in batch}
+        parser = IncrementalElementParser()
+        received: dict[str, TranslationMapElement] = {}
+        usage = {}
+
+        try:
+            for event in iter_sse_data(response.iter_lines()):
+                if cancelled is not None and cancelled.is_set():
+                    raise RequestCancelled(f"Stream cancelled after {len(received)}/{len(batch)} elements.")
+                if event.get("usage"):
+                    usage = event["usage"]
+                for choice in event.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content") or ""
+                    fresh = [self._accept_streamed(raw, requested, received) for raw in parser.feed(delta)]
+                    fresh = [el for el in fresh if el is not None]
+                    if fresh and on_elements:
+                        on_elements(fresh)
+        except requests.exceptions.ChunkedEncodingError:
+            if not received:
+                raise
+            logger.warning(f"Stream dropped after {len(received)}/{len(batch)} elements; keeping them.")
+        finally:
+            response.close()
+            self._record_usage(usage)
+
+        if not received and parser.text:
+            logger.error(f"Validation failed. Response content: {parser.text}")
+            raise MalformedResponseError(f"Malformed streamed response for {len(batch)} elements.")
+        return list(received.values())
+
+    def _accept_streamed(self, raw: dict, requested: dict, received: dict) -> TranslationMapElement | None:
+        """Validates one streamed element on its own; returns it if it is new and valid."""
+        try:
+            element = api.TranslationMapElement.model_validate(raw).to_element()
+        except ValidationError:
+            return None
+        if element.id not in requested or element.id in received:
+            return None
+        try:
+            self.validator.validate([requested[element.id]], TranslationMap(elements=[element]))
+        except TranslationValidationError as e:
+            logger.warning(f"Discarding streamed {element.id}: {e}")
+            return None
+        received[element.id] = element
+        return element
+
+    def _record_usage(self, usage: dict):
         prompt_tokens = usage.get("prompt_tokens", 0)
         completion_tokens = usage.get("completion_tokens", 0)
+        telemetry.increment("prompt_tokens", prompt_tokens)
+        telemetry.increment("completion_tokens", completion_tokens)
         self.stats.add_usage(
             prompt=prompt_tokens,
             completion=completion_tokens,
             price_prompt_1m=self.price_per_token_prompt,
-            price_completion_1m=self.price_per_token_completion
+            price_completion_1m=self.price_per_token_completion,
+            model=self.model,
         )
-        
+
         logger.info(f"Batch Usage: {prompt_tokens} prompt, {completion_tokens} completion tokens.")
 
-        raw_json = response.json()["choices"][0]["message"]["content"]
-        try:
-            translated_map = TranslationMap.model_validate_json(raw_json)
-            
-            # Ejecutamos la lógica de validación desacoplada
-            self.validator.validate(batch, translated_map)
-            
-            return translated_map.elements
-            
-        except (TranslationValidationError, Exception) as e:
-            if isinstance(e, TranslationValidationError):
-                raise e
-            logger.error(f"Validation failed. Response content: {raw_json}")
-            raise e
\ No newline at end of file
+    def _salvage(self, batch: list[TranslationMapElement], translated_map: TranslationMap) -> list[TranslationMapElement]:
+        """
+        Runs the validator; when it blames specific IDs, keeps every other element that was
+        actually requested instead of failing the whole batch. The survivors are validated
+        again (a later validator may blame others once the first one's culprits are gone)
+        until they pass or nothing is left. Blamed elements are left to `_translate_chunk`,
+        which re-requests them within their own attempt budget.
+        """
+        requested = {el.id: el for el in batch}
+        expected, received = batch, translated_map
+        blamed: set[str] = set()
+        while True:
+            try:
+                # Ejecutamos la lógica de validación desacoplada
+                self.validator.validate(expected, received)
+            except TranslationValidationError as e:
+                # Nothing new to blame: salvaging again would loop forever
+                if not e.failed_ids or e.failed_ids <= blamed:
+                    raise
+                blamed |= e.failed_ids
+                kept = {}
+                for el in received:
+                    if el.id in requested and el.id not in blamed:
+                        kept.setdefault(el.id, el)
+                if not kept:
+                    logger.warning(f"Nothing salvageable from {len(batch)} elements ({e}).")
+                    return []
+                expected = [requested[i] for i in kept]
+                received = TranslationMap(elements=kept.values())
+                continue
+            if blamed:
+                logger.warning(f"Salvaged {len(received)}/{len(batch)} elements (blamed: {sorted(blamed)}).")
+            return received.elements
\ No newline at end of file
@@ -1,21 +1,48 @@
 from core.protocols import TranslationValidator
+from core.markup import MarkupCompressor
 from models.translation import TranslationMap, TranslationMapElement
 
 class TranslationValidationError(Exception):
-    """Excepción base para errores de validación de traducción."""
+    """
+    Excepción base para errores de validación de traducción.
+    `failed_ids` identifica los elementos culpables cuando se conocen, para poder
+    conservar el resto del batch y re-pedir sólo esos.
+    """
+    def __init__(self, message: str, failed_ids: set[str] | None = None):
+        super().__init__(message)
+        self.failed_ids = set(failed_ids or ())
+
+class MalformedResponseError(TranslationValidationError):
+    """La respuesta no es un TranslationMap válido (JSON truncado o mal formado)."""
     pass
 
 class IDAlignmentValidator:
     """Valida que los IDs recibidos coincidan exactamente con los enviados."""
     def validate(self, original_elements: list[TranslationMapElement], translated_map: TranslationMap) -> None:
         sent_ids = {el.id for el in original_elements}
-        received_ids = {el.id for el in translated_map.elements}
+        received_ids = set(translated_map.ids)
         
         if sent_ids != received_ids:
             missing = sent_ids - received_ids
             extra = received_ids - sent_ids
             raise TranslationValidationError(
-                f"ID Mismatch. Missing: {missing}, Extra: {extra}"
+                f"ID Mismatch. Missing: {missing}, Extra: {extra}",
+                failed_ids=missing | extra
+            )
+
+class MarkupPlaceholderValidator:
+    """Valida que cada marcador de etiqueta comprimida (<x1>, </x1>, <x2/>) vuelva intacto."""
+    def validate(self, original_elements: list[TranslationMapElement], translated_map: TranslationMap) -> None:
+        originals = {el.id: el.text for el in original_elements}
+        broken = {
+            ref_id for ref_id, text in translated_map.items()
+            if ref_id in originals
+            and MarkupCompressor.placeholders(text) != MarkupCompressor.placeholders(originals[ref_id])
+        }
+        if broken:
+            raise TranslationValidationError(
+                f"Markup placeholders altered in: {broken}",
+                failed_ids=broken
             )
 
 class CompositeValidator:
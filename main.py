@@ -1,14 +1,22 @@
 from models.usage import UsageStatistics
-from core.translator import OpenRouterClient
-from core.epub_processor import EpubProcessor
 from core.persistence import TranslationCache
-from core.translation_service import TranslationService
-from core.config import settings
-from utils.epub_utils import load_epub_content, count_map_tokens
-from models.translation import TranslationMap
+from core.config import get_settings
+from models.job import BookJob
+from models.report import PreflightReport
+from core.protocols import TranslatorClient
+from core.telemetry import telemetry, profile
+from typing import TYPE_CHECKING
+import argparse
 import os
 import logging
 
+# The HTTP client, HTML parsing and EPUB modules (requests, bs4, tiktoken...) are imported
+# by the functions that need them, and settings are only read once a command runs, so
+# `--status` starts instantly and `--help` works without any configuration
+if TYPE_CHECKING:
+    from core.epub_pipeline import EpubTranslationPipeline
+    from core.preflight import PreflightEstimator
+
 # Configuración de Logging para ver el flujo detallado
 logging.basicConfig(
     level=logging.INFO,
@@ -16,80 +24,287 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def translate_ebook_flow(target_language: str = "spanish", use_cache: bool = True):
-    """Main business logic orchestration."""
-    
-    # 1. Initialization (Dependency Injection principle)
-    cache = TranslationCache()
-    session_stats = UsageStatistics()
-    client = OpenRouterClient(api_key=settings.openrouter_api_key, stats=session_stats)
-    client.fetch_model_prices()
-
-    service = TranslationService(client, cache)
-    processor = EpubProcessor()
-
-    # 2. Data Loading
-    # file_path = "reduced_2_first_chapter.html"
-    # raw_html = load_reduced_first_chapter(file_path)
-    
-    file_path = "Dungeon_Crawler_Carl.epub"
-    raw_html = load_epub_content(file_path)
-    print(f"{len(raw_html)=}")
-    logger.info(f"Starting process for {file_path}")
-
-    import sys
-    # 3. Execution Flow
-    try:
-        # Transformation
-        skeleton, map_to_translate = processor.extract_structure(raw_html)
-        logger.info(f"Extracted {len(map_to_translate.elements)} elements.")
 
-        print(f"{len(map_to_translate.model_dump())=}")
-        # print(f"{map_to_translate.model_dump()["elements"]=}")
+def build_client(session_stats: UsageStatistics) -> TranslatorClient:
+    """One OpenRouter client, or a hedging router when fallback models are configured."""
+    from core.model_catalog import ModelCatalog
+    from core.rate_limiter import RateController
+    from core.router import RoutingTranslatorClient
+    from core.translator import OpenRouterClient
+    from core.validators import CompositeValidator, IDAlignmentValidator, MarkupPlaceholderValidator
 
-        # import json
-        # a = "\n\n\n".join(json.dumps(elem) for elem in map_to_translate.model_dump()["elements"][100:200])
-        # print(a)
-        # sys.exit(1)
+    settings = get_settings()
+    validator = CompositeValidator([IDAlignmentValidator(), MarkupPlaceholderValidator()])
+    # Prices and context limits come from the on-disk catalogue; no download once it is cached
+    catalog = ModelCatalog()
+    # Every model is served by the same OpenRouter account, so they share its rate limits
+    rate_controller = RateController.from_settings(settings)
+    clients = []
+    for model in [settings.default_model, *settings.fallback_models]:
+        client = OpenRouterClient(
+            api_key=settings.openrouter_api_key, stats=session_stats, model=model,
+            validator=validator, rate_controller=rate_controller,
+        )
+        client.fetch_model_prices(catalog)
+        clients.append(client)
+    return RoutingTranslatorClient(clients) if len(clients) > 1 else clients[0]
 
 
-        map_to_translate = TranslationMap(elements=map_to_translate.model_dump()["elements"][:200])
+def build_preflight(
+    client: TranslatorClient, cache: TranslationCache | None, filter_segments: bool | None = None
+) -> "PreflightEstimator":
+    """Estimator priced and sized for the primary model, which gets every batch unless it fails or lags."""
+    from core.markup import MarkupCompressor
+    from core.preflight import PreflightEstimator
+    from core.router import RoutingTranslatorClient
+    from core.segment_filter import SegmentFilter
 
-        total_tokens_to_translate = count_map_tokens(map_to_translate)
-        logger.info(f"Sending {total_tokens_to_translate} tokens to LLM.")
+    settings = get_settings()
+    if filter_segments is None:
+        filter_segments = settings.filter_segments
+    primary = client.routes[0].client if isinstance(client, RoutingTranslatorClient) else client
+    return PreflightEstimator(
+        model=primary.model,
+        price_prompt_1m=primary.price_per_token_prompt,
+        price_completion_1m=primary.price_per_token_completion,
+        context_length=primary.context_length,
+        max_output_tokens=primary.max_output_tokens,
+        segment_filter=SegmentFilter(settings.segment_filter_rules) if filter_segments else None,
+        compressor=MarkupCompressor() if settings.compress_markup else None,
+        cache=cache,
+        workers=settings.processing_workers,
+    )
 
-        # To estimate the cost, we multiply tokens * 2 becuase of input and output tokens of LLM.
-        logger.info(f"Escenario Económico (Gemini Flash): ${((total_tokens_to_translate * 2) / 1_000_000) * 0.10:.4f}")
-        logger.info(f"Escenario Estándar (GPT-4o Mini):   ${((total_tokens_to_translate * 2) / 1_000_000) * 0.6:.4f}")
-        logger.info(f"Escenario Premium  (GPT-4o/Claude):  ${((total_tokens_to_translate * 2) / 1_000_000) * 5:.4f}")
-        # logger.info(f"Esimated cost of the translation ")
 
+def log_preflight(report: PreflightReport):
+    logger.info(f"PREVISIÓN ({report.target_lang}, {report.model})")
+    for chapter in report.chapters:
+        if chapter.batches:
+            logger.info(
+                f"  {chapter.path}: {len(chapter.batches)} peticiones, "
+                f"{chapter.input_tokens} + {chapter.output_tokens} tokens ({chapter.cached_elements} en caché)"
+            )
+    logger.info(f"Peticiones: {report.requests} ({report.request_overhead_tokens} tokens fijos por petición)")
+    logger.info(f"Tokens previstos: {report.input_tokens} entrada + {report.output_tokens} salida")
+    logger.info(f"Coste previsto: ${report.cost_usd:.4f}")
+    logger.info(f"Tiempo previsto: ~{report.seconds / 60:.1f} min (limitado por {report.bottleneck})")
+
+
+def log_usage(session_stats: UsageStatistics):
+    logger.info(f"Tokens Totales: {session_stats.total_tokens}")
+    logger.info(f"Coste Estimado: ${session_stats.total_cost_usd}")
+    if len(session_stats.by_model) > 1:
+        for model, usage in session_stats.by_model.items():
+            logger.info(f"  {model}: {usage.requests} peticiones, {usage.prompt_tokens + usage.completion_tokens} tokens, ${usage.cost_usd}")
 
-        translated_map = service.translate(
-            book_id=file_path,
-            to_translate=map_to_translate,
-            target_lang=target_language,
-            use_cache=use_cache
-        )
 
-        # Reconstruction
-        final_html = processor.rebuild_html(skeleton, translated_map)
-        
-        # 4. Output
-        with open("translated_chapter.html", "w", encoding="utf-8") as f:
-            f.write(final_html)
+def export_telemetry(json_path: str | None = None, prometheus_path: str | None = None):
+    settings = get_settings()
+    json_path = json_path or settings.metrics_json_path
+    prometheus_path = prometheus_path or settings.metrics_prometheus_path
+    report = telemetry.report()
+    api = report["phases"].get("api_request")
+    logger.info(f"Ratio de aciertos de caché: {report['derived']['cache_hit_ratio']}")
+    logger.info(f"Tokens por segundo: {report['derived']['tokens_per_second']}")
+    if api:
+        logger.info(f"Latencia API: p50 {api['p50']:.2f}s, p99 {api['p99']:.2f}s ({api['count']} peticiones)")
+    logger.info(f"Reintentos: {report['counters'].get('api_retries', 0)}, respuestas 429: {report['counters'].get('api_429', 0)}")
+    if json_path:
+        telemetry.write_json(json_path)
+    if prometheus_path:
+        telemetry.write_prometheus(prometheus_path)
+
+
+def build_pipeline(
+    client: TranslatorClient, cache: TranslationCache, filter_segments: bool | None = None
+) -> "EpubTranslationPipeline":
+    from core.epub_pipeline import EpubTranslationPipeline
+    from core.epub_processor import EpubProcessor
+    from core.markup import MarkupCompressor
+    from core.segment_filter import SegmentFilter
+    from core.translation_memory import TranslationMemory
+    from core.translation_service import TranslationService
+
+    settings = get_settings()
+    if filter_segments is None:
+        filter_segments = settings.filter_segments
+    # The cache doubles as the run journal, so interrupted runs can be resumed
+    compressor = MarkupCompressor() if settings.compress_markup else None
+    memory = TranslationMemory(cache, threshold=settings.memory_similarity_threshold) if settings.translation_memory else None
+    service = TranslationService(client, cache, journal=cache, compressor=compressor, memory=memory)
+    segment_filter = SegmentFilter(settings.segment_filter_rules) if filter_segments else None
+    return EpubTranslationPipeline(
+        EpubProcessor(), service, workers=settings.processing_workers, segment_filter=segment_filter
+    )
+
+
+def translate_ebook_flow(
+    file_path: str = "Dungeon_Crawler_Carl.epub",
+    target_language: str | list[str] = "spanish",
+    use_cache: bool = True,
+    resume: bool = False,
+    output_path: str | None = None,
+    filter_segments: bool | None = None,
+    previous_edition: str | None = None,
+    max_cost_usd: float | None = None,
+):
+    """
+    Main business logic orchestration.
+    A list of `target_language`s fans out: the book is extracted once and translated into
+    every language concurrently, writing <book>.<language>.epub for each.
+    `previous_edition` is the path of an earlier edition already translated with this
+    cache; only paragraphs that changed since then are sent to the API.
+    Nothing is sent when the preflight estimate for all languages exceeds `max_cost_usd`.
+    """
+
+    # 1. Initialization (Dependency Injection principle)
+    cache = TranslationCache()
+    session_stats = UsageStatistics()
+    client = build_client(session_stats)
+    pipeline = build_pipeline(client, cache, filter_segments)
+
+    # 2. Output location: <book>.<language>.epub next to the original by default
+    languages = [target_language] if isinstance(target_language, str) else list(target_language)
+    if output_path is not None and len(languages) > 1:
+        raise ValueError("output_path can only be given for a single target language")
+    root, ext = os.path.splitext(file_path)
+    output_paths = {lang: output_path or f"{root}.{lang}{ext}" for lang in languages}
+    logger.info(f"Starting process for {file_path} ({', '.join(languages)})")
+
+    # 3. Execution Flow (preflight estimate, then document by document: extract -> dedup -> translate -> rebuild)
+    try:
+        preflight = build_preflight(client, cache if use_cache else None, filter_segments)
+        estimates = [preflight.estimate(file_path, lang) for lang in languages]
+        for estimate in estimates:
+            log_preflight(estimate)
+        projected_cost = sum(estimate.cost_usd for estimate in estimates)
+        if max_cost_usd is not None and projected_cost > max_cost_usd:
+            logger.error(f"Projected cost ${projected_cost:.4f} exceeds the limit of ${max_cost_usd:.4f}; nothing was sent.")
+            return
+
+        reports = pipeline.run_languages(
+            input_path=file_path,
+            output_paths=output_paths,
+            use_cache=use_cache,
+            resume=resume,
+            previous_book_id=previous_edition,
+        )
         logger.info("Process finished successfully.")
 
+        for lang, report in reports.items():
+            logger.info("\n" + "="*30)
+            logger.info(f"RESUMEN ({lang})")
+            logger.info(
+                f"Sent {report.estimated_tokens} tokens to LLM (before cache hits); "
+                f"{report.estimated_tokens_compressed} after markup compression."
+            )
+            logger.info(f"Documentos traducidos: {report.translated_documents}/{report.documents}")
+            logger.info(f"Tokens ahorrados por deduplicación: ~{report.dedup_saved_tokens}")
+            if previous_edition:
+                logger.info(
+                    f"Cambios respecto a la edición anterior: {report.unchanged_elements} sin cambios, "
+                    f"{report.edited_elements} editados, {report.added_elements} nuevos, {report.removed_elements} eliminados"
+                )
+            logger.info(f"Elementos sin traducir (filtro): {report.skipped_elements} (~{report.filter_saved_tokens} tokens)")
+            if report.untranslated_elements:
+                logger.warning(f"Elementos que no se pudieron traducir: {report.untranslated_elements}")
+
         logger.info("\n" + "="*30)
         logger.info("RESUMEN DE CONSUMO")
-        logger.info(f"Tokens Totales: {session_stats.total_tokens}")
-        logger.info(f"Coste Estimado: ${session_stats.total_cost_usd}")
+        log_usage(session_stats)
+        export_telemetry()
         logger.info("="*30)
 
     except Exception as e:
         logger.error(f"Process failed: {e}", exc_info=True)
 
 
+def translate_catalogue(
+    sources: list[str],
+    languages: list[str],
+    priority: int = 0,
+    parallel_books: int | None = None,
+    use_cache: bool = True,
+    preflight_only: bool = False,
+    max_cost_usd: float | None = None,
+):
+    """
+    Queues every book found in `sources` (EPUB files, directories, JSON manifests) and
+    runs all pending jobs, including those left unfinished by earlier invocations.
+    With `preflight_only` the books are only estimated; with `max_cost_usd` books whose
+    estimate exceeds it are not queued.
+    """
+    from core.job_runner import JobRunner, discover_books
+
+    settings = get_settings()
+    cache = TranslationCache()
+    session_stats = UsageStatistics()
+    client = build_client(session_stats)
+    books = discover_books(sources, languages, priority)
+    if preflight_only or max_cost_usd is not None:
+        books = preflight_books(books, build_preflight(client, cache if use_cache else None), max_cost_usd)
+        if preflight_only:
+            return
+    runner = JobRunner(
+        cache, client, lambda scheduled: build_pipeline(scheduled, cache),
+        api_workers=settings.max_concurrent_requests, parallel_books=parallel_books or settings.parallel_books,
+    )
+    runner.enqueue(books)
+    jobs = runner.run(use_cache=use_cache)
+
+    logger.info("\n" + "="*30)
+    logger.info("RESUMEN DEL CATÁLOGO")
+    for job in jobs:
+        logger.info(f"[{job.status:>9}] {job.input_path} ({', '.join(job.languages)}){f': {job.error}' if job.error else ''}")
+    log_usage(session_stats)
+    logger.info("="*30)
+
+
+def preflight_books(books: list[BookJob], preflight: "PreflightEstimator", max_cost_usd: float | None) -> list[BookJob]:
+    """Logs the estimate of every book and returns those within `max_cost_usd`."""
+    accepted = []
+    total_cost = 0.0
+    for book in books:
+        estimates = [preflight.estimate(book.input_path, lang) for lang in book.languages]
+        for estimate in estimates:
+            log_preflight(estimate)
+        cost = sum(estimate.cost_usd for estimate in estimates)
+        if max_cost_usd is not None and cost > max_cost_usd:
+            logger.warning(f"Skipping {book.input_path}: projected cost ${cost:.4f} exceeds ${max_cost_usd:.4f}")
+            continue
+        accepted.append(book)
+        total_cost += cost
+    logger.info(f"Coste previsto de {len(accepted)}/{len(books)} libros: ${total_cost:.4f}")
+    return accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translate EPUB books (single files, directories or JSON manifests).")
+    parser.add_argument("sources", nargs="*", help="EPUB files, directories or .json manifests; none resumes pending jobs")
+    parser.add_argument("--lang", action="append", dest="languages", help="Target language (repeatable; default spanish)")
+    parser.add_argument("--priority", type=int, default=0, help="Priority of the queued books (higher runs first)")
+    parser.add_argument("--books", type=int, help="Books parsed in parallel (default: PARALLEL_BOOKS setting)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached translations")
+    parser.add_argument("--status", action="store_true", help="Only list the job table")
+    parser.add_argument("--preflight", action="store_true", help="Only estimate tokens, cost and time; queue nothing")
+    parser.add_argument("--max-cost", type=float, help="Skip books whose projected cost (USD) exceeds this")
+    parser.add_argument("--metrics-json", help="Write a JSON run report here (default: METRICS_JSON_PATH setting)")
+    parser.add_argument("--metrics-prom", help="Write a Prometheus textfile here (default: METRICS_PROMETHEUS_PATH setting)")
+    parser.add_argument("--profile", help="Dump a cProfile of the run here (default: PROFILE_PATH setting)")
+    args = parser.parse_args()
+
+    if args.status:
+        with TranslationCache() as cache:
+            for job in cache.get_jobs():
+                print(f"{job.job_id:>4} {job.status:>9} p{job.priority:<3} {job.input_path} ({', '.join(job.languages)})")
+        return
+    with profile(args.profile or get_settings().profile_path):
+        translate_catalogue(
+            args.sources, args.languages or ["spanish"], args.priority, args.books, use_cache=not args.no_cache,
+            preflight_only=args.preflight, max_cost_usd=args.max_cost,
+        )
+    export_telemetry(args.metrics_json, args.metrics_prom)
+
 
 if __name__ == "__main__":
-    translate_ebook_flow(use_cache=True)
\ No newline at end of file
+    main()
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from models import translation
+
+# Wire format of the model's answer. The class names end up in the JSON schema sent with
+# every request, so they match the in-memory models of models.translation
+
+
+class TranslationMapElement(BaseModel):
+    id: str = Field(..., description="Unique identifier for reconstruction. Do not modify.")
+    text: str = Field(..., description="Original text with formatting tags like <i> or <b>")
+
+    def to_element(self) -> translation.TranslationMapElement:
+        return translation.TranslationMapElement(self.id, self.text)
+
+
+class TranslationMap(BaseModel):
+    elements: list[TranslationMapElement]
+
+    def to_map(self) -> translation.TranslationMap:
+        return translation.TranslationMap.from_pairs((el.id, el.text) for el in self.elements)
+
+
+# Computed once; it is part of every request payload
+RESPONSE_SCHEMA = TranslationMap.model_json_schema()
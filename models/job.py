@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+class BookJob(BaseModel):
+    input_path: str
+    languages: list[str]
+    priority: int = 0
+
+class JobRecord(BookJob):
+    job_id: int
+    status: str
+    error: str | None = None
+    updated_at: str
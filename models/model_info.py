@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+class ModelInfo(BaseModel):
+    id: str
+    # USD per 1M tokens (OpenRouter's /models reports USD per token)
+    price_prompt_1m: float = 0.0
+    price_completion_1m: float = 0.0
+    context_length: int | None = None
+    max_output_tokens: int | None = None
@@ -0,0 +1,70 @@
+from pydantic import BaseModel
+
+class DedupReport(BaseModel):
+    total_elements: int = 0
+    unique_elements: int = 0
+    duplicate_elements: int = 0
+    saved_tokens: int = 0
+
+class FilterReport(BaseModel):
+    total_elements: int = 0
+    skipped_elements: int = 0
+    saved_tokens: int = 0
+    skipped_by_rule: dict[str, int] = {}
+
+class EditionDiffReport(BaseModel):
+    unchanged: int = 0
+    edited: int = 0
+    added: int = 0
+    removed: int = 0
+
+class PipelineReport(BaseModel):
+    documents: int = 0
+    translated_documents: int = 0
+    elements: int = 0
+    duplicate_elements: int = 0
+    dedup_saved_tokens: int = 0
+    skipped_elements: int = 0
+    filter_saved_tokens: int = 0
+    # Diff against a previous edition (only filled when one is given)
+    unchanged_elements: int = 0
+    edited_elements: int = 0
+    added_elements: int = 0
+    removed_elements: int = 0
+    estimated_tokens: int = 0
+    # Same estimate after inline markup compression (equal to estimated_tokens when disabled)
+    estimated_tokens_compressed: int = 0
+    # Elements the client gave up on; they keep their source text in the output
+    untranslated_elements: int = 0
+
+class BatchEstimate(BaseModel):
+    elements: int = 0
+    # Including the system prompt, response schema and message framing of the request
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+class ChapterEstimate(BaseModel):
+    path: str
+    elements: int = 0
+    skipped_elements: int = 0
+    duplicate_elements: int = 0
+    # Already in the content cache, or sent earlier in the same book
+    cached_elements: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    batches: list[BatchEstimate] = []
+
+class PreflightReport(BaseModel):
+    model: str
+    target_lang: str
+    request_overhead_tokens: int = 0
+    chapters: list[ChapterEstimate] = []
+    elements: int = 0
+    elements_to_send: int = 0
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    seconds: float = 0.0
+    # What bounds `seconds`: "latency", "requests_per_minute" or "tokens_per_minute"
+    bottleneck: str = "latency"
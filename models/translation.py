@@ -1,8 +1,96 @@
-from pydantic import BaseModel, Field
+from collections.abc import Iterable, Iterator
 
-class TranslationMapElement(BaseModel):
-    id: str = Field(..., description="Unique identifier for reconstruction. Do not modify.")
-    text: str = Field(..., description="Original text with formatting tags like <i> or <b>")
 
-class TranslationMap(BaseModel):
-    elements: list[TranslationMapElement]
\ No newline at end of file
+class TranslationMapElement:
+    """One (id, text) pair. A plain __slots__ object: pydantic is only used at the API boundary (models.api)."""
+    __slots__ = ("id", "text")
+
+    def __init__(self, id: str, text: str):
+        self.id = id
+        self.text = text
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TranslationMapElement):
+            return NotImplemented
+        return self.id == other.id and self.text == other.text
+
+    def __repr__(self) -> str:
+        return f"TranslationMapElement(id={self.id!r}, text={self.text!r})"
+
+
+class TranslationMap:
+    """
+    Ordered id -> text map stored as two parallel lists: besides the strings, an element
+    costs two list slots (~16 bytes) instead of a ~480-byte pydantic object, which
+    matters for 100k-paragraph omnibus editions. Slicing shares the strings
+    (only the list slots are copied), and `merged` reassembles translated parts in the
+    source order without sorting.
+
+    `TranslationMap(elements=[...])` and `.elements` are kept for callers working with
+    element objects; the latter builds them on every access, so loops over large maps
+    should use `ids`, `texts`, `items()` or iterate the map directly.
+    """
+    __slots__ = ("ids", "texts")
+
+    def __init__(self, elements: Iterable[TranslationMapElement] = ()):
+        elements = list(elements)
+        self.ids: list[str] = [el.id for el in elements]
+        self.texts: list[str] = [el.text for el in elements]
+
+    @classmethod
+    def from_columns(cls, ids: list[str], texts: list[str]) -> "TranslationMap":
+        """Wraps the two lists as they are (no copy); they must have the same length."""
+        if len(ids) != len(texts):
+            raise ValueError(f"{len(ids)} ids for {len(texts)} texts")
+        t_map = cls.__new__(cls)
+        t_map.ids = ids
+        t_map.texts = texts
+        return t_map
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[str, str]]) -> "TranslationMap":
+        ids, texts = [], []
+        for ref_id, text in pairs:
+            ids.append(ref_id)
+            texts.append(text)
+        return cls.from_columns(ids, texts)
+
+    @classmethod
+    def merged(cls, order: Iterable[str], *parts: "TranslationMap | dict[str, str]") -> "TranslationMap":
+        """
+        The texts of `parts` (maps or id -> text dicts) laid out in the order of `order`;
+        ids found in no part are left out and later parts win over earlier ones.
+        """
+        texts_by_id: dict[str, str] = {}
+        for part in parts:
+            texts_by_id.update(part if isinstance(part, dict) else zip(part.ids, part.texts))
+        return cls.from_pairs((ref_id, texts_by_id[ref_id]) for ref_id in order if ref_id in texts_by_id)
+
+    @property
+    def elements(self) -> list[TranslationMapElement]:
+        return list(map(TranslationMapElement, self.ids, self.texts))
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        return zip(self.ids, self.texts)
+
+    def as_dict(self) -> dict[str, str]:
+        return dict(zip(self.ids, self.texts))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[TranslationMapElement]:
+        return map(TranslationMapElement, self.ids, self.texts)
+
+    def __getitem__(self, index: slice) -> "TranslationMap":
+        if not isinstance(index, slice):
+            raise TypeError("TranslationMap only supports slicing; use ids/texts for single elements")
+        return TranslationMap.from_columns(self.ids[index], self.texts[index])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TranslationMap):
+            return NotImplemented
+        return self.ids == other.ids and self.texts == other.texts
+
+    def __repr__(self) -> str:
+        return f"TranslationMap({len(self.ids)} elements)"
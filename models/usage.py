@@ -1,14 +1,34 @@
-from pydantic import BaseModel
+import threading
+from pydantic import BaseModel, PrivateAttr
+
+class ModelUsage(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
 
 class UsageStatistics(BaseModel):
     prompt_tokens: int = 0
     completion_tokens: int = 0
     total_tokens: int = 0
     total_cost_usd: float = 0.0
+    # Breakdown per model, for sessions whose requests are routed across several models
+    by_model: dict[str, ModelUsage] = {}
+    # Shared by every client (and thread) reporting into this object
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
 
-    def add_usage(self, prompt: int, completion: int, price_prompt_1m: float, price_completion_1m: float):
-        self.prompt_tokens += prompt
-        self.completion_tokens += completion
-        self.total_tokens += (prompt + completion)
+    def add_usage(
+        self, prompt: int, completion: int, price_prompt_1m: float, price_completion_1m: float, model: str | None = None
+    ):
         cost = (prompt * (price_prompt_1m / 1_000_000)) + (completion * (price_completion_1m / 1_000_000))
-        self.total_cost_usd += cost
\ No newline at end of file
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+            self.total_tokens += (prompt + completion)
+            self.total_cost_usd += cost
+            if model is not None:
+                usage = self.by_model.setdefault(model, ModelUsage())
+                usage.requests += 1
+                usage.prompt_tokens += prompt
+                usage.completion_tokens += completion
+                usage.cost_usd += cost
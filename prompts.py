@@ -1,3 +1,5 @@
+import hashlib
+
 PROMPTS_DICT = {
     "spanish": """### ROL: Traductor Literario Senior y Localizador (EN -> ES-ES)
 Eres un traductor editorial con más de 20 años de experiencia, especializado en la traducción de libros del inglés al español de España (Castellano). Tu objetivo es realizar una "transcreación": el texto resultante debe leerse como si hubiera sido escrito originalmente en España, manteniendo el alma, el ritmo y la voz del autor original.
@@ -12,8 +14,48 @@ Eres un traductor editorial con más de 20 años de experiencia, especializado e
 2. Adaptación Cultural: Adapta frases hechas y modismos.
 3. Normativa RAE: Usa comillas latinas (« ») y rayas de diálogo (—).
 4. Falsos Amigos: Cuidado con "actually", "eventually", etc.
+5. Etiquetas: Conserva intactas las etiquetas HTML y los marcadores como <x1>…</x1> o <x2/>, rodeando el texto equivalente.
 
 ### ENTRADA DE TEXTO
 A continuación, te proporcionaré el texto. Tradúcelo siguiendo estas instrucciones:
 """
-}
\ No newline at end of file
+}
+
+# Used for any language without a tailored entry in PROMPTS_DICT
+GENERIC_PROMPT = """### ROLE: Senior Literary Translator and Localizer (EN -> {language})
+You are an editorial translator with more than 20 years of experience translating books from English into {language}. Your goal is a "transcreation": the result must read as if it had been originally written in {language}, keeping the soul, rhythm and voice of the original author.
+
+### TRANSLATION GUIDELINES
+1. Natural syntax: avoid anything that sounds translated.
+2. Cultural adaptation: adapt idioms and set phrases.
+3. Typography: follow the punctuation, quotation mark and dialogue conventions of {language} publishing.
+4. False friends: be careful with words that look alike in both languages.
+5. Tags: keep HTML tags and markers such as <x1>…</x1> or <x2/> intact, around the equivalent text.
+
+### TEXT INPUT
+Below is the text. Translate it following these instructions:
+"""
+
+
+def get_system_prompt(target_lang: str) -> str:
+    """Tailored prompt for the language when there is one, the generic template otherwise."""
+    return PROMPTS_DICT.get(target_lang) or GENERIC_PROMPT.format(language=target_lang.capitalize())
+
+
+MEMORY_HINTS_HEADER = (
+    "Earlier approved translations of passages similar to some of the ones below. "
+    "Keep names, terminology and style consistent with them, but translate the new text as written "
+    "and do not include these examples in your answer:"
+)
+
+
+def format_memory_hints(hints: list[tuple[str, str]]) -> str:
+    """System message carrying (source, translation) few-shot examples."""
+    examples = "\n\n".join(f"SOURCE: {source}\nTRANSLATION: {translation}" for source, translation in hints)
+    return f"{MEMORY_HINTS_HEADER}\n\n{examples}"
+
+
+def get_prompt_version(target_lang: str) -> str:
+    """Short fingerprint of the system prompt, so cached translations follow prompt changes."""
+    prompt = get_system_prompt(target_lang)
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
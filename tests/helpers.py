@@ -0,0 +1,24 @@
+from models.translation import TranslationMap, TranslationMapElement
+
+
+def word_count(text: str) -> int:
+    # Contador determinista para no depender de descargar la codificación de tiktoken
+    return len(text.split())
+
+
+class UpperTranslator:
+    """TranslatorClient that upper-cases every element and records what it was sent."""
+    model = "mock-model"
+
+    def __init__(self):
+        self.seen_ids = []
+        self.seen_texts = []
+        self.hints = {}
+
+    def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+        self.seen_ids.extend(translation_map.ids)
+        self.seen_texts.extend(translation_map.texts)
+        self.hints.update(hints or {})
+        return TranslationMap(elements=[
+            TranslationMapElement(id=el.id, text=el.text.upper()) for el in translation_map.elements
+        ])
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from core.batching import PROMPT_RESERVE_TOKENS, TokenBatcher, StitchBuffer, split_sentences, SPLIT_SEPARATOR
+from models.translation import TranslationMapElement
+from tests.helpers import word_count
+
+
+def test_pack_respects_input_budget_and_keeps_order():
+    batcher = TokenBatcher(max_input_tokens=50, max_output_tokens=10_000, max_elements=80, count_tokens=word_count)
+    elements = [TranslationMapElement(id=f"REF_{i:06d}", text="word " * 8) for i in range(10)]
+
+    batches = batcher.pack(elements)
+
+    assert len(batches) > 1
+    assert [el.id for batch in batches for el in batch] == [el.id for el in elements]
+    for batch in batches:
+        assert sum(batcher.input_tokens(el) for el in batch) <= 50
+
+
+def test_pack_caps_element_count():
+    batcher = TokenBatcher(max_input_tokens=10_000, max_output_tokens=10_000, max_elements=3, count_tokens=word_count)
+    elements = [TranslationMapElement(id=f"REF_{i:06d}", text="Hi") for i in range(7)]
+
+    assert [len(b) for b in batcher.pack(elements)] == [3, 3, 1]
+
+
+def test_split_sentences_never_cuts_inside_inline_tags():
+    text = "First sentence. <i>Inside one. Inside two.</i> Last one!"
+
+    assert split_sentences(text) == ["First sentence.", "<i>Inside one. Inside two.</i> Last one!"]
+
+
+def test_oversized_element_is_split_and_stitched_back():
+    batcher = TokenBatcher(max_input_tokens=12, max_output_tokens=10_000, count_tokens=word_count)
+    text = " ".join(f"Sentence number {i} is here." for i in range(12))
+    element = TranslationMapElement(id="REF_000001", text=text)
+
+    batches = batcher.pack([element])
+    pieces = [el for batch in batches for el in batch]
+
+    assert len(pieces) > 1
+    assert all(SPLIT_SEPARATOR in el.id for el in pieces)
+
+    stitched = TokenBatcher.stitch(list(reversed(pieces)))
+    assert stitched == [TranslationMapElement(id="REF_000001", text=text)]
+
+
+def test_stitch_buffer_releases_split_elements_only_when_complete():
+    batches = [
+        [TranslationMapElement(id="REF_000001", text="A"), TranslationMapElement(id=f"REF_000002{SPLIT_SEPARATOR}1", text="B1")],
+        [TranslationMapElement(id=f"REF_000002{SPLIT_SEPARATOR}2", text="B2")],
+    ]
+    buffer = StitchBuffer(batches)
+
+    assert [el.id for el in buffer.add(batches[0])] == ["REF_000001"]
+    assert buffer.add(batches[1]) == [TranslationMapElement(id="REF_000002", text="B1 B2")]
+
+
+def test_pack_sized_keeps_token_counts_next_to_elements():
+    batcher = TokenBatcher(max_input_tokens=8, max_output_tokens=10_000, max_elements=80, count_tokens=word_count)
+    elements = [TranslationMapElement(id=f"REF_{n}", text="one two three") for n in range(3)]
+
+    batches = batcher.pack_sized(elements)
+
+    assert [[(el.id, tokens) for el, tokens in batch] for batch in batches] == [
+        [("REF_0", 4), ("REF_1", 4)], [("REF_2", 4)]
+    ]
+    assert batcher.pack(elements) == [[el for el, _ in batch] for batch in batches]
+
+
+def test_for_model_budgets_are_capped_by_the_model_limits():
+    settings = SimpleNamespace(
+        model_token_budgets={}, batch_max_input_tokens=4000, batch_max_output_tokens=6000, output_tokens_ratio=1.5
+    )
+
+    unknown = TokenBatcher.for_model(settings, "mock/model", count_tokens=word_count)
+    small = TokenBatcher.for_model(settings, "mock/model", count_tokens=word_count, context_length=6144, max_output_tokens=2048)
+
+    assert (unknown.max_input_tokens, unknown.max_output_tokens) == (4000, 6000)
+    assert small.max_output_tokens == 2048
+    assert small.max_input_tokens == 6144 - 2048 - PROMPT_RESERVE_TOKENS
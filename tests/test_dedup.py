@@ -0,0 +1,31 @@
+from core.dedup import Deduplicator
+from models.translation import TranslationMap, TranslationMapElement
+from tests.helpers import word_count
+
+
+def test_deduplicate_sends_each_text_once_and_fans_out():
+    t_map = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="* * *"),
+        TranslationMapElement(id="REF_002", text="New Achievement!"),
+        TranslationMapElement(id="REF_003", text="*  * *"),
+        TranslationMapElement(id="REF_004", text="New Achievement!"),
+    ])
+
+    result = Deduplicator(count_tokens=word_count).deduplicate(t_map)
+
+    assert [el.id for el in result.unique_map.elements] == ["REF_001", "REF_002"]
+    assert result.report.duplicate_elements == 2
+    assert result.report.saved_tokens == 2 * (word_count("REF_003: *  * *") + word_count("REF_004: New Achievement!"))
+
+    translated = TranslationMap(elements=[
+        TranslationMapElement(id="REF_002", text="¡Nuevo logro!"),
+        TranslationMapElement(id="REF_001", text="* * *"),
+    ])
+    expanded = result.expand(translated)
+
+    assert [(el.id, el.text) for el in expanded.elements] == [
+        ("REF_001", "* * *"),
+        ("REF_002", "¡Nuevo logro!"),
+        ("REF_003", "* * *"),
+        ("REF_004", "¡Nuevo logro!"),
+    ]
@@ -0,0 +1,82 @@
+import zipfile
+from ebooklib import epub
+from core.dedup import Deduplicator
+from core.edition_diff import EditionAligner
+from core.epub_pipeline import EpubTranslationPipeline
+from core.epub_processor import EpubProcessor
+from core.persistence import TranslationCache
+from core.translation_service import TranslationService
+from models.translation import TranslationMap, TranslationMapElement
+from tests.helpers import UpperTranslator
+
+
+def make_map(texts: list[str]) -> TranslationMap:
+    return TranslationMap(elements=[
+        TranslationMapElement(id=f"REF_{i:06d}", text=text) for i, text in enumerate(texts, start=1)
+    ])
+
+
+def test_align_reuses_shifted_paragraphs_and_hints_edited_ones():
+    previous = [
+        ("REF_000001", "Chapter One", "Capítulo uno"),
+        ("REF_000002", "Carl opened the door.", "Carl abrió la puerta."),
+        ("REF_000003", "The cat was waiting outside.", "La gata esperaba fuera."),
+        ("REF_000004", "A paragraph that was cut.", "Un párrafo eliminado."),
+    ]
+    current = make_map([
+        "Chapter One",
+        "A brand new opening paragraph appears here.",
+        "Carl  opened the door.",
+        "The cat was waiting outside, as always.",
+    ])
+
+    diff = EditionAligner().align(previous, current)
+
+    # Los IDs se desplazan, pero el contenido se alinea
+    assert diff.reused == {"REF_000001": "Capítulo uno", "REF_000003": "Carl abrió la puerta."}
+    assert diff.hints == {"REF_000004": ("The cat was waiting outside.", "La gata esperaba fuera.")}
+    assert diff.report.model_dump() == {"unchanged": 2, "edited": 1, "added": 1, "removed": 1}
+
+
+def write_edition(path, paragraphs: list[str]):
+    book = epub.EpubBook()
+    book.set_identifier("edition")
+    book.set_title("Edition")
+    chapter = epub.EpubHtml(title="One", file_name="chap_1.xhtml", lang="en")
+    chapter.content = "".join(f"<p>{text}</p>" for text in paragraphs)
+    book.add_item(chapter)
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = [chapter]
+    epub.write_epub(str(path), book)
+
+
+def test_pipeline_translates_only_the_diff_of_a_new_edition(tmp_path):
+    first, second = tmp_path / "first.epub", tmp_path / "second.epub"
+    write_edition(first, ["It was night.", "Carl opened the door.", "The cat waited."])
+    write_edition(second, ["A new preface.", "It was night.", "Carl opened the door slowly.", "The cat waited."])
+
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    translator = UpperTranslator()
+    pipeline = EpubTranslationPipeline(
+        EpubProcessor(),
+        TranslationService(translator, cache),
+        deduplicator=Deduplicator(count_tokens=lambda text: len(text.split())),
+        count_tokens=lambda t_map: len(t_map.elements),
+    )
+    pipeline.run(str(first), str(tmp_path / "first.es.epub"), "spanish")
+    translator.seen_texts.clear()
+
+    # Sin caché por contenido: solo la alineación con la edición anterior evita reenvíos
+    report = pipeline.run(
+        str(second), str(tmp_path / "second.es.epub"), "spanish", use_cache=False, previous_book_id=str(first)
+    )
+
+    assert translator.seen_texts == ["A new preface.", "Carl opened the door slowly."]
+    assert list(translator.hints.values()) == [("Carl opened the door.", "CARL OPENED THE DOOR.")]
+    assert (report.unchanged_elements, report.edited_elements, report.added_elements) == (2, 1, 1)
+    assert report.estimated_tokens == 2
+    with zipfile.ZipFile(tmp_path / "second.es.epub") as zout:
+        chapter = zout.read("EPUB/chap_1.xhtml").decode("utf-8")
+    assert "<p>IT WAS NIGHT.</p>" in chapter and "<p>THE CAT WAITED.</p>" in chapter
+    cache.close()
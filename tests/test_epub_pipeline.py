@@ -0,0 +1,240 @@
+import zipfile
+import pytest
+from ebooklib import epub
+from core.dedup import Deduplicator
+from core.epub_pipeline import EpubTranslationPipeline
+from core.epub_processor import EpubProcessor
+from core.persistence import TranslationCache
+from core.translation_service import TranslationService
+from models.translation import TranslationMap, TranslationMapElement
+from utils.epub_utils import list_document_paths
+from tests.helpers import UpperTranslator, word_count
+
+CSS = b"p { margin: 0; }"
+
+
+@pytest.fixture
+def sample_epub(tmp_path):
+    book = epub.EpubBook()
+    book.set_identifier("test-book")
+    book.set_title("Test Book")
+    book.set_language("en")
+    style = epub.EpubItem(uid="style", file_name="style.css", media_type="text/css", content=CSS)
+    book.add_item(style)
+
+    chapters = []
+    for n in (1, 2):
+        chapter = epub.EpubHtml(title=f"Chapter {n}", file_name=f"chap_{n}.xhtml", lang="en")
+        chapter.content = f"<h1>Chapter {n}</h1><p>First <i>line</i> {n}.</p><p>* * *</p><p>* * *</p>"
+        chapter.add_item(style)
+        book.add_item(chapter)
+        chapters.append(chapter)
+
+    book.toc = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    # El capítulo 2 va antes en el spine: los IDs deben seguir el orden de lectura
+    book.spine = ["nav", chapters[1], chapters[0]]
+    path = tmp_path / "book.epub"
+    epub.write_epub(str(path), book)
+    return path
+
+
+def test_pipeline_writes_translated_epub_document_by_document(sample_epub, tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    translator = UpperTranslator()
+    pipeline = EpubTranslationPipeline(
+        EpubProcessor(),
+        TranslationService(translator, cache),
+        deduplicator=Deduplicator(count_tokens=word_count),
+        count_tokens=lambda t_map: len(t_map.elements),
+    )
+    output = tmp_path / "book.spanish.epub"
+
+    report = pipeline.run(str(sample_epub), str(output), "spanish")
+
+    assert report.translated_documents == 2
+    assert report.elements == 8
+    assert report.duplicate_elements == 2
+    # IDs únicos en todo el libro, asignados en orden de spine; el "* * *" del segundo
+    # documento ya está en la caché por contenido y no se vuelve a enviar
+    assert translator.seen_ids == ["REF_000001", "REF_000002", "REF_000003", "REF_000005", "REF_000006"]
+
+    with zipfile.ZipFile(output) as zout, zipfile.ZipFile(sample_epub) as zin:
+        first = zout.infolist()[0]
+        assert first.filename == "mimetype" and first.compress_type == zipfile.ZIP_STORED
+        assert sorted(zout.namelist()) == sorted(zin.namelist())
+        assert zout.read("EPUB/style.css") == CSS
+        assert zout.read("EPUB/content.opf") == zin.read("EPUB/content.opf")
+
+        chapter_2 = zout.read("EPUB/chap_2.xhtml").decode("utf-8")
+        assert "<h1>CHAPTER 2</h1>" in chapter_2
+        assert "<p>FIRST <i>LINE</i> 2.</p>" in chapter_2
+        assert "REF_" not in chapter_2
+        assert list_document_paths(zout) == ["EPUB/chap_2.xhtml", "EPUB/chap_1.xhtml"]
+    cache.close()
+
+
+def test_document_paths_are_url_decoded_and_missing_items_skipped(tmp_path):
+    path = tmp_path / "spaces.epub"
+    with zipfile.ZipFile(path, "w") as zout:
+        zout.writestr("mimetype", "application/epub+zip")
+        zout.writestr("META-INF/container.xml", (
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        zout.writestr("OEBPS/content.opf", (
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0"><manifest>'
+            '<item id="c1" href="Text/chapter%201.xhtml" media-type="application/xhtml+xml"/>'
+            '<item id="ghost" href="Text/ghost.xhtml" media-type="application/xhtml+xml"/>'
+            '</manifest><spine><itemref idref="ghost"/><itemref idref="c1"/></spine></package>'
+        ))
+        zout.writestr("OEBPS/Text/chapter 1.xhtml", "<html><body><p>Hello</p></body></html>")
+
+    with zipfile.ZipFile(path) as zin:
+        assert list_document_paths(zin) == ["OEBPS/Text/chapter 1.xhtml"]
+
+
+def test_parallel_pipeline_matches_sequential_output(sample_epub, tmp_path):
+    outputs = {}
+    seen = {}
+    for workers in (1, 2):
+        cache = TranslationCache(db_path=str(tmp_path / f"cache_{workers}.db"))
+        translator = UpperTranslator()
+        pipeline = EpubTranslationPipeline(
+            EpubProcessor(),
+            TranslationService(translator, cache),
+            deduplicator=Deduplicator(count_tokens=word_count),
+            count_tokens=lambda t_map: len(t_map.elements),
+            workers=workers,
+        )
+        output = tmp_path / f"out_{workers}.epub"
+        pipeline.run(str(sample_epub), str(output), "spanish")
+        with zipfile.ZipFile(output) as zout:
+            outputs[workers] = {name: zout.read(name) for name in zout.namelist()}
+        seen[workers] = translator.seen_ids
+        cache.close()
+
+    # Mismos IDs globales y mismo EPUB resultante con o sin pool de procesos
+    assert seen[1] == seen[2]
+    assert outputs[1] == outputs[2]
+
+
+def test_pipeline_phases_are_recorded_across_worker_processes(sample_epub, tmp_path):
+    from core.telemetry import telemetry
+
+    telemetry.reset()
+    pipeline = EpubTranslationPipeline(
+        EpubProcessor(),
+        TranslationService(UpperTranslator(), TranslationCache(db_path=str(tmp_path / "cache.db"))),
+        deduplicator=Deduplicator(count_tokens=word_count),
+        count_tokens=lambda t_map: len(t_map.elements),
+        workers=2,
+    )
+    pipeline.run(str(sample_epub), str(tmp_path / "out.epub"), "spanish")
+
+    phases = telemetry.report()["phases"]
+    # Extraction and rebuild happen in the pool; their timings come back with the results
+    assert phases["extract"]["count"] == 2
+    assert phases["rebuild"]["count"] == 2
+    assert phases["load"]["count"] == 2
+    assert phases["cache_lookup"]["count"] > 0
+    assert telemetry.counters["cache_misses"] > 0
+
+
+def test_pipeline_passes_filtered_segments_through(sample_epub, tmp_path):
+    from core.segment_filter import SegmentFilter
+
+    translator = UpperTranslator()
+    pipeline = EpubTranslationPipeline(
+        EpubProcessor(),
+        TranslationService(translator, TranslationCache(db_path=str(tmp_path / "cache.db"))),
+        deduplicator=Deduplicator(count_tokens=word_count),
+        count_tokens=lambda t_map: len(t_map.elements),
+        segment_filter=SegmentFilter(count_tokens=word_count),
+    )
+    output = tmp_path / "book.spanish.epub"
+
+    report = pipeline.run(str(sample_epub), str(output), "spanish")
+
+    # Los "* * *" nunca llegan al traductor, pero siguen en el libro
+    assert report.skipped_elements == 4
+    assert report.duplicate_elements == 0
+    assert translator.seen_ids == ["REF_000001", "REF_000002", "REF_000005", "REF_000006"]
+    with zipfile.ZipFile(output) as zout:
+        assert "<p>* * *</p>" in zout.read("EPUB/chap_2.xhtml").decode("utf-8")
+
+
+def test_pipeline_fans_out_one_extraction_to_several_languages(sample_epub, tmp_path):
+    import threading
+
+    class LanguageTranslator:
+        model = "mock-model"
+
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.seen = {}
+
+        def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+            with self.lock:
+                self.seen.setdefault(target_lang, []).extend(el.id for el in translation_map.elements)
+            return TranslationMap(elements=[
+                TranslationMapElement(id=el.id, text=f"[{target_lang[:2]}] {el.text}") for el in translation_map.elements
+            ])
+
+    class CountingProcessor(EpubProcessor):
+        extractions = 0
+
+        def extract_structure(self, html, start=1):
+            CountingProcessor.extractions += 1
+            return super().extract_structure(html, start)
+
+    translator = LanguageTranslator()
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    pipeline = EpubTranslationPipeline(
+        CountingProcessor(),
+        TranslationService(translator, cache),
+        deduplicator=Deduplicator(count_tokens=word_count),
+        count_tokens=lambda t_map: len(t_map.elements),
+    )
+    outputs = {lang: str(tmp_path / f"book.{lang}.epub") for lang in ("spanish", "french", "german")}
+
+    reports = pipeline.run_languages(str(sample_epub), outputs)
+
+    with zipfile.ZipFile(sample_epub) as zin:
+        assert CountingProcessor.extractions == len(list_document_paths(zin))
+    # Misma caché, pero cada idioma tiene sus propias traducciones
+    assert {lang: ids[:3] for lang, ids in translator.seen.items()} == {
+        lang: ["REF_000001", "REF_000002", "REF_000003"] for lang in outputs
+    }
+    for lang, path in outputs.items():
+        assert reports[lang].translated_documents == 2
+        with zipfile.ZipFile(path) as zout:
+            chapter = zout.read("EPUB/chap_2.xhtml").decode("utf-8")
+        assert f"<h1>[{lang[:2]}] Chapter 2</h1>" in chapter
+        assert zout.namelist()[0] == "mimetype"
+    cache.close()
+
+
+def test_failed_run_removes_partial_outputs(sample_epub, tmp_path):
+    class FailingTranslator:
+        model = "mock-model"
+
+        def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+            raise RuntimeError("API down")
+
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    pipeline = EpubTranslationPipeline(
+        EpubProcessor(),
+        TranslationService(FailingTranslator(), cache),
+        deduplicator=Deduplicator(count_tokens=word_count),
+        count_tokens=lambda t_map: len(t_map.elements),
+    )
+    outputs = {lang: str(tmp_path / f"book.{lang}.epub") for lang in ("spanish", "french")}
+
+    with pytest.raises(RuntimeError, match="API down"):
+        pipeline.run_languages(str(sample_epub), outputs)
+
+    assert not [p.name for p in tmp_path.iterdir() if p.name.startswith("book.") and p.name != "book.epub"]
+    cache.close()
@@ -48,3 +48,60 @@ def test_extract_structure_preserves_inner_html_tags():
     _, translation_map = processor.extract_structure(html)
     
     assert translation_map.elements[0].text == "Text with <i>italics</i> and <b>bold</b>."
+
+def test_rebuild_html_matches_per_fragment_parsing():
+    """La reconstrucción en bloque produce lo mismo que parsear cada fragmento por separado."""
+    processor = EpubProcessor()
+    html = "<body><h1>Title</h1><p>One <i>two</i></p><p>Three &amp; four</p><p>Untranslated</p></body>"
+    translations = TranslationMap(elements=[
+        TranslationMapElement(id="REF_000001", text="Título"),
+        # Un fragmento con una etiqueta sin cerrar no debe contaminar al siguiente
+        TranslationMapElement(id="REF_000002", text="Uno <i>dos"),
+        TranslationMapElement(id="REF_000003", text="Tres &amp; <b>cuatro</b><br/>"),
+    ])
+
+    expected_skeleton, _ = processor.extract_structure(html)
+    for el in translations.elements:
+        expected_skeleton.find(string=el.id).replace_with(BeautifulSoup(el.text, 'html.parser'))
+    expected = expected_skeleton.encode(formatter="minimal").decode('utf-8')
+
+    skeleton, _ = processor.extract_structure(html)
+    result = processor.rebuild_html(skeleton, translations)
+
+    assert result == expected
+    assert "<p>Uno <i>dos</i></p>" in result
+    # Sin traducción el placeholder se mantiene, igual que antes
+    assert "<p>REF_000004</p>" in result
+
+XHTML = (
+    '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>T</title></head>'
+    '<body><svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"></svg>'
+    '<p class="a">One &amp; <i>two</i><br/></p><h2>Head</h2></body></html>'
+)
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml", "lxml-xml"])
+def test_parser_backends_extract_and_rebuild_equivalently(parser):
+    processor = EpubProcessor(parser)
+
+    skeleton, translation_map = processor.extract_structure(XHTML)
+    assert [el.text for el in translation_map.elements] == ["One &amp; <i>two</i><br/>", "Head"]
+
+    translated = TranslationMap(elements=[
+        TranslationMapElement(id="REF_000001", text="Uno &amp; <i>dos</i>&nbsp;<br/>"),
+        TranslationMapElement(id="REF_000002", text="Cabecera <b>sin cerrar"),
+    ])
+    result = processor.rebuild_html(skeleton, translated)
+
+    assert result.startswith('<?xml version="1.0" encoding="utf-8"?>')
+    assert '<p class="a">Uno &amp; <i>dos</i>\xa0<br/></p>' in result
+    assert "<h2>Cabecera <b>sin cerrar</b></h2>" in result
+
+def test_xml_backend_preserves_case_sensitive_attributes():
+    skeleton, _ = EpubProcessor("lxml-xml").extract_structure(XHTML)
+
+    assert 'viewBox="0 0 10 10"' in str(skeleton)
+
+def test_unknown_parser_backend_is_rejected():
+    with pytest.raises(ValueError):
+        EpubProcessor("selectolax")
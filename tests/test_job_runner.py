@@ -0,0 +1,136 @@
+import json
+import zipfile
+import pytest
+from ebooklib import epub
+from core.epub_pipeline import EpubTranslationPipeline
+from core.epub_processor import EpubProcessor
+from core.job_runner import JobRunner, discover_books
+from core.persistence import TranslationCache
+from core.translation_service import TranslationService
+from models.translation import TranslationMap, TranslationMapElement
+
+
+class ExecutorTranslator:
+    """Upper-cases each element in a task of the executor it is given, like OpenRouterClient."""
+    model = "mock-model"
+
+    def __init__(self, fail_on: str | None = None, give_up_on: str | None = None):
+        self.fail_on = fail_on
+        self.give_up_on = give_up_on
+
+    def _translate(self, el):
+        if self.fail_on and self.fail_on in el.text:
+            raise RuntimeError("API down")
+        if self.give_up_on and self.give_up_on in el.text:
+            return None
+        return TranslationMapElement(id=el.id, text=el.text.upper())
+
+    def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None, executor=None):
+        futures = [executor.submit(self._translate, el) for el in translation_map.elements]
+        return TranslationMap(elements=[el for el in (future.result() for future in futures) if el is not None])
+
+
+def write_book(path, text):
+    book = epub.EpubBook()
+    book.set_identifier(path.stem)
+    book.set_title(path.stem)
+    book.set_language("en")
+    chapter = epub.EpubHtml(title="Chapter", file_name="chap.xhtml", lang="en")
+    chapter.content = f"<h1>{text}</h1><p>{text} begins.</p>"
+    book.add_item(chapter)
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", chapter]
+    epub.write_epub(str(path), book)
+    return path
+
+
+@pytest.fixture
+def library(tmp_path):
+    shelf = tmp_path / "library"
+    (shelf / "series").mkdir(parents=True)
+    write_book(shelf / "alpha.epub", "Alpha")
+    write_book(shelf / "series" / "beta.epub", "Beta")
+    return shelf
+
+
+def make_runner(cache, translator):
+    return JobRunner(
+        cache, translator,
+        lambda client: EpubTranslationPipeline(
+            EpubProcessor(), TranslationService(client, cache), count_tokens=lambda t_map: len(t_map.elements)
+        ),
+        api_workers=2,
+    )
+
+
+def test_discover_books_expands_directories_and_manifests(library, tmp_path):
+    # An earlier output must not be picked up as a new book
+    write_book(library / "alpha.spanish.epub", "ALPHA")
+    manifest = tmp_path / "catalogue.json"
+    manifest.write_text(json.dumps([{"path": "library/alpha.epub", "languages": ["french"], "priority": 3}]))
+
+    jobs = discover_books([str(library), str(manifest)], ["spanish"])
+
+    assert [(job.input_path, job.languages, job.priority) for job in jobs] == [
+        (str(library / "alpha.epub"), ["spanish"], 0),
+        (str(library / "series" / "beta.epub"), ["spanish"], 0),
+        (str(library / "alpha.epub"), ["french"], 3),
+    ]
+
+
+def test_discover_books_makes_every_path_absolute(library, tmp_path, monkeypatch):
+    manifest = tmp_path / "catalogue.json"
+    manifest.write_text(json.dumps([{"path": "library/alpha.epub"}]))
+    monkeypatch.chdir(library)
+
+    jobs = discover_books(["alpha.epub", "series", str(manifest)], ["spanish"])
+
+    assert [job.input_path for job in jobs] == [
+        str(library / "alpha.epub"), str(library / "series" / "beta.epub"), str(library / "alpha.epub"),
+    ]
+
+
+def test_runner_translates_every_queued_book(library, tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    runner = make_runner(cache, ExecutorTranslator())
+    runner.enqueue(discover_books([str(library)], ["spanish", "french"]))
+
+    jobs = runner.run()
+
+    assert [job.status for job in jobs] == ["completed", "completed"]
+    for name in ("alpha", "series/beta"):
+        for lang in ("spanish", "french"):
+            with zipfile.ZipFile(library / f"{name}.{lang}.epub") as zout:
+                assert name.split("/")[-1].upper().encode() in zout.read("EPUB/chap.xhtml")
+    # Re-queueing completed books does not run them again
+    runner.enqueue(discover_books([str(library)], ["spanish", "french"]))
+    assert cache.get_jobs(["queued"]) == []
+
+
+def test_failed_job_is_recorded_and_retried(library, tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    books = discover_books([str(library)], ["spanish"])
+    make_runner(cache, ExecutorTranslator(fail_on="Beta")).enqueue(books)
+
+    jobs = make_runner(cache, ExecutorTranslator(fail_on="Beta")).run()
+    assert [job.status for job in jobs] == ["completed", "failed"]
+    assert "API down" in jobs[1].error
+
+    jobs = make_runner(cache, ExecutorTranslator()).run()
+    assert [job.status for job in jobs] == ["completed", "completed"]
+    assert jobs[1].error is None
+
+
+def test_job_with_untranslated_elements_is_incomplete_and_retried(library, tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    make_runner(cache, ExecutorTranslator()).enqueue(discover_books([str(library)], ["spanish"]))
+
+    jobs = make_runner(cache, ExecutorTranslator(give_up_on="begins")).run()
+    assert [job.status for job in jobs] == ["incomplete", "incomplete"]
+    assert "spanish: 1" in jobs[0].error
+
+    jobs = make_runner(cache, ExecutorTranslator()).run()
+    assert [job.status for job in jobs] == ["completed", "completed"]
+    with zipfile.ZipFile(library / "alpha.spanish.epub") as zout:
+        assert b"ALPHA BEGINS." in zout.read("EPUB/chap.xhtml")
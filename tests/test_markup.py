@@ -0,0 +1,34 @@
+from core.markup import MarkupCompressor
+from models.translation import TranslationMap, TranslationMapElement
+
+SOURCE = 'Go <a href="ch2.xhtml#n1" class="calibre9">to <span class="bold">the</span> note</a><br class="x"/> <i>now</i>'
+
+
+def test_compress_replaces_only_tags_with_attributes():
+    compressed = MarkupCompressor().compress(SOURCE)
+
+    assert compressed == 'Go <x1>to <x2>the</x2> note</x1><x3/> <i>now</i>'
+
+
+def test_restore_round_trips_and_follows_translated_order():
+    compressor = MarkupCompressor()
+    # El modelo reordena las etiquetas anidadas al traducir
+    translated = 'Ve <x1>a la <x2>nota</x2></x1><x3/> <i>ya</i>'
+
+    assert compressor.restore(SOURCE, compressor.compress(SOURCE)) == SOURCE
+    assert compressor.restore(SOURCE, translated) == (
+        'Ve <a href="ch2.xhtml#n1" class="calibre9">a la <span class="bold">nota</span></a><br class="x"/> <i>ya</i>'
+    )
+
+
+def test_restore_drops_invented_placeholders():
+    assert MarkupCompressor().restore("plain <b>text</b>", "texto <x7>plano</x7>") == "texto plano"
+
+
+def test_compress_map_keeps_ids():
+    t_map = TranslationMap(elements=[TranslationMapElement(id="REF_001", text=SOURCE)])
+
+    compressed = MarkupCompressor().compress_map(t_map)
+
+    assert compressed.elements[0].id == "REF_001"
+    assert "href" not in compressed.elements[0].text
@@ -0,0 +1,109 @@
+import json
+import pytest
+import time
+from unittest.mock import MagicMock
+from core.model_catalog import CACHE_FORMAT, ModelCatalog
+from models.usage import UsageStatistics
+
+BASE_URL = "https://openrouter.test/api/v1"
+MODELS = {"data": [{
+    "id": "mock/model",
+    # USD per token, as /models reports it ($0.15 / $0.60 per 1M tokens)
+    "pricing": {"prompt": "0.00000015", "completion": "0.0000006"},
+    "context_length": 32768,
+    "top_provider": {"max_completion_tokens": 8192},
+}]}
+
+
+def fake_session(payload=MODELS, fails: bool = False) -> MagicMock:
+    session = MagicMock()
+    response = MagicMock()
+    response.json.return_value = payload
+    if fails:
+        response.raise_for_status.side_effect = RuntimeError("503")
+    session.get.return_value = response
+    return session
+
+
+def write_cache(path, fetched_at: float, base_url: str = BASE_URL, prompt: float = 1.0):
+    models = {"mock/model": {"id": "mock/model", "price_prompt_1m": prompt, "price_completion_1m": 2.0,
+                             "context_length": 4096, "max_output_tokens": 1024}}
+    path.write_text(json.dumps(
+        {"format": CACHE_FORMAT, "base_url": base_url, "fetched_at": fetched_at, "models": models}
+    ))
+
+
+def test_first_run_fetches_and_writes_the_cache(tmp_path):
+    path = tmp_path / "models.json"
+    session = fake_session()
+
+    info = ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=session).get("mock/model")
+
+    assert (info.price_prompt_1m, info.price_completion_1m) == (0.15, 0.60)
+    assert (info.context_length, info.max_output_tokens) == (32768, 8192)
+    session.get.assert_called_once_with(f"{BASE_URL}/models", timeout=30)
+    assert json.loads(path.read_text())["models"]["mock/model"]["context_length"] == 32768
+
+
+def test_fresh_cache_is_used_without_the_network(tmp_path):
+    path = tmp_path / "models.json"
+    write_cache(path, fetched_at=time.time())
+    session = fake_session()
+
+    info = ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=session).get("mock/model")
+
+    assert info.price_prompt_1m == 1.0
+    session.get.assert_not_called()
+
+
+def test_stale_cache_answers_at_once_and_refreshes_in_background(tmp_path):
+    path = tmp_path / "models.json"
+    write_cache(path, fetched_at=time.time() - 120)
+    catalog = ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=fake_session())
+
+    assert catalog.get("mock/model").price_prompt_1m == 1.0
+    catalog.wait(timeout=5)
+
+    assert catalog.get("mock/model").price_prompt_1m == 0.15
+    assert json.loads(path.read_text())["models"]["mock/model"]["price_prompt_1m"] == 0.15
+
+
+def test_failed_refresh_keeps_the_cached_data(tmp_path):
+    path = tmp_path / "models.json"
+    write_cache(path, fetched_at=time.time() - 120)
+    catalog = ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=fake_session(fails=True))
+
+    assert catalog.refresh() is False
+    assert catalog.get("mock/model").price_prompt_1m == 1.0
+
+
+def test_cache_of_another_endpoint_is_ignored(tmp_path):
+    path = tmp_path / "models.json"
+    write_cache(path, fetched_at=time.time(), base_url="http://127.0.0.1:8099")
+    session = fake_session()
+
+    info = ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=session).get("mock/model")
+
+    assert info.price_prompt_1m == 0.15
+    session.get.assert_called_once()
+
+
+def test_per_token_prices_are_charged_per_million(tmp_path):
+    info = ModelCatalog(str(tmp_path / "models.json"), base_url=BASE_URL, session=fake_session()).get("mock/model")
+    stats = UsageStatistics()
+
+    stats.add_usage(
+        prompt=1_000_000, completion=500_000,
+        price_prompt_1m=info.price_prompt_1m, price_completion_1m=info.price_completion_1m,
+    )
+
+    assert stats.total_cost_usd == pytest.approx(0.45)
+
+
+def test_cache_of_an_older_format_is_ignored(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text(json.dumps({"base_url": BASE_URL, "fetched_at": time.time(), "models": {}}))
+    session = fake_session()
+
+    assert ModelCatalog(str(path), ttl_seconds=60, base_url=BASE_URL, session=session).get("mock/model")
+    session.get.assert_called_once()
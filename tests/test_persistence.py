@@ -0,0 +1,56 @@
+import pytest
+from core.persistence import TranslationCache, SQLITE_MAX_VARIABLES
+from models.translation import TranslationMapElement
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_cache_uses_wal_journal(cache):
+    assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_get_many_returns_only_cached_ids(cache):
+    cache.save_batch("book", "model", "spanish", [
+        TranslationMapElement(id="REF_001", text="Hola"),
+        TranslationMapElement(id="REF_002", text="Mundo"),
+    ])
+    cache.save_batch("other_book", "model", "spanish", [TranslationMapElement(id="REF_003", text="Otro")])
+
+    assert cache.get_many("book", "model", "spanish", ["REF_001", "REF_002", "REF_003"]) == {"REF_001": "Hola", "REF_002": "Mundo"}
+    assert cache.get_translation("book", "model", "spanish", "REF_002") == "Mundo"
+
+
+def test_get_many_chunks_large_id_lists(cache):
+    count = SQLITE_MAX_VARIABLES * 2 + 5
+    elements = [TranslationMapElement(id=f"REF_{i:06d}", text=f"T{i}") for i in range(count)]
+    cache.save_batch("book", "model", "spanish", elements)
+
+    found = cache.get_many("book", "model", "spanish", [el.id for el in elements])
+
+    assert len(found) == count
+    assert found["REF_000000"] == "T0"
+
+
+def test_cache_without_language_key_is_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE cache (id TEXT, book_id TEXT, model_name TEXT, text TEXT NOT NULL, "
+        "PRIMARY KEY (id, book_id, model_name))"
+    )
+    conn.execute("INSERT INTO cache VALUES ('REF_001', 'book', 'model', 'Hola')")
+    conn.commit()
+    conn.close()
+
+    with TranslationCache(db_path=path) as cache:
+        assert cache.get_translation("book", "model", "spanish", "REF_001") == "Hola"
+        cache.save_batch("book", "model", "french", [TranslationMapElement(id="REF_001", text="Bonjour")])
+        assert cache.get_many("book", "model", "french", ["REF_001"]) == {"REF_001": "Bonjour"}
+        assert cache.get_translation("book", "model", "spanish", "REF_001") == "Hola"
@@ -0,0 +1,98 @@
+import pytest
+from ebooklib import epub
+from core.config import settings
+from core.dedup import Deduplicator
+from core.persistence import TranslationCache
+from core.preflight import RESPONSE_WRAPPER_TOKENS, PreflightEstimator
+from core.segment_filter import SegmentFilter
+from prompts import get_prompt_version
+from utils.text_utils import content_hash
+from tests.helpers import word_count
+
+
+@pytest.fixture
+def book_path(tmp_path):
+    book = epub.EpubBook()
+    book.set_identifier("preflight-book")
+    book.set_title("Preflight Book")
+    book.set_language("en")
+    chapters = []
+    for n in (1, 2):
+        chapter = epub.EpubHtml(title=f"Chapter {n}", file_name=f"chap_{n}.xhtml", lang="en")
+        chapter.content = (
+            f"<h1>Chapter {n}</h1><p>The same opening line.</p><p>Words only chapter {n} has.</p>"
+            "<p>* * *</p><p>Repeated inside one chapter.</p><p>Repeated inside one chapter.</p>"
+        )
+        book.add_item(chapter)
+        chapters.append(chapter)
+    book.toc = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ["nav", *chapters]
+    path = tmp_path / "book.epub"
+    epub.write_epub(str(path), book)
+    return str(path)
+
+
+def make_estimator(**kwargs) -> PreflightEstimator:
+    return PreflightEstimator(
+        model="mock-model", deduplicator=Deduplicator(count_tokens=word_count), count_tokens=word_count, **kwargs
+    )
+
+
+def test_preflight_counts_each_chapter_after_filter_dedup_and_book_repeats(book_path):
+    estimator = make_estimator(segment_filter=SegmentFilter(count_tokens=word_count))
+
+    report = estimator.estimate(book_path, "spanish")
+
+    first, second = report.chapters
+    assert [chapter.path for chapter in report.chapters] == ["EPUB/chap_1.xhtml", "EPUB/chap_2.xhtml"]
+    assert (first.elements, first.skipped_elements, first.duplicate_elements, first.cached_elements) == (6, 1, 1, 0)
+    # The opening line and the repeated paragraph were already sent with chapter 1
+    assert second.cached_elements == 2
+    assert report.elements == 12
+    assert report.elements_to_send == 6
+
+
+def test_preflight_charges_request_overhead_and_sums_batches(book_path):
+    estimator = make_estimator()
+
+    report = estimator.estimate(book_path, "spanish")
+
+    overhead = estimator.request_overhead("spanish")
+    assert report.request_overhead_tokens == overhead > 0
+    assert report.requests == sum(len(chapter.batches) for chapter in report.chapters) == 2
+    for chapter in report.chapters:
+        for batch in chapter.batches:
+            assert batch.input_tokens > overhead
+            assert batch.output_tokens > RESPONSE_WRAPPER_TOKENS
+    assert report.input_tokens == sum(chapter.input_tokens for chapter in report.chapters)
+    assert report.output_tokens == sum(chapter.output_tokens for chapter in report.chapters)
+
+
+def test_preflight_skips_cached_content(book_path, tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    version = get_prompt_version("spanish")
+    source = "Words only chapter 2 has."
+    cache.save_by_hash("mock-model", "spanish", version, [
+        (content_hash(source, "mock-model", "spanish", version), source, "Palabras que solo tiene el capítulo 2."),
+    ])
+
+    report = make_estimator(cache=cache).estimate(book_path, "spanish")
+
+    # Book-level repeats (opening line, repeated paragraph, scene break) plus the cached one
+    assert report.chapters[1].cached_elements == 4
+    cache.close()
+
+
+def test_preflight_projects_cost_and_time_bottleneck(book_path, monkeypatch):
+    monkeypatch.setattr(settings, "requests_per_minute", 1)
+    monkeypatch.setattr(settings, "tokens_per_minute", 0)
+    estimator = make_estimator(price_prompt_1m=2.0, price_completion_1m=8.0)
+
+    report = estimator.estimate(book_path, "spanish")
+
+    assert report.cost_usd == pytest.approx((report.input_tokens * 2.0 + report.output_tokens * 8.0) / 1_000_000)
+    # Two requests at one per minute dominate a handful of short completions
+    assert report.bottleneck == "requests_per_minute"
+    assert report.seconds == pytest.approx(120)
@@ -0,0 +1,62 @@
+import pytest
+from core.rate_limiter import RateController, TokenBucket, parse_reset_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_parse_reset_seconds_formats():
+    assert parse_reset_seconds("12") == 12
+    assert parse_reset_seconds("6m0s") == 360
+    assert parse_reset_seconds("250ms") == pytest.approx(0.25)
+    # OpenRouter envía el reset como epoch en milisegundos
+    assert parse_reset_seconds("1700000030000", now=1_700_000_000) == pytest.approx(30)
+    assert parse_reset_seconds("garbage") is None
+    assert parse_reset_seconds(None) is None
+
+
+def test_token_bucket_waits_when_empty():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_minute=60, clock=clock)
+
+    assert bucket.reserve(60) == 0
+    # El bucket está vacío: el siguiente token llega en 1 segundo
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock.now += 10
+    assert bucket.reserve(5) == 0
+
+
+def test_rate_controller_aimd_and_retry_after():
+    clock = FakeClock()
+    controller = RateController(max_concurrency=8, clock=clock, sleep=clock.sleep)
+
+    controller.record_response(429, {"Retry-After": "5"})
+    assert controller.concurrency_limit == 4
+    assert controller.throttled_count == 1
+
+    # La siguiente petición respeta la pausa indicada por el servidor
+    controller.acquire()
+    controller.release()
+    assert clock.sleeps == [5]
+
+    for _ in range(20):
+        controller.record_response(200, {})
+    assert 4 < controller.concurrency_limit <= 8
+
+
+def test_rate_controller_adopts_limit_headers():
+    controller = RateController(requests_per_minute=20)
+    controller.record_response(200, {"x-ratelimit-limit-requests": "500", "x-ratelimit-limit-tokens": "100000"})
+
+    assert controller.request_bucket.rate_per_minute == 500
+    assert controller.token_bucket.rate_per_minute == 100000
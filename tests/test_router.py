@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+import pytest
+from core.router import RoutingTranslatorClient
+from core.translator import RequestCancelled
+from models.translation import TranslationMap, TranslationMapElement
+
+
+class FakeModelClient:
+    """Stands in for an OpenRouterClient bound to one model."""
+    def __init__(self, model, delay=0.0, error=None, skip_ids=()):
+        self.model = model
+        self.delay = delay
+        self.error = error
+        self.skip_ids = set(skip_ids)
+        self.calls = 0
+        self.cancelled_events = []
+
+    def translate_batch(self, translation_map, target_lang, batch_size=80, on_batch_complete=None, hints=None, cancelled=None):
+        self.calls += 1
+        self.cancelled_events.append(cancelled)
+        if cancelled.wait(self.delay):
+            raise RequestCancelled("cancelled")
+        if self.error:
+            raise self.error
+        done = [
+            TranslationMapElement(id=el.id, text=f"{self.model}:{el.text}")
+            for el in translation_map.elements if el.id not in self.skip_ids
+        ]
+        if on_batch_complete and done:
+            on_batch_complete(self.model, done)
+        return TranslationMap(elements=done)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens():
+    encoding = MagicMock()
+    encoding.encode_ordinary.side_effect = str.split
+    encoding.encode_ordinary_batch.side_effect = lambda texts: [text.split() for text in texts]
+    with patch("core.batching.get_encoding", return_value=encoding):
+        yield
+
+
+def sample_map(n=3):
+    return TranslationMap(elements=[TranslationMapElement(id=f"REF_{i:06d}", text=f"Text {i}") for i in range(n)])
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    slow, fast = FakeModelClient("slow", delay=5), FakeModelClient("fast")
+    router = RoutingTranslatorClient([slow, fast], hedge_initial_delay=0.05)
+    saved = []
+
+    start = time.monotonic()
+    result = router.translate_batch(sample_map(), "spanish", on_batch_complete=lambda model, els: saved.append(model))
+
+    assert time.monotonic() - start < 2
+    assert [el.text for el in result.elements] == ["fast:Text 0", "fast:Text 1", "fast:Text 2"]
+    # Cache writes are attributed to the model that answered
+    assert saved == ["fast"]
+    assert slow.cancelled_events[0].is_set()
+    assert (router.hedged_batches, router.hedge_wins) == (1, 1)
+    assert router.model == "slow" and router.models == ["slow", "fast"]
+
+
+def test_hedge_timer_starts_when_the_attempt_runs():
+    primary, backup = FakeModelClient("primary", delay=0.1), FakeModelClient("backup")
+    router = RoutingTranslatorClient([primary, backup], hedge_initial_delay=0.25)
+    # A single busy worker: the primary's attempt waits in the queue longer than the hedge delay
+    router._attempts = ThreadPoolExecutor(max_workers=1)
+    router._attempts.submit(time.sleep, 0.3)
+
+    result = router.translate_batch(sample_map(), "spanish")
+
+    assert [el.text for el in result.elements] == ["primary:Text 0", "primary:Text 1", "primary:Text 2"]
+    assert (backup.calls, router.hedged_batches) == (0, 0)
+    assert router.routes[0].latencies[0] < 0.25
+
+
+def test_failing_model_falls_back_and_is_deprioritised():
+    broken = FakeModelClient("broken", error=RuntimeError("503"))
+    backup = FakeModelClient("backup")
+    router = RoutingTranslatorClient([broken, backup], failure_threshold=2, cooldown_seconds=60)
+
+    for _ in range(2):
+        result = router.translate_batch(sample_map(), "spanish")
+        assert all(el.text.startswith("backup:") for el in result.elements)
+    assert router.fallbacks == 2
+
+    router.translate_batch(sample_map(), "spanish")
+    # Two failures in a row put the broken model behind the backup
+    assert broken.calls == 2 and backup.calls == 3
+
+
+def test_elements_given_up_by_one_model_go_to_the_next():
+    partial = FakeModelClient("partial", skip_ids={"REF_000001"})
+    router = RoutingTranslatorClient([partial, FakeModelClient("backup")])
+
+    result = router.translate_batch(sample_map(), "spanish")
+
+    assert [el.text for el in result.elements] == ["partial:Text 0", "backup:Text 1", "partial:Text 2"]
+
+
+def test_error_is_raised_when_every_model_fails():
+    router = RoutingTranslatorClient([
+        FakeModelClient("a", error=RuntimeError("down")), FakeModelClient("b", error=RuntimeError("down too"))
+    ])
+    with pytest.raises(RuntimeError, match="down too"):
+        router.translate_batch(sample_map(), "spanish")
+
+
+def test_hedge_delay_follows_observed_latencies():
+    router = RoutingTranslatorClient([FakeModelClient("a"), FakeModelClient("b")], hedge_min_delay=0.1)
+    route = router.routes[0]
+    for n in range(100):
+        route.record_success(n / 10)
+
+    assert route.hedge_delay(0.9, initial=30, minimum=0.1) == pytest.approx(9.0)
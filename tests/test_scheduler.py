@@ -0,0 +1,91 @@
+import threading
+from core.persistence import TranslationCache
+from core.router import RoutingTranslatorClient
+from core.scheduler import FairScheduler, ScheduledClient
+from core.translation_service import TranslationService
+from models.translation import TranslationMap, TranslationMapElement
+from prompts import get_prompt_version
+from utils.text_utils import content_hash
+
+
+def test_equal_priority_lanes_take_turns():
+    order = []
+    gate = threading.Event()
+    with FairScheduler(workers=1) as scheduler:
+        # Hold the only worker so both lanes queue up before anything runs
+        blocker = scheduler.submit("setup", 0, gate.wait)
+        futures = [scheduler.submit("big", 0, order.append, f"big-{n}") for n in range(3)]
+        futures += [scheduler.submit("small", 0, order.append, f"small-{n}") for n in range(2)]
+        gate.set()
+        for future in [blocker, *futures]:
+            future.result()
+
+    assert order == ["big-0", "small-0", "big-1", "small-1", "big-2"]
+
+
+def test_higher_priority_lane_goes_first():
+    order = []
+    gate = threading.Event()
+    with FairScheduler(workers=1) as scheduler:
+        blocker = scheduler.submit("setup", 0, gate.wait)
+        futures = [scheduler.submit("low", 0, order.append, f"low-{n}") for n in range(2)]
+        futures += [scheduler.lane("urgent", priority=5).submit(order.append, f"urgent-{n}") for n in range(2)]
+        gate.set()
+        for future in [blocker, *futures]:
+            future.result()
+
+    assert order == ["urgent-0", "urgent-1", "low-0", "low-1"]
+
+
+def test_task_exceptions_reach_the_future():
+    with FairScheduler(workers=2) as scheduler:
+        future = scheduler.submit("book", 0, lambda: 1 / 0)
+        assert isinstance(future.exception(), ZeroDivisionError)
+
+
+def test_scheduled_client_routes_batches_through_its_lane():
+    class ExecutorClient:
+        model = "mock-model"
+
+        def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None, executor=None):
+            futures = [executor.submit(lambda el: (el.id, threading.current_thread().name), el)
+                       for el in translation_map.elements]
+            return TranslationMap(elements=[
+                TranslationMapElement(id=el_id, text=name) for el_id, name in (f.result() for f in futures)
+            ])
+
+    with FairScheduler(workers=2) as scheduler:
+        client = ScheduledClient(ExecutorClient(), scheduler.lane("book.epub"))
+        result = client.translate_batch(
+            TranslationMap(elements=[TranslationMapElement(id="REF_000001", text="Hello")]), "spanish"
+        )
+
+    assert client.model == "mock-model"
+    assert result.elements[0].text.startswith("api-worker-")
+
+
+def test_scheduled_router_finds_translations_cached_under_fallback_models(tmp_path):
+    class UnusedModelClient:
+        def __init__(self, model):
+            self.model = model
+            self.calls = 0
+
+        def translate_batch(self, *args, **kwargs):
+            self.calls += 1
+            raise AssertionError("cached element sent to the API")
+
+    primary, fallback = UnusedModelClient("a"), UnusedModelClient("b")
+    source = "The dungeon collapsed behind them."
+    with TranslationCache(db_path=str(tmp_path / "cache.db")) as cache, FairScheduler(workers=1) as scheduler:
+        prompt_version = get_prompt_version("spanish")
+        cache.save_by_hash("b", "spanish", prompt_version, [
+            (content_hash(source, "b", "spanish", prompt_version), source, "La mazmorra se derrumbó tras ellos."),
+        ])
+        client = ScheduledClient(RoutingTranslatorClient([primary, fallback]), scheduler.lane("book.epub"))
+        service = TranslationService(client, cache)
+
+        result = service.translate("book", TranslationMap(elements=[TranslationMapElement("REF_000001", source)]), "spanish")
+
+    assert client.models == ["a", "b"]
+    assert result.texts == ["La mazmorra se derrumbó tras ellos."]
+    assert primary.calls == fallback.calls == 0
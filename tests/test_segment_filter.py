@@ -0,0 +1,72 @@
+import pytest
+from core.segment_filter import SegmentFilter
+from models.translation import TranslationMap, TranslationMapElement
+from tests.helpers import word_count
+
+
+@pytest.mark.parametrize("text, rule", [
+    ("42", "symbols"),
+    ("* * *", "symbols"),
+    ("Page 12", "page_marker"),
+    ("pg. 7", "page_marker"),
+    ("XIV", "roman_numeral"),
+    ("ISBN 978-0-593-82024-8", "isbn"),
+    ("Copyright © 2021 by Matt Dinniman", "copyright"),
+    ("All rights reserved.", "copyright"),
+    ("https://example.com/books", "url"),
+    ("STR: 15 | DEX: 12 | HP 45/45", "code"),
+    ("Strength: 15, Dexterity: 12, Crit: +5%", "code"),
+    ("player_inventory.add()", "code"),
+    ("El perro se fue a la casa de su amigo porque llovía.", "target_language"),
+])
+def test_classify_detects_non_translatable_segments(text, rule):
+    assert SegmentFilter(count_tokens=word_count).classify(text, "spanish") == rule
+
+
+@pytest.mark.parametrize("text", [
+    "Mix",
+    "Chapter IV",
+    "New Achievement!",
+    "The dog went to <i>his</i> friend's house because it was raining.",
+    "Level 3",
+    "June 12, 2021",
+    "10:45 p.m.",
+    "Day 1, 09:00",
+    "Floor 3, Room 12",
+    "Chapter 4: 1999",
+])
+def test_classify_keeps_translatable_text(text):
+    assert SegmentFilter(count_tokens=word_count).classify(text, "spanish") is None
+
+
+def test_filter_reports_skipped_elements_and_merges_them_back_in_order():
+    t_map = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="Chapter One"),
+        TranslationMapElement(id="REF_002", text="* * *"),
+        TranslationMapElement(id="REF_003", text="It was a dark night."),
+    ])
+
+    result = SegmentFilter(count_tokens=word_count).filter(t_map, "spanish")
+
+    assert [el.id for el in result.to_translate.elements] == ["REF_001", "REF_003"]
+    assert result.report.skipped_elements == 1
+    assert result.report.skipped_by_rule == {"symbols": 1}
+    assert result.report.saved_tokens == 2 * word_count("REF_002: * * *")
+
+    translated = TranslationMap(elements=[
+        TranslationMapElement(id="REF_003", text="Era una noche oscura."),
+        TranslationMapElement(id="REF_001", text="Capítulo uno"),
+    ])
+    assert [(el.id, el.text) for el in result.merge(translated).elements] == [
+        ("REF_001", "Capítulo uno"),
+        ("REF_002", "* * *"),
+        ("REF_003", "Era una noche oscura."),
+    ]
+
+
+def test_rules_are_configurable():
+    only_urls = SegmentFilter(rules=["url"], count_tokens=word_count)
+
+    assert only_urls.classify("42", "spanish") is None
+    with pytest.raises(ValueError):
+        SegmentFilter(rules=["emoji"])
@@ -0,0 +1,70 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from core.streaming import IncrementalElementParser, iter_sse_data
+from core.translator import OpenRouterClient
+from models.translation import TranslationMapElement
+from models.usage import UsageStatistics
+
+DOCUMENT = json.dumps({"elements": [
+    {"id": "REF_001", "text": "Dijo: \"hola {amigo}\" [sic]"},
+    {"id": "REF_002", "text": "Barra \\ invertida"},
+]})
+
+
+def sse_lines(content: str, chunk_size: int, usage: dict | None = None) -> list[str]:
+    lines = [": OPENROUTER PROCESSING", ""]
+    for i in range(0, len(content), chunk_size):
+        delta = {"choices": [{"delta": {"content": content[i:i + chunk_size]}}]}
+        lines += [f"data: {json.dumps(delta)}", ""]
+    if usage:
+        lines += [f"data: {json.dumps({'choices': [], 'usage': usage})}", ""]
+    return lines + ["data: [DONE]"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, len(DOCUMENT)])
+def test_parser_emits_elements_regardless_of_chunk_boundaries(chunk_size):
+    parser = IncrementalElementParser()
+    found = []
+    for i in range(0, len(DOCUMENT), chunk_size):
+        found += parser.feed(DOCUMENT[i:i + chunk_size])
+
+    assert found == json.loads(DOCUMENT)["elements"]
+
+
+def test_parser_emits_each_element_as_soon_as_it_closes():
+    parser = IncrementalElementParser()
+
+    assert parser.feed('{"elements": [{"id": "REF_001", "text": "a"}') == [{"id": "REF_001", "text": "a"}]
+    # Un segundo elemento truncado nunca se emite
+    assert parser.feed(', {"id": "REF_002", "te') == []
+
+
+def test_iter_sse_data_skips_comments_and_stops_at_done():
+    lines = [": keep-alive", "", 'data: {"a": 1}', "", "data: [DONE]", 'data: {"b": 2}']
+
+    assert list(iter_sse_data(lines)) == [{"a": 1}]
+
+
+def test_client_streams_elements_and_keeps_them_when_truncated():
+    stats = UsageStatistics()
+    client = OpenRouterClient(api_key="fake_key", stats=stats)
+    client.stream_responses = True
+    batch = [TranslationMapElement(id=f"REF_00{i}", text=f"Text {i}") for i in range(1, 4)]
+
+    # El modelo corta la respuesta a mitad del tercer elemento
+    content = '{"elements": [{"id": "REF_001", "text": "Uno"}, {"id": "REF_002", "text": "Dos"}, {"id": "REF_0'
+    first = MagicMock(status_code=200, headers={})
+    first.iter_lines.return_value = sse_lines(content, 5, usage={"prompt_tokens": 30, "completion_tokens": 20})
+    retry = MagicMock(status_code=200, headers={})
+    retry.iter_lines.return_value = sse_lines('{"elements": [{"id": "REF_003", "text": "Tres"}]}', 4)
+
+    emitted = []
+    with patch.object(client.session, 'post', side_effect=[first, retry]) as mock_post:
+        results = client._translate_chunk(batch, "system prompt", on_elements=lambda els: emitted.append([e.id for e in els]))
+
+    assert [el.text for el in results] == ["Uno", "Dos", "Tres"]
+    assert emitted == [["REF_001"], ["REF_002"], ["REF_003"]]
+    assert mock_post.call_args_list[0].kwargs["json"]["stream"] is True
+    assert mock_post.call_args_list[1].kwargs["json"]["messages"][1]["content"] == "REF_003: Text 3"
+    assert stats.prompt_tokens == 30
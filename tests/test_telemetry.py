@@ -0,0 +1,55 @@
+import json
+import pstats
+from core.telemetry import Histogram, Telemetry, profile
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.observe(0.01)
+    for _ in range(10):
+        histogram.observe(3.0)
+
+    assert histogram.percentile(0.5) == 0.016
+    assert histogram.percentile(0.99) == 3.0  # capped at the observed max
+    assert histogram.summary()["count"] == 100
+
+
+def test_worker_telemetry_merges_into_the_parent():
+    parent, worker = Telemetry(), Telemetry()
+    worker.observe("extract", 0.2)
+    worker.increment("documents", 2)
+
+    parent.merge(worker.collect())
+    parent.merge(worker.collect())  # nothing is counted twice
+
+    assert parent.histograms["extract"].count == 1
+    assert parent.counters == {"documents": 2}
+
+
+def test_json_report_and_prometheus_textfile(tmp_path):
+    telemetry = Telemetry()
+    with telemetry.timer("api_request"):
+        pass
+    telemetry.increment("cache_hits", 3)
+    telemetry.increment("cache_misses", 1)
+    telemetry.increment("api_429")
+
+    telemetry.write_json(str(tmp_path / "run.json"))
+    telemetry.write_prometheus(str(tmp_path / "run.prom"))
+
+    report = json.loads((tmp_path / "run.json").read_text())
+    assert report["derived"]["cache_hit_ratio"] == 0.75
+    assert report["phases"]["api_request"]["count"] == 1
+    prom = (tmp_path / "run.prom").read_text()
+    assert 'epub_translator_phase_seconds_bucket{phase="api_request",le="+Inf"} 1' in prom
+    assert "epub_translator_api_429_total 1" in prom
+    assert "epub_translator_cache_hit_ratio 0.75" in prom
+
+
+def test_profile_dumps_stats(tmp_path):
+    path = str(tmp_path / "run.prof")
+    with profile(path):
+        sorted(range(1000))
+
+    assert pstats.Stats(path).total_calls > 0
@@ -0,0 +1,51 @@
+import pytest
+from models import api
+from models.translation import TranslationMap, TranslationMapElement
+
+
+def sample_map() -> TranslationMap:
+    return TranslationMap(elements=[TranslationMapElement(id=f"REF_{n}", text=f"text {n}") for n in range(5)])
+
+
+def test_map_keeps_columns_and_element_views():
+    t_map = sample_map()
+
+    assert t_map.ids == [f"REF_{n}" for n in range(5)]
+    assert t_map.texts == [f"text {n}" for n in range(5)]
+    assert t_map.elements[2] == TranslationMapElement(id="REF_2", text="text 2")
+    assert list(t_map) == t_map.elements
+    assert len(t_map) == 5
+
+
+def test_slices_share_the_strings():
+    t_map = sample_map()
+
+    part = t_map[1:3]
+
+    assert part == TranslationMap.from_pairs([("REF_1", "text 1"), ("REF_2", "text 2")])
+    assert part.texts[0] is t_map.texts[1]
+    with pytest.raises(TypeError):
+        t_map[0]
+
+
+def test_merged_follows_the_order_and_lets_later_parts_win():
+    translated = TranslationMap.from_pairs([("REF_3", "tres"), ("REF_0", "cero")])
+
+    merged = TranslationMap.merged(sample_map().ids, {"REF_0": "zero", "REF_4": "text 4"}, translated)
+
+    assert list(merged.items()) == [("REF_0", "cero"), ("REF_3", "tres"), ("REF_4", "text 4")]
+
+
+def test_from_columns_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        TranslationMap.from_columns(["REF_1"], [])
+
+
+def test_api_models_convert_at_the_boundary():
+    raw = '{"elements": [{"id": "REF_1", "text": "uno"}, {"id": "REF_2", "text": "dos"}]}'
+
+    t_map = api.TranslationMap.model_validate_json(raw).to_map()
+
+    assert t_map.as_dict() == {"REF_1": "uno", "REF_2": "dos"}
+    assert api.RESPONSE_SCHEMA["title"] == "TranslationMap"
+    assert "TranslationMapElement" in api.RESPONSE_SCHEMA["$defs"]
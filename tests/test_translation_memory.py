@@ -0,0 +1,101 @@
+import pytest
+from core.persistence import TranslationCache
+from core.translation_memory import TranslationMemory, canonical_text
+from core.translation_service import TranslationService
+from models.translation import TranslationMap, TranslationMapElement
+from prompts import get_prompt_version
+
+SOURCE = "Carl looked at the notification. He had gained 12 experience points, which was not much at all."
+TRANSLATION = "Carl miró la notificación. Había ganado 12 puntos de experiencia, que no era gran cosa."
+PROMPT_VERSION = get_prompt_version("spanish")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    cache.save_by_hash("model", "spanish", PROMPT_VERSION, [
+        ("h1", SOURCE, TRANSLATION),
+        ("h2", "The dungeon collapsed behind them.", "La mazmorra se derrumbó tras ellos."),
+    ])
+    yield cache
+    cache.close()
+
+
+def test_canonical_text_ignores_typography():
+    assert canonical_text("“Hello” — he said …") == canonical_text('"Hello" - he said ...')
+
+
+def test_refresh_indexes_only_new_rows(cache):
+    memory = TranslationMemory(cache)
+
+    assert memory.refresh() == 2
+    assert memory.refresh() == 0
+    cache.save_by_hash("model", "spanish", "v1", [("h3", "A new line.", "Una línea nueva.")])
+    assert memory.refresh() == 1
+
+
+def test_lookup_reuses_typographic_variants_and_hints_near_duplicates(cache):
+    memory = TranslationMemory(cache)
+    memory.refresh()
+
+    variant = SOURCE.replace("notification.", "notification .").replace("'", "’")
+    exact = memory.lookup(variant, "spanish", ["model"], PROMPT_VERSION)
+    assert exact.exact and exact.translation == TRANSLATION
+
+    # Otro nombre y otro número: parecido, pero nunca se reutiliza tal cual
+    near = memory.lookup(SOURCE.replace("Carl", "Donut").replace("12", "15"), "spanish", ["model"], PROMPT_VERSION)
+    assert near is not None and not near.exact
+    assert near.translation == TRANSLATION and near.similarity >= memory.threshold
+
+    unrelated = "Something entirely unrelated to the stored text."
+    assert memory.lookup(unrelated, "spanish", ["model"], PROMPT_VERSION) is None
+    assert memory.lookup(SOURCE, "french", ["model"], PROMPT_VERSION) is None
+
+
+def test_lookup_only_hints_translations_of_other_models_or_prompts(cache):
+    memory = TranslationMemory(cache)
+    memory.refresh()
+
+    for model_names, prompt_version in ((["other-model"], PROMPT_VERSION), (["model"], "older-prompt")):
+        match = memory.lookup(SOURCE, "spanish", model_names, prompt_version)
+        assert match is not None and not match.exact
+        assert match.translation == TRANSLATION
+
+
+class RecordingTranslator:
+    model = "model"
+
+    def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+        self.sent = [el.id for el in translation_map.elements]
+        self.hints = hints
+        return TranslationMap(elements=[
+            TranslationMapElement(id=el.id, text=f"[TRANS] {el.text}") for el in translation_map.elements
+        ])
+
+
+def test_service_reuses_and_hints_from_memory(cache):
+    translator = RecordingTranslator()
+    service = TranslationService(translator, cache, memory=TranslationMemory(cache))
+    elements = [
+        TranslationMapElement(id="REF_001", text=SOURCE.replace(".", " .", 1)),
+        TranslationMapElement(id="REF_002", text=SOURCE.replace("Carl", "Donut")),
+    ]
+
+    result = service.translate("book", TranslationMap(elements=elements), "spanish")
+
+    assert translator.sent == ["REF_002"]
+    assert translator.hints == {"REF_002": (SOURCE, TRANSLATION)}
+    assert [el.text for el in result.elements] == [TRANSLATION, f"[TRANS] {elements[1].text}"]
+
+
+def test_service_retranslates_memory_matches_after_a_prompt_change(cache, monkeypatch):
+    monkeypatch.setattr("core.translation_service.get_prompt_version", lambda target_lang: "new-prompt")
+    translator = RecordingTranslator()
+    service = TranslationService(translator, cache, memory=TranslationMemory(cache))
+    variant = SOURCE.replace(".", " .", 1)
+
+    result = service.translate("book", TranslationMap(elements=[TranslationMapElement("REF_001", variant)]), "spanish")
+
+    assert translator.sent == ["REF_001"]
+    assert translator.hints == {"REF_001": (SOURCE, TRANSLATION)}
+    assert result.texts == [f"[TRANS] {variant}"]
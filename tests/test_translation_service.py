@@ -1,6 +1,7 @@
 import pytest
 from core.translation_service import TranslationService
 from core.protocols import TranslatorClient, CacheRepository
+from core.persistence import TranslationCache
 from models.translation import TranslationMap, TranslationMapElement
 
 # --- Mocks creados explícitamente gracias a los Protocolos ---
@@ -14,7 +15,7 @@ class MockTranslator:
     def model(self) -> str:
         return self._model
 
-    def translate_batch(self, translation_map: TranslationMap, target_lang: str) -> TranslationMap:
+    def translate_batch(self, translation_map: TranslationMap, target_lang: str, on_batch_complete=None, hints=None) -> TranslationMap:
         self.call_count += 1
         # Simplemente añadimos "[TRANS]" al texto para simular traducción
         translated_elements = [
@@ -28,14 +29,27 @@ class MockCache:
         self.storage = {}
         self.save_count = 0
 
-    def save_batch(self, book_id: str, model_name: str, elements: list[TranslationMapElement]) -> None:
+    def save_batch(self, book_id: str, model_name: str, target_lang: str, elements: list[TranslationMapElement], source_hashes=None) -> None:
         self.save_count += 1
         for el in elements:
-            key = (book_id, model_name, el.id)
+            key = (book_id, model_name, target_lang, el.id)
             self.storage[key] = el.text
 
-    def get_translation(self, book_id: str, model_name: str, ref_id: str) -> str | None:
-        return self.storage.get((book_id, model_name, ref_id))
+    def save_by_hash(self, model_name, target_lang, prompt_version, entries) -> None:
+        for content_key, _source, text in entries:
+            self.storage[content_key] = text
+
+    def get_many_by_hash(self, hashes) -> dict[str, str]:
+        return {h: self.storage[h] for h in hashes if h in self.storage}
+
+    def get_translation(self, book_id: str, model_name: str, target_lang: str, ref_id: str) -> str | None:
+        return self.storage.get((book_id, model_name, target_lang, ref_id))
+
+    def get_many(self, book_id: str, model_name: str, target_lang: str, ids: list[str], source_hashes=None) -> dict[str, str]:
+        return {
+            i: self.storage[(book_id, model_name, target_lang, i)]
+            for i in ids if (book_id, model_name, target_lang, i) in self.storage
+        }
 
 # --- Tests ---
 
@@ -50,7 +64,7 @@ def test_translation_service_uses_cache():
     t_map = TranslationMap(elements=elements)
     
     # Pre-poblar caché
-    cache.save_batch(book_id, translator.model, [TranslationMapElement(id="REF_001", text="Hola Cached")])
+    cache.save_batch(book_id, translator.model, "spanish", [TranslationMapElement(id="REF_001", text="Hola Cached")])
     
     # Execute
     result = service.translate(book_id, t_map, "spanish")
@@ -75,4 +89,121 @@ def test_translation_service_calls_api_and_saves_cache():
     # Verify
     assert result.elements[0].text == "[TRANS] World"
     assert translator.call_count == 1
-    assert cache.get_translation(book_id, translator.model, "REF_002") == "[TRANS] World"
+    assert cache.get_translation(book_id, translator.model, "spanish", "REF_002") == "[TRANS] World"
+
+class FlakyBatchTranslator(MockTranslator):
+    """Traduce batch a batch notificando cada uno, y falla tras `fail_after` batches."""
+    def __init__(self, fail_after=None):
+        super().__init__()
+        self.fail_after = fail_after
+        self.sent_ids = []
+
+    def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+        self.call_count += 1
+        done = []
+        for index, el in enumerate(translation_map.elements):
+            if self.fail_after is not None and index >= self.fail_after:
+                raise RuntimeError("Retry budget exhausted")
+            translated = TranslationMapElement(id=el.id, text=f"[TRANS] {el.text}")
+            self.sent_ids.append(el.id)
+            on_batch_complete(self.model, [translated])
+            done.append(translated)
+        return TranslationMap(elements=done)
+
+def test_translation_service_checkpoints_and_resumes(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    t_map = TranslationMap(elements=[TranslationMapElement(id=f"REF_{i:03d}", text=f"Text {i}") for i in range(5)])
+
+    # Primera ejecución: muere tras 3 batches, pero lo ya traducido queda guardado
+    crashing = FlakyBatchTranslator(fail_after=3)
+    with pytest.raises(RuntimeError):
+        TranslationService(crashing, cache, journal=cache).translate("book", t_map, "spanish", use_cache=False)
+    assert cache.get_many("book", crashing.model, "spanish", [el.id for el in t_map.elements]).keys() == {"REF_000", "REF_001", "REF_002"}
+
+    # Reanudación: sólo se envían los elementos pendientes aunque no se use la caché general
+    resumed = FlakyBatchTranslator()
+    service = TranslationService(resumed, cache, journal=cache)
+    result = service.translate("book", t_map, "spanish", use_cache=False, resume=True)
+
+    assert resumed.sent_ids == ["REF_003", "REF_004"]
+    assert [el.id for el in result.elements] == [el.id for el in t_map.elements]
+    assert cache.find_resumable_run("book", resumed.model, "spanish") is None
+    cache.close()
+
+def test_translation_service_content_cache_survives_shifted_ids(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    translator = MockTranslator()
+    service = TranslationService(translator, cache)
+
+    first = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="Hello"),
+        TranslationMapElement(id="REF_002", text="World"),
+    ])
+    service.translate("book_v1", first, "spanish")
+
+    # Nueva edición: un párrafo insertado al principio desplaza todos los IDs
+    shifted = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="New intro"),
+        TranslationMapElement(id="REF_002", text="Hello"),
+        TranslationMapElement(id="REF_003", text="World"),
+    ])
+    translator.call_count = 0
+    result = service.translate("book_v1", shifted, "spanish")
+
+    assert [el.text for el in result.elements] == ["[TRANS] New intro", "[TRANS] Hello", "[TRANS] World"]
+    # Sólo el párrafo nuevo ha ido a la API, y el texto desplazado no se ha confundido
+    assert translator.call_count == 1
+    cache.close()
+
+def test_translation_service_keeps_source_for_elements_given_up(tmp_path):
+    class DroppingTranslator(MockTranslator):
+        def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+            kept = [TranslationMapElement(id=el.id, text=f"[TRANS] {el.text}") for el in translation_map.elements[:1]]
+            return TranslationMap(elements=kept)
+
+    cache = TranslationCache(db_path=str(tmp_path / "cache.db"))
+    translator = DroppingTranslator()
+    t_map = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="Hello"),
+        TranslationMapElement(id="REF_002", text="Cursed"),
+    ])
+
+    result = TranslationService(translator, cache, journal=cache).translate("book", t_map, "spanish")
+
+    assert [el.text for el in result.elements] == ["[TRANS] Hello", "Cursed"]
+    # El texto original no se guarda como traducción y la ejecución queda reanudable
+    assert cache.get_many("book", translator.model, "spanish", ["REF_002"]) == {}
+    assert cache.find_resumable_run("book", translator.model, "spanish") is not None
+    cache.close()
+
+def test_translation_service_compresses_markup_and_restores_it():
+    from core.markup import MarkupCompressor
+
+    class RecordingTranslator(MockTranslator):
+        def translate_batch(self, translation_map, target_lang, on_batch_complete=None, hints=None):
+            self.sent = [el.text for el in translation_map.elements]
+            return super().translate_batch(translation_map, target_lang, on_batch_complete)
+
+    translator = RecordingTranslator()
+    service = TranslationService(translator, MockCache(), compressor=MarkupCompressor())
+    elements = [TranslationMapElement(id="REF_001", text='A <span class="calibre3">bold</span> claim')]
+
+    result = service.translate("book", TranslationMap(elements=elements), "spanish")
+
+    assert translator.sent == ["A <x1>bold</x1> claim"]
+    assert result.elements[0].text == '[TRANS] A <span class="calibre3">bold</span> claim'
+
+def test_translations_from_any_routed_model_are_reused():
+    class RoutedTranslator(MockTranslator):
+        models = ["primary", "fallback"]
+
+    cache = MockCache()
+    batch = TranslationMap(elements=[TranslationMapElement(id="REF_001", text="Hello")])
+    # A previous run whose batch was answered by the fallback model
+    TranslationService(MockTranslator("fallback"), cache).translate("book", batch, "spanish")
+
+    translator = RoutedTranslator("primary")
+    result = TranslationService(translator, cache).translate("book", batch, "spanish")
+
+    assert translator.call_count == 0
+    assert result.elements[0].text == "[TRANS] Hello"
@@ -1,8 +1,12 @@
 import pytest
 import requests
+import time
+import json
 from unittest.mock import MagicMock, patch
 from core.translator import OpenRouterClient
-from core.validators import TranslationValidationError
+from core.validators import (
+    CompositeValidator, IDAlignmentValidator, MarkupPlaceholderValidator, TranslationValidationError
+)
 from models.translation import TranslationMap, TranslationMapElement
 from models.usage import UsageStatistics
 
@@ -36,7 +40,7 @@ def test_client_calls_validator_and_retries_on_validation_error(client):
         "usage": {"prompt_tokens": 10, "completion_tokens": 10}
     }
 
-    with patch('requests.post', return_value=mock_response) as mock_post:
+    with patch.object(client.session, 'post', return_value=mock_response) as mock_post:
         # 2. Execute
         results = client._send_request(batch, "system prompt")
         
@@ -46,3 +50,146 @@ def test_client_calls_validator_and_retries_on_validation_error(client):
         # Tenacity debería haber reintentado, por lo que post y validate se llaman 2 veces
         assert mock_post.call_count == 2
         assert mock_validator.validate.call_count == 2
+
+def test_translate_batch_dispatches_concurrently_and_keeps_order(client):
+    """Los batches se envían en paralelo pero el resultado conserva el orden original."""
+    client.max_concurrent_requests = 4
+    elements = [TranslationMapElement(id=f"REF_{i:03d}", text=f"Text {i}") for i in range(10)]
+
+    def fake_send(batch, system_prompt, on_elements=None, hints=None, cancelled=None):
+        # Los primeros batches tardan más para forzar que terminen desordenados
+        time.sleep(0.05 if batch[0].id == "REF_000" else 0)
+        return [TranslationMapElement(id=el.id, text=f"T {el.text}") for el in batch]
+
+    fake_encoding = MagicMock()
+    fake_encoding.encode_ordinary.side_effect = str.split
+    fake_encoding.encode_ordinary_batch.side_effect = lambda texts: [text.split() for text in texts]
+    with patch('core.batching.get_encoding', return_value=fake_encoding), \
+            patch.object(client, '_send_request', side_effect=fake_send) as mock_send:
+        result = client.translate_batch(TranslationMap(elements=elements), "spanish", batch_size=3)
+
+    assert mock_send.call_count == 4
+    assert [el.id for el in result.elements] == [el.id for el in elements]
+    assert result.elements[0].text == "T Text 0"
+
+def make_response(elements, prompt_tokens=10, completion_tokens=10):
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {}
+    content = elements if isinstance(elements, str) else json.dumps({"elements": elements})
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+    }
+    return response
+
+def requested_ids(call):
+    """IDs enviados en una llamada a session.post (líneas 'REF_x: texto' del mensaje de usuario)."""
+    user_content = call.kwargs["json"]["messages"][1]["content"]
+    return [line.split(":")[0] for line in user_content.splitlines()]
+
+def test_missing_ids_are_salvaged_and_only_missing_are_rerequested(client):
+    batch = [TranslationMapElement(id=f"REF_00{i}", text=f"Text {i}") for i in range(1, 4)]
+
+    def fake_post(url, headers, json):
+        ids = [line.split(":")[0] for line in json["messages"][1]["content"].splitlines()]
+        # La primera respuesta omite REF_002 y añade un ID inventado
+        returned = [i for i in ids if i != "REF_002"] if len(ids) == 3 else ids
+        elements = [{"id": i, "text": f"T {i}"} for i in returned]
+        if len(ids) == 3:
+            elements.append({"id": "REF_999", "text": "Extra"})
+        return make_response(elements)
+
+    with patch.object(client.session, 'post', side_effect=fake_post) as mock_post:
+        results = client._translate_chunk(batch, "system prompt")
+
+    assert [el.id for el in results] == ["REF_001", "REF_002", "REF_003"]
+    assert [requested_ids(c) for c in mock_post.call_args_list] == [["REF_001", "REF_002", "REF_003"], ["REF_002"]]
+
+def test_salvage_revalidates_survivors_with_every_validator(client):
+    client.validator = CompositeValidator([IDAlignmentValidator(), MarkupPlaceholderValidator()])
+    batch = [TranslationMapElement(id=f"REF_00{i}", text=f"<x1>Text {i}</x1>") for i in range(1, 4)]
+
+    def fake_post(url, headers, json):
+        ids = [line.split(":")[0] for line in json["messages"][1]["content"].splitlines()]
+        # Primera respuesta: falta REF_002 y REF_003 pierde su marcador
+        if len(ids) == 3:
+            return make_response([{"id": "REF_001", "text": "<x1>T 1</x1>"}, {"id": "REF_003", "text": "T 3"}])
+        return make_response([{"id": i, "text": f"<x1>T {i}</x1>"} for i in ids])
+
+    with patch.object(client.session, 'post', side_effect=fake_post) as mock_post:
+        results = client._translate_chunk(batch, "system prompt")
+
+    assert [(el.id, el.text) for el in results] == [
+        ("REF_001", "<x1>T 1</x1>"), ("REF_002", "<x1>T REF_002</x1>"), ("REF_003", "<x1>T REF_003</x1>"),
+    ]
+    assert [requested_ids(c) for c in mock_post.call_args_list] == [
+        ["REF_001", "REF_002", "REF_003"], ["REF_002", "REF_003"],
+    ]
+
+def test_malformed_json_bisects_the_batch(client):
+    batch = [TranslationMapElement(id=f"REF_00{i}", text=f"Text {i}") for i in range(1, 5)]
+
+    def fake_post(url, headers, json):
+        ids = [line.split(":")[0] for line in json["messages"][1]["content"].splitlines()]
+        if len(ids) > 2:
+            return make_response('{"elements": [{"id": "REF_001", "te')  # Respuesta truncada
+        return make_response([{"id": i, "text": f"T {i}"} for i in ids])
+
+    with patch.object(client.session, 'post', side_effect=fake_post) as mock_post:
+        results = client._translate_chunk(batch, "system prompt")
+
+    assert [el.id for el in results] == ["REF_001", "REF_002", "REF_003", "REF_004"]
+    assert [requested_ids(c) for c in mock_post.call_args_list][1:] == [["REF_001", "REF_002"], ["REF_003", "REF_004"]]
+
+def test_persistently_failing_element_is_given_up(client):
+    client.max_element_attempts = 2
+    batch = [TranslationMapElement(id="REF_001", text="Fine"), TranslationMapElement(id="REF_002", text="Cursed")]
+
+    def fake_post(url, headers, json):
+        ids = [line.split(":")[0] for line in json["messages"][1]["content"].splitlines()]
+        return make_response([{"id": i, "text": f"T {i}"} for i in ids if i != "REF_002"] or [{"id": "REF_000", "text": "?"}])
+
+    with patch.object(client.session, 'post', side_effect=fake_post) as mock_post:
+        results = client._translate_chunk(batch, "system prompt")
+
+    assert [el.id for el in results] == ["REF_001"]
+    # Un envío inicial + un único reintento de REF_002, sin reintentos del batch completo
+    assert mock_post.call_count == 2
+
+def test_send_request_attaches_memory_hints_as_examples(client):
+    batch = [TranslationMapElement(id="REF_001", text="Hello, Donut")]
+    mock_response = MagicMock(status_code=200, headers={})
+    mock_response.json.return_value = {
+        "choices": [{"message": {"content": '{"elements": [{"id": "REF_001", "text": "Hola, Donut"}]}'}}],
+        "usage": {}
+    }
+
+    with patch.object(client.session, 'post', return_value=mock_response) as mock_post:
+        client._send_request(batch, "system prompt", hints={"REF_001": ("Hello, Carl", "Hola, Carl")})
+
+    messages = mock_post.call_args.kwargs["json"]["messages"]
+    assert [m["role"] for m in messages] == ["system", "system", "user"]
+    assert "SOURCE: Hello, Carl\nTRANSLATION: Hola, Carl" in messages[1]["content"]
+
+def test_languages_without_a_tailored_prompt_use_the_generic_one():
+    from prompts import get_system_prompt, get_prompt_version, PROMPTS_DICT
+
+    assert get_system_prompt("spanish") == PROMPTS_DICT["spanish"]
+    assert "into French" in get_system_prompt("french")
+    assert get_prompt_version("french") != get_prompt_version("german")
+
+def test_cancelled_call_sends_nothing_and_records_usage_per_model(client, mock_stats):
+    import threading
+    from core.translator import RequestCancelled
+
+    cancelled = threading.Event()
+    cancelled.set()
+    batch = [TranslationMapElement(id="REF_001", text="Hello")]
+    with patch.object(client.session, 'post') as mock_post, pytest.raises(RequestCancelled):
+        client._translate_chunk(batch, "system prompt", cancelled=cancelled)
+    assert mock_post.call_count == 0
+
+    client._record_usage({"prompt_tokens": 7, "completion_tokens": 3})
+    assert mock_stats.by_model[client.model].requests == 1
+    assert mock_stats.by_model[client.model].prompt_tokens == 7
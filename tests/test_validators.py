@@ -1,5 +1,5 @@
 import pytest
-from core.validators import IDAlignmentValidator, TranslationValidationError, CompositeValidator
+from core.validators import IDAlignmentValidator, TranslationValidationError, CompositeValidator, MarkupPlaceholderValidator
 from models.translation import TranslationMap, TranslationMapElement
 
 def test_id_alignment_validator_success():
@@ -35,3 +35,18 @@ def test_composite_validator_execution():
     
     assert spy1.called is True
     assert spy2.called is True
+
+def test_markup_placeholder_validator_flags_lost_placeholders():
+    validator = MarkupPlaceholderValidator()
+    original = [
+        TranslationMapElement(id="REF_001", text="<x1>Hello</x1> world"),
+        TranslationMapElement(id="REF_002", text="Line<x1/>break"),
+    ]
+    translated = TranslationMap(elements=[
+        TranslationMapElement(id="REF_001", text="<x1>Hola</x1> mundo"),
+        TranslationMapElement(id="REF_002", text="Salto de línea"),
+    ])
+
+    with pytest.raises(TranslationValidationError) as excinfo:
+        validator.validate(original, translated)
+    assert excinfo.value.failed_ids == {"REF_002"}
@@ -1,9 +1,27 @@
-from ebooklib import epub, ITEM_DOCUMENT
-import tiktoken
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import unquote
 from models.translation import TranslationMap
 
+# ebooklib and tiktoken are imported on first use: most runs never need the former,
+# and the latter is only needed once something is counted
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENCODING = "cl100k_base"
+XHTML_MEDIA_TYPES = {"application/xhtml+xml", "text/html"}
+_OPF_NS = {"opf": "http://www.idpf.org/2007/opf"}
+_CONTAINER_NS = {"c": "urn:oasis:names:tc:opendocument:xmlns:container"}
+
 def load_epub_content(file_path: str) -> str:
     """Loads all document items from an EPUB and returns them as a single string."""
+    from ebooklib import epub, ITEM_DOCUMENT
     book = epub.read_epub(file_path)
     return "\n".join([
         item.get_content().decode('utf-8') 
@@ -11,14 +29,55 @@ def load_epub_content(file_path: str) -> str:
         if item.get_type() == ITEM_DOCUMENT
     ])
 
+def list_document_paths(archive: zipfile.ZipFile) -> list[str]:
+    """
+    Returns the zip paths of the book's XHTML documents in reading (spine) order,
+    followed by any manifest document outside the spine. Only the OPF is parsed,
+    so no chapter content is loaded. Manifest entries missing from the archive are
+    skipped with a warning.
+    """
+    container = ET.fromstring(archive.read("META-INF/container.xml"))
+    opf_path = container.find(".//c:rootfile", _CONTAINER_NS).get("full-path")
+    opf_dir = posixpath.dirname(opf_path)
+    opf = ET.fromstring(archive.read(opf_path))
+    names = set(archive.namelist())
+
+    documents = {}
+    for item in opf.iterfind("opf:manifest/opf:item", _OPF_NS):
+        properties = (item.get("properties") or "").split()
+        if item.get("media-type") not in XHTML_MEDIA_TYPES or "nav" in properties:
+            continue
+        # hrefs are URLs: "chapter%201.xhtml" is stored in the zip as "chapter 1.xhtml"
+        path = posixpath.normpath(posixpath.join(opf_dir, unquote(item.get("href"))))
+        if path not in names:
+            logger.warning(f"Manifest item {item.get('id')} points to {path}, which is not in the archive; skipping it.")
+            continue
+        documents[item.get("id")] = path
+
+    spine = [itemref.get("idref") for itemref in opf.iterfind("opf:spine/opf:itemref", _OPF_NS)]
+    ordered = [documents.pop(idref) for idref in spine if idref in documents]
+    return ordered + list(documents.values())
+
+@lru_cache(maxsize=1)
+def get_encoding() -> "tiktoken.Encoding":
+    """Returns the (memoized) tiktoken encoding used for every token estimate."""
+    import tiktoken
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """Token counts of many texts in one call (tiktoken encodes them on its own thread pool)."""
+    if not texts:
+        return []
+    return [len(tokens) for tokens in get_encoding().encode_ordinary_batch(texts)]
+
 def count_map_tokens(translation_map: TranslationMap) -> int:
-    """Calculates total estimated tokens for all elements in the map."""
-    encoding = tiktoken.get_encoding("cl100k_base")
-    total_tokens = 0
-    for el in translation_map.elements:
-        # We include ID and text for a realistic estimation
-        content_to_encode = f"{el.id}: {el.text}"
-        total_tokens += len(encoding.encode(content_to_encode))
-    
-    # 10% margin for JSON overhead and system prompt
-    return int(total_tokens * 1.1)
+    """
+    Tokens of the element lines ("id: text") of the map, as they appear in the requests
+    (compress the map first to count what is actually sent). Prompt, schema and response
+    overhead per request is estimated by core.preflight.
+    """
+    return sum(count_tokens_batch([f"{ref_id}: {text}" for ref_id, text in translation_map.items()]))
+
+def saved_element_tokens(ref_id: str, text: str, count_tokens: Callable[[str], int]) -> int:
+    """Tokens saved by not sending an element: its request line and a reply of roughly the same size."""
+    return 2 * count_tokens(f"{ref_id}: {text}")
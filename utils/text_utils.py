@@ -0,0 +1,16 @@
+import hashlib
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used to compare source segments (Unicode NFC, collapsed whitespace)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def content_hash(source_text: str, model_name: str, target_lang: str, prompt_version: str) -> str:
+    """Content address of a translation: same source, model, language and prompt -> same key."""
+    key = "\x1f".join((normalize_text(source_text), model_name, target_lang, prompt_version))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()